@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Constraint benchmark: generated tokens per scenario, wall time and pass rate, JSON schemas vs bare grammars.
+"""
+
+import sys
+import os
+import argparse
+import time
+
+# Add the project root to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import runner
+from evaluators import get_evaluator
+from models.outlines_model import OutlinesModel
+
+def run_mode(model, scenarios, output_types, kwargs_list, batches):
+    """Run every batch once; return (wall time, generated tokens, passed)"""
+    generated = 0
+    passed = 0
+    start = time.perf_counter()
+    for rows in batches:
+        outputs = model.run_batch(
+            [scenarios[i]["prompt"] for i in rows],
+            [output_types[i] for i in rows],
+            kwargs_list=[kwargs_list[i] for i in rows],
+        )
+        generated += sum(stats["generated_tokens"] for stats in model.last_batch_stats)
+        for i, output in zip(rows, outputs):
+            passed += bool(get_evaluator(scenarios[i]["evaluator"])(output, scenarios[i]["expected_output"]))
+    return time.perf_counter() - start, generated, passed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON vs bare structured constraints")
+    parser.add_argument("--model", default="facebook/opt-125m", help="Model name to use")
+    parser.add_argument("--batch-size", type=int, default=8, help="Batch size for inference")
+    parser.add_argument("--limit", type=int, default=0, help="Number of scenarios to run (0 for all)")
+    args = parser.parse_args()
+
+    scenarios = runner.load_scenarios(use_index=True)
+    if args.limit:
+        scenarios = scenarios[:args.limit]
+    output_types, kwargs_list = runner.batch_output_types(scenarios, True)
+    batches = runner.plan_batches(scenarios, output_types, kwargs_list, True, args.batch_size)
+
+    # One set of weights; only the constraint mode is switched between measurements
+    model = OutlinesModel(args.model)
+    print(f"Model: {args.model}  Scenarios: {len(scenarios)}  Batch size: {args.batch_size}")
+    for mode in ["json", "bare"]:
+        model.constraint = mode
+        # Warm up so grammar compilation lands in neither measurement
+        run_mode(model, scenarios, output_types, kwargs_list, batches)
+        elapsed, generated, passed = run_mode(model, scenarios, output_types, kwargs_list, batches)
+        print(f"{mode:>5}: {generated / len(scenarios):6.1f} generated tokens/scenario, "
+              f"{elapsed:.2f}s, {len(scenarios) / elapsed:.2f} scenarios/s, "
+              f"pass rate {passed / len(scenarios):.1%}")
+
+if __name__ == "__main__":
+    main()
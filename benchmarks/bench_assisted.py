@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Assisted decoding benchmark: wall time with and without a draft model, per output type.
+
+The long-form scenarios (the ones --draft-model applies to) run once on the target model
+alone, then again with the draft attached. Greedy outputs should match. The defaults are a
+small same-tokenizer pair that runs on CPU.
+"""
+
+import sys
+import os
+import argparse
+import time
+from collections import defaultdict
+
+# Add the project root to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from runner import load_scenarios, batch_output_types, create_model
+from models.prompting import decode_budget
+from models.assisted import draft_rows, load_draft_model
+
+def load_workload(use_structured, limit):
+    """Long-form scenarios grouped by output type, as (prompt, kwargs, budget) triples"""
+    scenarios = load_scenarios()
+    output_types, kwargs_list = batch_output_types(scenarios, use_structured)
+    budgets = None if use_structured else [decode_budget(t, s) for t, s in zip(output_types, scenarios)]
+    workload = defaultdict(list)
+    for row in draft_rows(output_types, budgets):
+        workload[output_types[row] or "unknown"].append(
+            (scenarios[row]["prompt"], kwargs_list[row] if kwargs_list else {}, budgets[row] if budgets else None)
+        )
+    return {t: rows[:limit] if limit else rows for t, rows in sorted(workload.items())}
+
+def run(model, output_type, rows, use_structured, batch_size):
+    """Wall time, outputs and per-row stats for one output type's prompts"""
+    outputs, stats = [], []
+    start = time.perf_counter()
+    for i in range(0, len(rows), batch_size):
+        chunk = rows[i:i + batch_size]
+        prompts = [prompt for prompt, _, _ in chunk]
+        types = [None if output_type == "unknown" else output_type] * len(chunk)
+        if use_structured:
+            outputs += model.run_batch(prompts, types, kwargs_list=[kwargs for _, kwargs, _ in chunk])
+        else:
+            outputs += model.run_batch(prompts, types, max_new_tokens_list=[budget for _, _, budget in chunk])
+        stats += model.last_batch_stats
+    return time.perf_counter() - start, outputs, stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark assisted decoding with a draft model")
+    parser.add_argument("--model", default="HuggingFaceTB/SmolLM2-360M-Instruct", help="Target model")
+    parser.add_argument("--draft-model", default="HuggingFaceTB/SmolLM2-135M-Instruct", help="Draft model")
+    parser.add_argument("--structured", action="store_true", help="Benchmark the constrained (outlines) path")
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--limit", type=int, default=16, help="Scenarios per output type (0 for all)")
+    args = parser.parse_args()
+
+    workload = load_workload(args.structured, args.limit)
+    model = create_model(args.model, args.structured)
+    draft = load_draft_model(args.draft_model, model.tokenizer, token=os.getenv("HUGGINGFACE_HUB_TOKEN"))
+
+    print(f"Target: {args.model}  Draft: {args.draft_model}  Structured: {args.structured}")
+    print(f"{'output type':>14} {'rows':>5} {'plain s':>8} {'assisted s':>11} {'speedup':>8} {'accepted':>9} "
+          f"{'tok/step':>9} {'same':>5}")
+    for output_type, rows in workload.items():
+        # Warm up, so schema compilation and first-call overheads land in neither measurement
+        model.draft_model = None
+        run(model, output_type, rows[:1], args.structured, 1)
+        plain, plain_outputs, _ = run(model, output_type, rows, args.structured, args.batch_size)
+        model.draft_model = draft
+        assisted, outputs, stats = run(model, output_type, rows, args.structured, args.batch_size)
+        drafted = sum(s.get("draft_tokens") or 0 for s in stats)
+        accepted = sum(s.get("accepted_draft_tokens") or 0 for s in stats)
+        steps = sum(s.get("target_steps") or 0 for s in stats)
+        generated = sum(s.get("generated_tokens") or 0 for s in stats)
+        same = sum(a == b for a, b in zip(outputs, plain_outputs))
+        print(f"{output_type:>14} {len(rows):5d} {plain:8.2f} {assisted:11.2f} {plain / assisted:7.2f}x "
+              f"{accepted / drafted if drafted else 0:9.1%} {generated / steps if steps else 0:9.2f} "
+              f"{same:>2}/{len(rows)}")
+
+if __name__ == "__main__":
+    main()
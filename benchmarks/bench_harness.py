@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Harness-overhead benchmark suite: everything except the model, offline on CPU.
+
+Runs scenario loading, output-type detection, evaluation, result serialization, batch
+scheduling and an end-to-end stub-backend run over synthetic corpora, reports
+microseconds per scenario and compares them against stored baselines.
+"""
+
+import sys
+import os
+import argparse
+import io
+import json
+import random
+import shutil
+import tempfile
+import time
+
+# Add the project root to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import yaml
+import runner
+import scenario_index
+from evaluators import get_evaluator
+from output_types import determine_output_type_and_kwargs, basic_output_type
+from results_sink import ResultsWriter, iter_results, summarize_results, write_json_report
+from models.stub_model import StubModel
+
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+CARDS = ["Lightning Bolt", "Counterspell", "Llanowar Elves", "Serra Angel", "Shock", "Opt",
+         "Giant Growth", "Dark Ritual", "Wrath of God", "Birds of Paradise"]
+
+def synthetic_scenarios(count, seed=0):
+    """A corpus with the same mix of answer shapes as the real scenarios"""
+    rng = random.Random(seed)
+    scenarios = []
+    for i in range(count):
+        a, b, c = rng.sample(CARDS, 3)
+        kind = i % 6
+        if kind == 0:
+            scenario = {"category": "rules", "subcategory": "card_types", "evaluator": "boolean",
+                        "prompt": f"Can {a} target {b} while {c} is on the battlefield? (case {i})",
+                        "expected_output": rng.choice(["yes", "no"]), "output_type": "boolean"}
+        elif kind == 1:
+            damage = rng.randint(0, 12)
+            scenario = {"category": "combat", "subcategory": "combat_math", "evaluator": "numeric",
+                        "prompt": f"A {damage + 2}/{damage + 2} trampler is blocked by a 2/2. "
+                                  f"How much damage does the defending player take? (case {i})",
+                        "expected_output": str(damage)}
+        elif kind == 2:
+            scenario = {"category": "draft", "subcategory": "pick_decision", "evaluator": "exact",
+                        "prompt": f"Pack 1, pick {i % 15 + 1}: which card do you take, choosing between {a}, {b}, and {c}.",
+                        "expected_output": a}
+        elif kind == 3:
+            scenario = {"category": "rules", "subcategory": "priority", "evaluator": "exact",
+                        "prompt": f"Which player receives priority after {a} resolves? (case {i})",
+                        "expected_output": rng.choice(["active player", "nonactive player"]),
+                        "output_type": "multiple_choice", "choices": ["active player", "nonactive player"]}
+        elif kind == 4:
+            scenario = {"category": "rules", "subcategory": "stack", "evaluator": "semantic",
+                        "prompt": f"Explain how {a} and {b} interact on the stack. (case {i})",
+                        "expected_output": f"{b} resolves first because the stack is last in, first out, "
+                                           f"so {a} is still waiting to resolve."}
+        else:
+            scenario = {"category": "rules", "subcategory": "zones", "evaluator": "contains",
+                        "prompt": f"Where does {a} go after it resolves? (case {i})",
+                        "expected_output": "graveyard"}
+        scenario["id"] = f"synthetic_{i:06d}"
+        scenarios.append(scenario)
+    return scenarios
+
+def write_corpus(scenarios, root):
+    """Write one YAML file per scenario, bucketed into subdirectories like the real tree"""
+    for scenario in scenarios:
+        directory = os.path.join(root, scenario["category"])
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"{scenario['id']}.yaml"), "w") as f:
+            yaml.safe_dump(scenario, f, sort_keys=False)
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+def bench_size(count, workdir):
+    """Run every benchmark for one corpus size; return {name: microseconds per scenario}"""
+    scenarios = synthetic_scenarios(count)
+    root = os.path.join(workdir, f"scenarios_{count}")
+    index_path = os.path.join(workdir, f"index_{count}.json")
+    write_corpus(scenarios, root)
+
+    seconds = {}
+    seconds["load_index_cold"], _ = timed(lambda: scenario_index.load_scenarios(root, index_path))
+    seconds["load_index_warm"], loaded = timed(lambda: scenario_index.load_scenarios(root, index_path))
+    seconds["output_types"], _ = timed(
+        lambda: [(determine_output_type_and_kwargs(s), basic_output_type(s)) for s in scenarios]
+    )
+
+    stub = StubModel.from_scenarios(scenarios, accuracy=0.8)
+    outputs = stub.run_batch([s["prompt"] for s in scenarios])
+    seconds["evaluate"], _ = timed(lambda: [
+        (get_evaluator(s["evaluator"])(o, s["expected_output"]), runner.calculate_similarity(o, s["expected_output"]))
+        for s, o in zip(scenarios, outputs)
+    ])
+
+    output_types, kwargs_list = runner.batch_output_types(loaded, True)
+    seconds["schedule"], _ = timed(lambda: runner.plan_batches(loaded, output_types, kwargs_list, False, 8))
+
+    results_path = os.path.join(workdir, f"results_{count}.jsonl")
+    seconds["end_to_end"], (results, _, _) = timed(lambda: runner.run_tests(
+        output_format=None, scenarios=loaded, cache_mode="off", backend="stub",
+        backend_options={"stub_accuracy": 0.8}, batch_size=8,
+    ))
+
+    def serialize():
+        writer = ResultsWriter(results_path)
+        for result in results:
+            writer.write(result)
+        writer.close()
+        summarize_results(iter_results(results_path))
+        write_json_report({"total_tests": count}, iter_results(results_path), io.StringIO())
+    seconds["serialize"], _ = timed(serialize)
+
+    return {name: value / count * 1e6 for name, value in seconds.items()}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark harness overhead with a stub model")
+    parser.add_argument("--sizes", default="1000,10000", help="Comma-separated corpus sizes (100000 is also baselined)")
+    parser.add_argument("--check", action="store_true", help="Exit 1 if any benchmark regressed against the baselines")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="Allowed slowdown over baseline before flagging a regression (0.5 = 50%%)")
+    parser.add_argument("--floor", type=float, default=2.0,
+                        help="Slowdowns smaller than this many microseconds per scenario are never regressions")
+    parser.add_argument("--update-baselines", action="store_true", help="Store these measurements as the new baselines")
+    args = parser.parse_args()
+
+    baselines = {}
+    if os.path.exists(BASELINES_PATH):
+        with open(BASELINES_PATH) as f:
+            baselines = json.load(f)
+
+    measured = {}
+    regressions = []
+    workdir = tempfile.mkdtemp(prefix="mtg_bench_")
+    try:
+        for count in [int(size) for size in args.sizes.split(",")]:
+            print(f"\n{count} scenarios (microseconds per scenario):")
+            for name, value in bench_size(count, workdir).items():
+                key = f"{name}@{count}"
+                measured[key] = round(value, 2)
+                line = f"  {name:>16}: {value:10.1f}"
+                if key in baselines:
+                    ratio = value / baselines[key] if baselines[key] else float("inf")
+                    line += f"  (baseline {baselines[key]:.1f}, x{ratio:.2f})"
+                    if ratio > 1 + args.tolerance and value - baselines[key] > args.floor:
+                        regressions.append(key)
+                        line += "  REGRESSION"
+                print(line)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.update_baselines:
+        baselines.update(measured)
+        with open(BASELINES_PATH, "w") as f:
+            json.dump(dict(sorted(baselines.items())), f, indent=2)
+            f.write("\n")
+        print(f"\nBaselines written to {BASELINES_PATH}")
+    if regressions:
+        print(f"\nRegressions over {args.tolerance:.0%} tolerance: {', '.join(regressions)}")
+        if args.check:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
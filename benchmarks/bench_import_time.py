@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark: `runner.py --help`, `import runner` and scenario loading.
+"""
+
+import sys
+import os
+import argparse
+import statistics
+import subprocess
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def time_command(cmd, repeats):
+    """Median wall time of a fresh interpreter running cmd"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run(cmd, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+def top_imports(limit):
+    """Slowest cumulative imports of `import runner`, from python -X importtime"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import runner"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = [part.strip() for part in line.split("|")]
+        rows.append((int(cumulative_us), name))
+    rows.sort(reverse=True)
+    return rows[:limit]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark runner cold-start latency")
+    parser.add_argument("--repeats", type=int, default=5, help="Runs per measurement (median is reported)")
+    parser.add_argument("--top", type=int, default=10, help="Number of slowest imports to list")
+    args = parser.parse_args()
+
+    help_time = time_command([sys.executable, "runner.py", "--help"], args.repeats)
+    import_time = time_command([sys.executable, "-c", "import runner"], args.repeats)
+    load_time = time_command(
+        [sys.executable, "-c", "import runner; runner.load_scenarios()"], args.repeats
+    )
+
+    print(f"runner.py --help:      {help_time * 1000:.1f} ms")
+    print(f"import runner:         {import_time * 1000:.1f} ms")
+    print(f"import + load YAMLs:   {load_time * 1000:.1f} ms")
+    print(f"\nSlowest imports (cumulative):")
+    for cumulative_us, name in top_imports(args.top):
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Results store benchmark: query times against a large synthetic history.
+
+Records --runs runs of --scenarios scenarios each, spread over a few models, then times
+every query the results_store CLI offers. They should all stay well under a second.
+"""
+
+import sys
+import os
+import argparse
+import random
+import tempfile
+import time
+
+# Add the project root to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from results_store import ResultsStore
+
+CATEGORIES = {"rules": ["card_types", "priority", "layers"], "combat": ["combat_math", "trample"],
+              "draft": ["pick_decision"]}
+EVALUATORS = ["exact", "contains", "numeric", "boolean", "semantic"]
+
+def synthetic_run(scenarios, skill, rng):
+    """One run's results; each scenario passes with a fixed per-scenario probability scaled by skill"""
+    for i, (category, subcategory, difficulty) in enumerate(scenarios):
+        yield {"id": f"{subcategory}_{i:06d}", "category": category, "subcategory": subcategory,
+               "evaluator": EVALUATORS[i % len(EVALUATORS)], "output_type": "free_text",
+               "passed": rng.random() < skill * difficulty, "actual_output": "Lightning Bolt",
+               "latency_seconds": rng.lognormvariate(-1, 0.5), "ttft_seconds": rng.lognormvariate(-3, 0.5)}
+
+def timed(label, query, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = query()
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:>42} {best * 1000:9.1f} ms  ({len(rows)} rows)")
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark results-store queries over a large history")
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--scenarios", type=int, default=10000)
+    parser.add_argument("--models", type=int, default=4)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    names = [(category, sub) for category, subs in CATEGORIES.items() for sub in subs]
+    scenarios = [(*rng.choice(names), rng.uniform(0.6, 1.0)) for _ in range(args.scenarios)]
+    models = [f"model-{i}" for i in range(args.models)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ResultsStore(os.path.join(tmp, "results.sqlite"))
+        start = time.perf_counter()
+        for run in range(args.runs):
+            model = models[run % len(models)]
+            store.record_run(synthetic_run(scenarios, 0.8 + 0.05 * (run % len(models)), rng), model,
+                             backend="stub", started_at=run * 3600.0)
+        recording = time.perf_counter() - start
+        size = os.path.getsize(store.path) / 2 ** 20
+        print(f"{args.runs} runs x {args.scenarios} scenarios recorded in {recording:.1f}s "
+              f"({recording / args.runs * 1000:.0f} ms per run), {size:.0f} MiB")
+
+        latest = store.select_runs(models[0])
+        last_ten = store.select_runs(models[0], last=10)
+        worst = max(
+            timed("runs", lambda: store.runs()),
+            timed("categories (latest run)", lambda: store.pass_rates(store.select_runs(models[0]))),
+            timed("categories by evaluator (last 10 runs)", lambda: store.pass_rates(last_ten, "evaluator")),
+            timed("delta (latest runs of two models)",
+                  lambda: store.delta(latest[0], store.select_runs(models[1])[0])["groups"]),
+            timed("flaky (all models, all runs)", lambda: store.flaky(limit=50)),
+            timed("latency (latest run)", lambda: store.latency(latest)),
+            timed("latency by category (last 10 runs)", lambda: store.latency(last_ten, "category")),
+        )
+        store.close()
+    print(f"Slowest query: {worst * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
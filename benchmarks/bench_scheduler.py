@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Batch scheduler benchmark: padding-token ratio and throughput, corpus order vs bucketed.
+"""
+
+import sys
+import os
+import argparse
+import time
+
+# Add the project root to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import runner
+from scheduler import approx_token_count, padding_stats
+
+def run_plan(model, scenarios, output_types, kwargs_list, batches, use_structured):
+    """Push every planned batch through the model and return wall time"""
+    start = time.perf_counter()
+    for rows in batches:
+        runner.run_model_batch(
+            model,
+            [scenarios[i]["prompt"] for i in rows],
+            [output_types[i] for i in rows],
+            [kwargs_list[i] for i in rows] if kwargs_list else None,
+            use_structured,
+        )
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batch scheduling")
+    parser.add_argument("--model", default=None,
+                        help="Also measure throughput with this model (padding is always reported)")
+    parser.add_argument("--tokenizer", action="store_true",
+                        help="Measure prompt lengths with the model's tokenizer instead of an estimate")
+    parser.add_argument("--batch-size", type=int, default=8, help="Batch size for inference")
+    parser.add_argument("--max-batch-tokens", type=int, default=None, help="Token budget per batch")
+    parser.add_argument("--structured", action="store_true", help="Use structured prompts and schemas")
+    args = parser.parse_args()
+
+    scenarios = runner.load_scenarios(use_index=True)
+    output_types, kwargs_list = runner.batch_output_types(scenarios, args.structured)
+    length_fn = runner.tokenizer_length_fn(args.model) if args.tokenizer and args.model else approx_token_count
+    lengths = [
+        length_fn(runner.model_prompt(s, output_types[i], kwargs_list[i] if kwargs_list else None, args.structured))
+        for i, s in enumerate(scenarios)
+    ]
+
+    plans = {
+        "sequential": runner.plan_batches(scenarios, output_types, kwargs_list, args.structured,
+                                          args.batch_size, "sequential"),
+        "bucketed": runner.plan_batches(scenarios, output_types, kwargs_list, args.structured,
+                                        args.batch_size, "bucketed", args.max_batch_tokens, length_fn),
+    }
+
+    model = runner.create_model(args.model, args.structured) if args.model else None
+    if model is not None:
+        # Warm up so weight loading and first-call overhead land in neither measurement
+        run_plan(model, scenarios, output_types, kwargs_list, plans["sequential"][:1], args.structured)
+
+    print(f"Scenarios: {len(scenarios)}  Batch size: {args.batch_size}  Token budget: {args.max_batch_tokens}")
+    for name, batches in plans.items():
+        stats = padding_stats(batches, lengths)
+        line = (f"{name:>10}: {stats['batches']:4d} batches, {stats['padded_tokens']} padded tokens, "
+                f"padding ratio {stats['padding_ratio']:.1%}")
+        if model is not None:
+            elapsed = run_plan(model, scenarios, output_types, kwargs_list, batches, args.structured)
+            line += f", {len(scenarios) / elapsed:.2f} scenarios/s"
+        print(line)
+
+if __name__ == "__main__":
+    main()
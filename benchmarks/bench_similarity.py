@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Similarity micro-benchmark: per-pair difflib ratio vs the threshold short-circuit and
+batched scoring, on short answers and on long explanation-length outputs.
+"""
+
+import sys
+import os
+import argparse
+import difflib
+import random
+import time
+
+# Add the project root to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import similarity
+
+WORDS = ("the creature attacker blocker damage trample first strike stack resolves priority player "
+         "spell ability trigger graveyard battlefield combat toughness power lethal assigns opponent").split()
+
+def sentence(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+def make_pairs(rng, count, output_words, expected_words, match_fraction):
+    """(output, expected) pairs; a fraction are light edits of the expected answer"""
+    pairs = []
+    for _ in range(count):
+        expected = sentence(rng, expected_words)
+        if rng.random() < match_fraction:
+            words = expected.split()
+            words[rng.randrange(len(words))] = rng.choice(WORDS)
+            output = " ".join(words)
+        else:
+            output = sentence(rng, output_words)
+        pairs.append((output, expected))
+    return pairs
+
+def timed(fn, pairs):
+    start = time.perf_counter()
+    fn(pairs)
+    return (time.perf_counter() - start) / len(pairs) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark similarity scoring")
+    parser.add_argument("--pairs", type=int, default=2000, help="Pairs per workload")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    # Word counts roughly follow the corpus: one-word answers, draft picks, 100-token explanations
+    workloads = {
+        "short answers": make_pairs(rng, args.pairs, 1, 1, 0.5),
+        "draft picks": make_pairs(rng, args.pairs, 6, 4, 0.5),
+        "explanations": make_pairs(rng, args.pairs, 80, 40, 0.2),
+    }
+
+    backends = ["difflib"]
+    try:
+        import rapidfuzz  # noqa: F401
+        backends.append("rapidfuzz")
+    except ImportError:
+        print("rapidfuzz not installed; skipping its backend")
+
+    print(f"{'workload':>14} {'backend':>10} {'ratio us':>10} {'threshold us':>13} {'batch us':>10}")
+    for name, pairs in workloads.items():
+        baseline = timed(lambda ps: [difflib.SequenceMatcher(None, a, b).ratio() > 0.8 for a, b in ps], pairs)
+        print(f"{name:>14} {'(per pair)':>10} {baseline:10.1f}")
+        for backend in backends:
+            similarity.set_backend(backend)
+            threshold = timed(lambda ps: [similarity.exceeds(a, b) for a, b in ps], pairs)
+            batch = timed(similarity.batch_ratios, pairs)
+            print(f"{name:>14} {backend:>10} {'':>10} {threshold:13.1f} {batch:10.1f}")
+    similarity.set_backend("difflib")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark: batched constrained decoding vs the per-prompt loop in OutlinesModel.
+"""
+
+import sys
+import os
+import argparse
+import glob
+import time
+
+# Add the project root to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import yaml
+from models.outlines_model import OutlinesModel
+from runner import determine_output_type_and_kwargs
+
+def load_workload(limit):
+    """Collect (prompt, output_type, kwargs) triples from the scenario corpus"""
+    workload = []
+    for file in sorted(glob.glob("scenarios/**/*.yaml", recursive=True)):
+        with open(file) as f:
+            scenario = yaml.safe_load(f)
+        output_type, kwargs = determine_output_type_and_kwargs(scenario)
+        workload.append((scenario["prompt"], output_type, kwargs))
+    return workload[:limit] if limit else workload
+
+def time_batches(run_fn, workload, batch_size):
+    """Return wall time for pushing the whole workload through run_fn in batches"""
+    start = time.perf_counter()
+    for i in range(0, len(workload), batch_size):
+        chunk = workload[i:i + batch_size]
+        run_fn([w[0] for w in chunk], [w[1] for w in chunk], [w[2] for w in chunk])
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batched structured generation")
+    parser.add_argument("--model", default="facebook/opt-125m", help="Model name to use")
+    parser.add_argument("--batch-size", type=int, default=8, help="Batch size for inference")
+    parser.add_argument("--limit", type=int, default=32, help="Number of scenarios to run (0 for all)")
+    args = parser.parse_args()
+
+    workload = load_workload(args.limit)
+    model = OutlinesModel(args.model)
+
+    # Warm up both paths so one-off compilation does not land in either measurement
+    warmup = workload[:2]
+    model._run_batch_sequential([w[0] for w in warmup], [w[1] for w in warmup], [w[2] for w in warmup])
+    model.run_batch([w[0] for w in warmup], [w[1] for w in warmup], kwargs_list=[w[2] for w in warmup])
+
+    sequential = time_batches(model._run_batch_sequential, workload, args.batch_size)
+    batched = time_batches(
+        lambda p, o, k: model.run_batch(p, o, kwargs_list=k), workload, args.batch_size
+    )
+
+    print(f"Model: {args.model}")
+    print(f"Scenarios: {len(workload)}  Batch size: {args.batch_size}")
+    print(f"Sequential loop: {sequential:.2f}s ({len(workload) / sequential:.2f} prompts/s)")
+    print(f"Batched decode:  {batched:.2f}s ({len(workload) / batched:.2f} prompts/s)")
+    print(f"Speedup: {sequential / batched:.2f}x")
+
+if __name__ == "__main__":
+    main()
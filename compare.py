@@ -0,0 +1,126 @@
+"""
+Side-by-side model comparison: parse and schedule the scenarios once, then run every model over them.
+
+Models run one after another in this process by default, with each model's weights
+released before the next one loads. Small models can instead run concurrently in
+separate worker processes (``workers > 1``). Results from every model are merged into a
+single comparison report keyed by scenario.
+"""
+
+import json
+import multiprocessing
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import runner
+from scheduler import approx_token_count
+
+
+def run_model(model_name: str, scenarios: List[Dict], batches: List[List[int]], run_kwargs: Dict) -> Dict:
+    """Run one model over the pre-scheduled scenarios (also the worker-process entry point)"""
+    start = time.time()
+    results, passed, total = runner.run_tests(
+        model_name=model_name, output_format=None, scenarios=scenarios, batches=batches, **run_kwargs
+    )
+    return {
+        "model_name": model_name,
+        "results": results,
+        "passed": passed,
+        "total": total,
+        "time_seconds": time.time() - start,
+    }
+
+
+def compare_models(model_names: List[str], scenarios: List[Dict], batches: List[List[int]],
+                   run_kwargs: Dict, workers: int = 1) -> List[Dict]:
+    """Run every model over the same scenarios and batches, in order or in worker processes"""
+    if workers <= 1 or len(model_names) == 1:
+        runs = []
+        for model_name in model_names:
+            print(f"Running {model_name}...", file=sys.stderr)
+            runs.append(run_model(model_name, scenarios, batches, run_kwargs))
+        return runs
+
+    # Fill the vector cache once so concurrent models only read it
+    runner.semantic_evaluator(scenarios, run_kwargs.get("semantic", "fuzzy"), run_kwargs.get("semantic_options"))
+    # Spawn rather than fork so each worker initialises CUDA on its own
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        futures = [pool.submit(run_model, name, scenarios, batches, run_kwargs) for name in model_names]
+        return [future.result() for future in futures]
+
+
+def comparison_report(runs: List[Dict], scenarios: List[Dict]) -> Dict:
+    """Merge per-model results into one report: model summaries plus a per-scenario matrix"""
+    models = [
+        {
+            "model_name": run["model_name"],
+            "passed": run["passed"],
+            "total": run["total"],
+            "pass_rate": (run["passed"] / run["total"] * 100) if run["total"] > 0 else 0,
+            "time_seconds": run["time_seconds"],
+        }
+        for run in runs
+    ]
+
+    # run_tests reports results in corpus order, so row i of every run is scenario i
+    rows = []
+    for i, scenario in enumerate(scenarios):
+        rows.append({
+            "id": scenario["id"],
+            "category": scenario.get("category", "unknown"),
+            "expected_output": scenario["expected_output"],
+            "outputs": {run["model_name"]: run["results"][i]["actual_output"] for run in runs},
+            "passed": {run["model_name"]: run["results"][i]["passed"] for run in runs},
+        })
+    disagreements = [row["id"] for row in rows if len(set(row["passed"].values())) > 1]
+    return {"models": models, "scenarios": rows, "disagreements": disagreements}
+
+
+def print_comparison(report: Dict, output_format: str):
+    """Print a comparison report in the runner's simple, detailed or JSON format"""
+    if output_format == "json":
+        json.dump(report, sys.stdout, indent=2)
+        return
+
+    if output_format == "detailed":
+        for row in report["scenarios"]:
+            marks = "  ".join(f"{name}={'PASS' if ok else 'FAIL'}" for name, ok in row["passed"].items())
+            print(f"{row['id']}: {marks}")
+            print(f"  Expected: {row['expected_output']}")
+            for name, output in row["outputs"].items():
+                print(f"  {name}: {output}")
+            print()
+
+    print(f"\n--- COMPARISON ---")
+    for model in report["models"]:
+        print(f"{model['model_name']}: {model['passed']}/{model['total']} passed "
+              f"({model['pass_rate']:.2f}%) in {model['time_seconds']:.2f} seconds")
+    print(f"Scenarios where models disagree: {len(report['disagreements'])}")
+    for scenario_id in report["disagreements"]:
+        print(f"  {scenario_id}")
+
+
+def run_comparison(model_names: List[str], output_format: str = "simple", batch_size: int = 4,
+                   use_structured: bool = False, schedule: str = "bucketed",
+                   max_batch_tokens: Optional[int] = None, use_index: bool = True,
+                   index_path: Optional[str] = None, workers: int = 1, report_file: Optional[str] = None,
+                   **run_kwargs) -> Dict:
+    """Parse and schedule the corpus once, run every model over it and print the comparison"""
+    scenarios = runner.load_scenarios(use_index=use_index, index_path=index_path)
+    output_types, kwargs_list = runner.batch_output_types(scenarios, use_structured)
+    # Models may not share a tokenizer, so the shared plan uses the token estimate
+    batches = runner.plan_batches(scenarios, output_types, kwargs_list, use_structured, batch_size,
+                                  schedule, max_batch_tokens, approx_token_count, run_kwargs.get("preamble"))
+
+    run_kwargs = dict(run_kwargs, batch_size=batch_size, use_structured=use_structured)
+    runs = compare_models(model_names, scenarios, batches, run_kwargs, workers)
+    report = comparison_report(runs, scenarios)
+
+    if report_file:
+        with open(report_file, "w") as f:
+            json.dump(report, f, indent=2)
+    print_comparison(report, output_format)
+    return report
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Resident model worker: keeps a model loaded (with its compiled schemas and prefix cache)
+and serves batches to runner.py over a Unix socket.
+
+    python daemon.py &                   # serve on .mtg_cache/daemon.sock
+    python runner.py --daemon ...        # generate through it instead of loading the model
+    python daemon.py --stop
+
+One model is resident at a time. A request for a different model (or different load
+options) unloads the current one first. Requests from all clients are served one at a
+time, since they share one model.
+"""
+
+import argparse
+import json
+import os
+import socketserver
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from models.lazy_model import LazyModel
+from models.remote_model import DEFAULT_SOCKET_PATH, daemon_request, daemon_running
+
+METHODS = {"run", "run_batch", "sample_batch", "score_batch"}
+
+
+class ModelHost:
+    """The resident model and the requests it has served"""
+
+    def __init__(self):
+        self.spec: Optional[Dict[str, Any]] = None
+        self.model: Optional[LazyModel] = None
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.loads = 0
+        self.requests = 0
+
+    def _model_for(self, spec: Dict[str, Any]) -> LazyModel:
+        if spec != self.spec:
+            self.close()
+            import runner
+            # The stub answers from the scenarios on this worker's disk
+            scenarios = runner.load_scenarios() if spec.get("backend") == "stub" else None
+            self.model = LazyModel(lambda: runner.create_model(scenarios=scenarios, **spec))
+            self.spec = spec
+            self.loads += 1
+        return self.model
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "pid": os.getpid(),
+            "uptime_seconds": time.time() - self.started,
+            "model": self.spec,
+            "loaded": bool(self.model and self.model.loaded),
+            "load_seconds": self.model.load_seconds if self.model else 0.0,
+            "loads": self.loads,
+            "requests": self.requests,
+        }
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        method = request.get("method")
+        if method == "status":
+            return {"result": self.status()}
+        if method not in METHODS:
+            raise ValueError(f"Unknown method {method!r}")
+        with self.lock:
+            model = self._model_for(request["model"])
+            instance = model.get()
+            saved_before = getattr(instance, "prefill_tokens_saved", 0)
+            result = getattr(instance, method)(*request.get("args", []), **request.get("kwargs", {}))
+            self.requests += 1
+            return {
+                "result": result,
+                "last_batch_stats": getattr(instance, "last_batch_stats", None),
+                "prefill_tokens_saved": getattr(instance, "prefill_tokens_saved", 0) - saved_before,
+            }
+
+    def close(self):
+        if self.model is not None:
+            self.model.unload()
+        self.model = self.spec = None
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                if request.get("method") == "shutdown":
+                    reply = {"result": "stopping"}
+                    # shutdown() waits for serve_forever, so it cannot run on the serving thread
+                    threading.Thread(target=self.server.shutdown, daemon=True).start()
+                else:
+                    reply = self.server.host.handle(request)
+            except Exception as e:
+                reply = {"error": f"{type(e).__name__}: {e}"}
+            self.wfile.write(json.dumps(reply).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+
+class ModelServer(socketserver.ThreadingUnixStreamServer):
+    """Unix-socket server around a ModelHost; one thread per client connection"""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET_PATH):
+        if os.path.exists(socket_path):
+            if daemon_running(socket_path):
+                raise RuntimeError(f"A model daemon is already running at {socket_path}")
+            # Left behind by a daemon that did not shut down cleanly
+            os.unlink(socket_path)
+        os.makedirs(os.path.dirname(socket_path) or ".", exist_ok=True)
+        self.socket_path = socket_path
+        self.host = ModelHost()
+        super().__init__(socket_path, _Handler)
+
+    def server_close(self):
+        super().server_close()
+        self.host.close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+def serve_in_background(socket_path: str) -> ModelServer:
+    """Start a ModelServer on a thread of this process; stop it with shutdown() and server_close()"""
+    server = ModelServer(socket_path)
+    threading.Thread(target=server.serve_forever, name="model-daemon", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep a model resident and serve runner.py over a Unix socket")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH, help="Unix socket path")
+    parser.add_argument("--status", action="store_true", help="Print the running daemon's status and exit")
+    parser.add_argument("--stop", action="store_true", help="Stop the running daemon and exit")
+    args = parser.parse_args()
+
+    if args.status or args.stop:
+        if not daemon_running(args.socket):
+            print(f"No model daemon at {args.socket}", file=sys.stderr)
+            sys.exit(1)
+        reply = daemon_request(args.socket, {"method": "shutdown" if args.stop else "status"})
+        print(json.dumps(reply["result"], indent=2))
+        return
+
+    server = ModelServer(args.socket)
+    print(f"Model daemon listening on {args.socket} (pid {os.getpid()})", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,8 @@
-import difflib
 import re
 import json
 
+from similarity import exceeds, SEMANTIC_THRESHOLD
+
 def _clean_response(response):
     """Clean response to extract actual answer from JSON if needed"""
     response = response.strip()
@@ -47,8 +48,8 @@ def semantic(output, expected):
     # Simple fuzzy matching using SequenceMatcher
     # FIXME: This is a placeholder for a more sophisticated semantic evaluation
     clean_output = _clean_response(output)
-    ratio = difflib.SequenceMatcher(None, clean_output.strip().lower(), expected.strip().lower()).ratio()
-    return ratio > 0.8  # Consider "semantic match" if similarity > 80%
+    # Consider "semantic match" if similarity > 80%
+    return exceeds(clean_output.strip().lower(), expected.strip().lower(), SEMANTIC_THRESHOLD)
 
 def numeric_comparison(output, expected):
     """Compare numeric values, handling various formats"""
@@ -0,0 +1,61 @@
+"""
+Per-batch peak memory measurement (process RSS and accelerator memory).
+
+Peaks are reset at the start of every batch so each batch reports its own high-water
+mark. torch is only consulted if a model backend has already imported it.
+"""
+
+import resource
+import sys
+from typing import Dict, Optional
+
+# Per-scenario metrics copied from the model's last_batch_stats into each result record
+METRIC_FIELDS = [
+    "prompt_tokens",
+    "generated_tokens",
+    "prefill_seconds",
+    "ttft_seconds",
+    "decode_seconds",
+    "latency_seconds",
+    "tokens_per_second",
+    # Assisted decoding (--draft-model) only
+    "draft_tokens",
+    "accepted_draft_tokens",
+    "target_steps",
+]
+
+
+def _rss_high_water_mb() -> Optional[float]:
+    """Peak RSS since the last reset (Linux VmHWM), else the process-lifetime peak"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def reset_peak_memory():
+    """Start a new high-water mark for RSS and accelerator memory"""
+    try:
+        # Writing 5 to clear_refs resets VmHWM to the current RSS (Linux 4.0+)
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+    torch = sys.modules.get("torch")
+    if torch is not None and torch.cuda.is_available():
+        torch.cuda.reset_peak_memory_stats()
+
+
+def peak_memory() -> Dict[str, Optional[float]]:
+    """Peak RSS and accelerator memory (MiB) since the last reset_peak_memory()"""
+    accelerator = None
+    torch = sys.modules.get("torch")
+    if torch is not None and torch.cuda.is_available():
+        accelerator = sum(torch.cuda.max_memory_allocated(d) for d in range(torch.cuda.device_count())) / (1024 * 1024)
+    return {"peak_rss_mb": _rss_high_water_mb(), "peak_accelerator_mb": accelerator}
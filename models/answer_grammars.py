@@ -0,0 +1,146 @@
+"""
+Bare answer grammars: constrain each output type straight to its answer text.
+
+The JSON schemas in ``structured_schemas`` make the model spend most of its decode steps
+on braces, quotes and key names. In ``bare`` constraint mode each output type is
+compiled to a regex over the answer itself (``yes|no``, a digit range, an alternation of
+options), so a closed answer is only a handful of tokens.
+"""
+
+import re
+from typing import Any, Dict, List, get_args
+
+CONSTRAINT_MODES = ["json", "bare"]
+
+# Free-text types still need some bound; answers never span lines in bare mode
+_FREE_TEXT = {
+    "simple": r"[^\n]{1,60}",
+    "draft_pick": r"[^\n]{1,60}",
+    "explanation": r"[^\n]{1,600}",
+}
+
+
+def _same_length_range(low: str, high: str) -> str:
+    """Regex for the integers between two equal-length digit strings"""
+    if low == high:
+        return low
+    if len(low) == 1:
+        return f"[{low}-{high}]"
+    if low[0] == high[0]:
+        return low[0] + _same_length_range(low[1:], high[1:])
+    rest = len(low) - 1
+    if low[1:] == "0" * rest and high[1:] == "9" * rest:
+        return f"[{low[0]}-{high[0]}][0-9]{{{rest}}}"
+    parts = [low[0] + _same_length_range(low[1:], "9" * rest)]
+    if int(high[0]) - int(low[0]) > 1:
+        parts.append(f"[{int(low[0]) + 1}-{int(high[0]) - 1}][0-9]{{{rest}}}")
+    parts.append(high[0] + _same_length_range("0" * rest, high[1:]))
+    return "(?:" + "|".join(parts) + ")"
+
+
+def _non_negative_range(low: int, high: int) -> List[str]:
+    """Alternatives matching low..high (0 <= low <= high), one per digit count"""
+    parts = []
+    for digits in range(len(str(low)), len(str(high)) + 1):
+        start = max(low, 10 ** (digits - 1) if digits > 1 else 0)
+        end = min(high, 10 ** digits - 1)
+        parts.append(_same_length_range(str(start), str(end)))
+    return parts
+
+
+def numeric_range_regex(min_val: int, max_val: int) -> str:
+    """Regex matching exactly the integers in [min_val, max_val], without leading zeros"""
+    low, high = int(min_val), int(max_val)
+    if low > high:
+        raise ValueError(f"Empty numeric range: {min_val}..{max_val}")
+    parts = []
+    if low < 0:
+        parts += ["-" + part for part in _non_negative_range(max(1, -high), -low)]
+    if high >= 0:
+        parts += _non_negative_range(max(0, low), high)
+    return "(?:" + "|".join(parts) + ")"
+
+
+def choice_regex(options: List[str]) -> str:
+    """Regex matching exactly one of the given strings"""
+    return "(?:" + "|".join(re.escape(str(option)) for option in options) + ")"
+
+
+def _literal_values(schema, field: str) -> List[str]:
+    return list(get_args(schema.model_fields[field].annotation))
+
+
+def bare_answer_regex(output_type: str, kwargs: Dict[str, Any]) -> str:
+    """Compile an output type (and its schema kwargs) to a regex over the bare answer text"""
+    if output_type == "boolean":
+        return "(?:yes|no)"
+    if output_type == "card_selection" and kwargs.get("options"):
+        return choice_regex(kwargs["options"])
+    if output_type == "multiple_choice" and kwargs.get("choices"):
+        return choice_regex(kwargs["choices"])
+    if output_type == "numeric_range" and "min_val" in kwargs and "max_val" in kwargs:
+        return numeric_range_regex(kwargs["min_val"], kwargs["max_val"])
+    if output_type in ("numeric", "numeric_range"):
+        return r"-?[0-9]{1,6}"
+    if output_type == "combat_assignment":
+        return r"[0-9]{1,3}"
+    if output_type == "mana_cost":
+        return r"(?:[0-9]{1,2}[WUBRGCX]{0,8}|[WUBRGCX]{1,8})"
+    if output_type in ("phase", "card_type", "zone"):
+        from models.structured_schemas import PhaseAnswer, CardTypeAnswer, ZoneAnswer
+        schema = {"phase": PhaseAnswer, "card_type": CardTypeAnswer, "zone": ZoneAnswer}[output_type]
+        return choice_regex(_literal_values(schema, output_type))
+    return _FREE_TEXT.get(output_type, _FREE_TEXT["simple"])
+
+
+def _gbnf_string(text: str) -> str:
+    return '"' + text.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+
+
+def regex_to_gbnf(regex: str) -> str:
+    """Translate a bare answer regex to a GBNF grammar (llama.cpp's ``grammar`` field).
+
+    Only the regex subset the bare grammars use is supported: literals and escapes,
+    ``(?:...)`` groups, alternation, character classes and ``? * + {m,n}`` quantifiers.
+    """
+    # Each atom is [text, is_literal]; adjacent unquantified literals are merged at the end
+    atoms = []
+    i = 0
+    while i < len(regex):
+        char = regex[i]
+        if char == "\\":
+            escaped = regex[i + 1]
+            atoms.append(["\n" if escaped == "n" else escaped, True])
+            i += 2
+        elif char == "[":
+            end = regex.index("]", i + 2)
+            atoms.append([regex[i:end + 1], False])
+            i = end + 1
+        elif char == "(":
+            i += 3 if regex.startswith("(?:", i) else 1
+            atoms.append(["(", False])
+        elif char in ")|":
+            atoms.append([char, False])
+            i += 1
+        elif char in "?*+{":
+            end = regex.index("}", i) + 1 if char == "{" else i + 1
+            quantifier = regex[i:end]
+            if atoms[-1][1]:
+                atoms[-1] = [_gbnf_string(atoms[-1][0]), False]
+            atoms[-1][0] += quantifier
+            i = end
+        else:
+            atoms.append([char, True])
+            i += 1
+    parts, literal = [], ""
+    for text, is_literal in atoms:
+        if is_literal:
+            literal += text
+            continue
+        if literal:
+            parts.append(_gbnf_string(literal))
+            literal = ""
+        parts.append(text)
+    if literal:
+        parts.append(_gbnf_string(literal))
+    return "root ::= " + " ".join(parts).replace("( ", "(").replace(" )", ")")
@@ -0,0 +1,116 @@
+"""
+Assisted (speculative) decoding with a small draft model for long-form answers.
+
+The draft model proposes a few tokens. The target model checks all of them in one forward
+pass and keeps the longest prefix it agrees with, plus one token of its own. Greedy output
+is the same as without a draft. transformers only runs assisted generation one sequence at
+a time, so long-form rows are taken out of the padded batch and decoded one by one, while
+short answers stay batched.
+"""
+
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence
+
+from transformers import AutoModelForCausalLM, AutoTokenizer, LogitsProcessor
+
+from models.prompting import ASSISTED_OUTPUT_TYPES, ASSISTED_MIN_NEW_TOKENS
+
+
+def load_draft_model(model_name: str, target_tokenizer, revision: str = "main", token: Optional[str] = None):
+    """Load a draft model, refusing one whose tokenizer differs from the target's"""
+    tokenizer = AutoTokenizer.from_pretrained(model_name, revision=revision, use_auth_token=token)
+    if tokenizer.get_vocab() != target_tokenizer.get_vocab():
+        raise ValueError(f"Draft model {model_name} does not share the target model's tokenizer")
+    return AutoModelForCausalLM.from_pretrained(model_name, revision=revision, torch_dtype="auto",
+                                                device_map="auto", use_auth_token=token)
+
+
+def draft_rows(output_types: Sequence[Optional[str]], budgets: Optional[Sequence[int]] = None) -> List[int]:
+    """Rows with long free-text answers, where drafting pays for the lost batching"""
+    return [
+        row for row, output_type in enumerate(output_types)
+        if output_type in ASSISTED_OUTPUT_TYPES or (budgets and budgets[row] >= ASSISTED_MIN_NEW_TOKENS)
+    ]
+
+
+def run_with_draft(count: int, assisted_rows: List[int], run: Callable):
+    """Generate the assisted rows one at a time and every other row as one batch.
+
+    ``run(rows, assisted)`` generates the given row indices and returns ``(texts, stats)``.
+    Texts and stats come back in row order.
+    """
+    texts, stats = [None] * count, [None] * count
+    assisted = set(assisted_rows)
+    groups = [([row for row in range(count) if row not in assisted], False)]
+    groups += [([row], True) for row in assisted_rows]
+    for rows, use_draft in groups:
+        if not rows:
+            continue
+        row_texts, row_stats = run(rows, use_draft)
+        for row, text, row_stat in zip(rows, row_texts, row_stats):
+            texts[row] = text
+            stats[row] = row_stat
+    return texts, stats
+
+
+class ForwardCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, module, args, output):
+        self.count += 1
+
+
+@contextmanager
+def count_forwards(model):
+    """Count the model's forward passes inside the block"""
+    counter = ForwardCounter()
+    handle = model.register_forward_hook(counter)
+    try:
+        yield counter
+    finally:
+        handle.remove()
+
+
+def assisted_generate(model, draft_model, inputs: Dict, **generate_kwargs):
+    """generate() a single row with the draft model; returns the output ids and draft statistics"""
+    with count_forwards(model) as target, count_forwards(draft_model) as draft:
+        outputs = model.generate(**inputs, assistant_model=draft_model, **generate_kwargs)
+    generated = outputs.shape[1] - inputs["input_ids"].shape[1]
+    return outputs, draft_stats(generated, target.count, draft.count)
+
+
+def draft_stats(generated_tokens: int, target_steps: int, draft_tokens: int) -> Dict[str, int]:
+    """Each target pass keeps its accepted draft tokens plus one token of its own"""
+    accepted = max(0, min(draft_tokens, generated_tokens - target_steps))
+    return {"draft_tokens": draft_tokens, "accepted_draft_tokens": accepted, "target_steps": target_steps}
+
+
+class ReplayingProcessor(LogitsProcessor):
+    """Drive a step-by-step constraint processor from sequences that may be rewound.
+
+    Assisted decoding runs the logits processors over every candidate position and then
+    drops the rejected candidates, so the sequence a processor sees can go back or branch.
+    Outlines processors only move forward one token per call. Whenever a call does not
+    extend the previous one by exactly one token, the inner processor is reset and replayed
+    over the tokens actually in the sequence. Every kept token is therefore still checked
+    against the schema. Single-row batches only.
+    """
+
+    def __init__(self, processor):
+        self.processor = processor
+        self.start = None
+        self.seen = None
+        self.replays = 0
+
+    def __call__(self, input_ids, scores):
+        ids = input_ids[0].tolist()
+        if self.start is None:
+            self.start = len(ids)
+        elif ids[:-1] != self.seen:
+            self.processor.reset()
+            self.replays += 1
+            for length in range(self.start, len(ids)):
+                self.processor(input_ids[:, :length], scores.clone())
+        self.seen = ids
+        return self.processor(input_ids, scores)
@@ -0,0 +1,104 @@
+"""
+Log-likelihood scoring of closed answer sets: rank known candidates instead of decoding.
+"""
+
+from typing import Dict, List
+
+import torch
+
+
+class CandidateScorer:
+    """Pick each prompt's answer from a fixed candidate list by length-normalized log-prob.
+
+    Every prompt is prefilled once (on top of the shared-prefix KV cache when one is given);
+    its KV cache is then fanned out to one row per candidate and all candidate tokens are
+    scored in a single further forward pass. No decode loop is run.
+    """
+
+    def __init__(self, model, tokenizer, prefix_cache=None):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.prefix_cache = prefix_cache
+
+    def _candidate_ids(self, prompt: str, prompt_ids: List[int], candidate: str) -> List[int]:
+        """Token ids the model would produce for the candidate right after the prompt"""
+        full_ids = self.tokenizer(f"{prompt} {candidate}").input_ids
+        if full_ids[:len(prompt_ids)] == prompt_ids and len(full_ids) > len(prompt_ids):
+            return full_ids[len(prompt_ids):]
+        # The candidate merged with the end of the prompt; tokenize it on its own instead
+        return self.tokenizer(f" {candidate}", add_special_tokens=False).input_ids
+
+    def _prefill(self, prompts: List[str]):
+        """Prefill every prompt; return (attention mask, KV cache, next-token logits)"""
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        if self.prefix_cache is not None:
+            inputs = self.prefix_cache.prepare_batch(prompts)
+        else:
+            self.tokenizer.padding_side = "left"
+            inputs = self.tokenizer(prompts, return_tensors="pt", padding=True).to(self.model.device)
+
+        input_ids = inputs["input_ids"]
+        attention_mask = inputs["attention_mask"]
+        past = inputs.get("past_key_values")
+        # Tokens already in the shared-prefix cache are not fed again
+        offset = past.get_seq_length() if past is not None else 0
+        position_ids = (attention_mask.cumsum(-1) - 1).clamp(min=0)
+        outputs = self.model(
+            input_ids=input_ids[:, offset:],
+            attention_mask=attention_mask,
+            position_ids=position_ids[:, offset:],
+            past_key_values=past,
+            use_cache=True,
+        )
+        return attention_mask, outputs.past_key_values, outputs.logits[:, -1, :]
+
+    @torch.no_grad()
+    def score_batch(self, prompts: List[str], candidates_list: List[List[str]]) -> List[Dict]:
+        """Score every prompt's candidates; return answer, confidence and distribution per prompt"""
+        attention_mask, past, next_logits = self._prefill(prompts)
+
+        # One row per (prompt, candidate), right-padded to the longest candidate
+        row_prompt, row_ids = [], []
+        for p, (prompt, candidates) in enumerate(zip(prompts, candidates_list)):
+            prompt_ids = self.tokenizer(prompt).input_ids
+            for candidate in candidates:
+                row_prompt.append(p)
+                row_ids.append(self._candidate_ids(prompt, prompt_ids, candidate))
+        width = max(len(ids) for ids in row_ids)
+        device = self.model.device
+        pad_id = self.tokenizer.pad_token_id
+        candidate_ids = torch.tensor([ids + [pad_id] * (width - len(ids)) for ids in row_ids], device=device)
+        candidate_mask = torch.tensor([[1] * len(ids) + [0] * (width - len(ids)) for ids in row_ids], device=device)
+        index = torch.tensor(row_prompt, device=device)
+
+        # Fan each prompt's KV cache out to its candidate rows
+        past.batch_select_indices(index)
+        prompt_mask = attention_mask[index]
+        prompt_lengths = prompt_mask.sum(-1, keepdim=True)
+        outputs = self.model(
+            input_ids=candidate_ids,
+            attention_mask=torch.cat([prompt_mask, candidate_mask], dim=1),
+            position_ids=prompt_lengths + torch.arange(width, device=device),
+            past_key_values=past,
+        )
+
+        # Candidate token j is predicted by the prompt's last logits (j = 0) or by candidate token j - 1
+        logits = torch.cat([next_logits[index].unsqueeze(1), outputs.logits[:, :-1, :]], dim=1)
+        log_probs = torch.log_softmax(logits.float(), dim=-1)
+        token_log_probs = log_probs.gather(-1, candidate_ids.unsqueeze(-1)).squeeze(-1) * candidate_mask
+        normalized = token_log_probs.sum(-1) / candidate_mask.sum(-1)
+
+        results = []
+        start = 0
+        for candidates in candidates_list:
+            scores = normalized[start:start + len(candidates)]
+            start += len(candidates)
+            probabilities = torch.softmax(scores, dim=0).tolist()
+            best = max(range(len(candidates)), key=lambda i: probabilities[i])
+            results.append({
+                "answer": candidates[best],
+                "confidence": probabilities[best],
+                "distribution": dict(zip(candidates, probabilities)),
+            })
+        return results
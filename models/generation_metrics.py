@@ -0,0 +1,62 @@
+"""
+Per-row latency metrics for batched ``generate`` calls.
+"""
+
+import time
+from typing import Dict, List, Optional
+
+import torch
+from transformers import LogitsProcessor, StoppingCriteria
+
+
+class _PrefillMark(LogitsProcessor):
+    def __init__(self, timer):
+        self.timer = timer
+
+    def __call__(self, input_ids, scores):
+        if self.timer.prefill_done is None:
+            self.timer.prefill_done = time.perf_counter()
+        return scores
+
+
+class _StepMark(StoppingCriteria):
+    def __init__(self, timer):
+        self.timer = timer
+
+    def __call__(self, input_ids, scores, **kwargs):
+        self.timer.steps.append(time.perf_counter())
+        # Never stops a row by itself
+        return torch.zeros(input_ids.shape[0], dtype=torch.bool, device=input_ids.device)
+
+
+class GenerationTimer:
+    """Timestamp the prefill and every decode step of one generate() call.
+
+    Pass ``logits_processor`` first in the processor list (so constraint masking counts as
+    decode time) and ``stopping_criteria`` in the stopping list. generate() synchronises
+    on every step to check for finished rows, so the timestamps follow the device.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.prefill_done: Optional[float] = None
+        self.steps: List[float] = []
+        self.logits_processor = _PrefillMark(self)
+        self.stopping_criteria = _StepMark(self)
+
+    def row_metrics(self, prompt_tokens: int, generated_tokens: int) -> Dict:
+        """Latency breakdown for a row that produced generated_tokens tokens"""
+        metrics = {"prompt_tokens": prompt_tokens, "generated_tokens": generated_tokens}
+        if not self.steps:
+            return metrics
+        first = self.steps[0]
+        last = self.steps[min(max(generated_tokens, 1), len(self.steps)) - 1]
+        latency = last - self.start
+        metrics.update({
+            "prefill_seconds": (self.prefill_done or first) - self.start,
+            "ttft_seconds": first - self.start,
+            "decode_seconds": last - first,
+            "latency_seconds": latency,
+            "tokens_per_second": generated_tokens / latency if latency > 0 else None,
+        })
+        return metrics
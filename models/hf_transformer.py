@@ -1,35 +1,177 @@
-from transformers import AutoTokenizer, AutoModelForCausalLM, pipeline
+from transformers import AutoTokenizer, AutoModelForCausalLM, StoppingCriteria, StoppingCriteriaList, LogitsProcessorList
+from models.prefix_cache import PrefixCache
+from models.generation_metrics import GenerationTimer
+from models.sampling import SAMPLING_KWARGS, prefill_and_expand, merge_sample_stats
+from models.assisted import load_draft_model, draft_rows, run_with_draft, assisted_generate
+from profiling import span
+from models.prompting import UNSTRUCTURED_GENERATION_KWARGS, STOP_PATTERNS, decode_budget
 import os
-from typing import List, Union
+import re
+import torch
+from typing import List, Union, Optional
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
+class AnswerStoppingCriteria(StoppingCriteria):
+    """Stop each row once it has a complete answer for its output type or hits its own budget.
+
+    Rows in one batch can have different budgets and stop patterns; a finished row is
+    padded by generate() while the others continue, and the whole call ends when every
+    row is done.
+    """
+
+    def __init__(self, tokenizer, prompt_length: int, output_types: List[str], budgets: List[int]):
+        self.tokenizer = tokenizer
+        self.prompt_length = prompt_length
+        self.budgets = budgets
+        self.patterns = [
+            re.compile(STOP_PATTERNS[t], re.IGNORECASE) if t in STOP_PATTERNS else None
+            for t in output_types
+        ]
+        # Generated-token count per row at the moment it finished
+        self.finished_at = [None] * len(budgets)
+
+    def __call__(self, input_ids, scores, **kwargs):
+        generated = input_ids[:, self.prompt_length:]
+        steps = generated.shape[1]
+        done = []
+        for row in range(generated.shape[0]):
+            if self.finished_at[row] is None:
+                last = generated[row, -1].item()
+                if steps >= self.budgets[row] or last == self.tokenizer.eos_token_id:
+                    self.finished_at[row] = steps
+                elif self.patterns[row] is not None:
+                    text = self.tokenizer.decode(generated[row], skip_special_tokens=True)
+                    if self.patterns[row].search(text):
+                        self.finished_at[row] = steps
+            done.append(self.finished_at[row] is not None)
+        return torch.tensor(done, dtype=torch.bool, device=input_ids.device)
+
 class HFTransformerModel:
-    def __init__(self, model_name: str):
+    # Decoding settings; max_new_tokens is the fallback budget when no output type is known
+    GENERATION_KWARGS = UNSTRUCTURED_GENERATION_KWARGS
+
+    def __init__(self, model_name: str, preamble: Optional[str] = None, revision: str = "main",
+                 draft_model: Optional[str] = None):
         hf_token = os.getenv("HUGGINGFACE_HUB_TOKEN")
         if not hf_token:
             raise RuntimeError("Missing HUGGINGFACE_HUB_TOKEN environment variable")
 
-        self.tokenizer = AutoTokenizer.from_pretrained(model_name, use_auth_token=hf_token)
-        self.model = AutoModelForCausalLM.from_pretrained(model_name, torch_dtype="auto", device_map="auto", use_auth_token=hf_token)
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name, revision=revision, use_auth_token=hf_token)
+        self.model = AutoModelForCausalLM.from_pretrained(model_name, revision=revision, torch_dtype="auto", device_map="auto", use_auth_token=hf_token)
 
-        self.pipeline = pipeline(
-            "text-generation",
-            model=self.model,
-            tokenizer=self.tokenizer,
-            max_new_tokens=100,
-            temperature=0.7,
-            return_full_text=False,
-        )
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        # Decoder-only models need left padding so every row ends at the same position
+        self.tokenizer.padding_side = "left"
 
-    def run(self, prompt: str) -> str:
+        # With a shared preamble, prefill it once and reuse its KV cache for every prompt
+        self.preamble = preamble
+        self.prefix_cache = PrefixCache(self.model, self.tokenizer, preamble) if preamble else None
+
+        # Optional small model from the same tokenizer family that drafts long answers
+        self.draft_model = load_draft_model(draft_model, self.tokenizer, token=hf_token) if draft_model else None
+
+        # Per-prompt stats from the most recent run_batch call
+        self.last_batch_stats = []
+
+    @property
+    def prefill_tokens_saved(self) -> int:
+        """Number of prompt tokens served from the shared-preamble cache instead of re-encoded"""
+        return self.prefix_cache.tokens_saved if self.prefix_cache else 0
+
+    def run(self, prompt: str, output_type: Optional[str] = None, max_new_tokens: Optional[int] = None) -> str:
         """Run inference on a single prompt"""
-        result = self.pipeline(prompt)
-        return result[0]["generated_text"].strip()
-    
-    def run_batch(self, prompts: List[str]) -> List[str]:
-        """Run batch inference on multiple prompts"""
-        results = self.pipeline(prompts)
-        return [result[0]["generated_text"].strip() for result in results]
+        return self.run_batch(
+            [prompt],
+            [output_type] if output_type else None,
+            [max_new_tokens] if max_new_tokens else None,
+        )[0]
+
+    def run_batch(self, prompts: List[str], output_types: Optional[List[str]] = None,
+                  max_new_tokens_list: Optional[List[int]] = None) -> List[str]:
+        """Run batch inference on multiple prompts.
+
+        Each prompt gets a decode budget and stop pattern from its output type (or an explicit
+        max_new_tokens), so one-word and numeric answers stop after a handful of tokens.
+        """
+        return self._generate(prompts, output_types, max_new_tokens_list)
+
+    def sample_batch(self, prompts: List[str], output_types: Optional[List[str]] = None, kwargs_list=None,
+                     max_new_tokens_list: Optional[List[int]] = None, num_samples: int = 2) -> List[List[str]]:
+        """Draw num_samples sampled answers per prompt, prefilling each prompt only once"""
+        texts = self._generate(prompts, output_types, max_new_tokens_list, num_samples)
+        self.last_batch_stats = merge_sample_stats(self.last_batch_stats, num_samples)
+        return [texts[i:i + num_samples] for i in range(0, len(texts), num_samples)]
+
+    def _generate(self, prompts: List[str], output_types: Optional[List[str]], max_new_tokens_list: Optional[List[int]],
+                  num_samples: int = 1) -> List[str]:
+        """Generate num_samples answers per prompt, returned prompt by prompt"""
+        if output_types is None:
+            output_types = [None] * len(prompts)
+        if max_new_tokens_list is None:
+            max_new_tokens_list = [
+                decode_budget(t) if t else self.GENERATION_KWARGS["max_new_tokens"] for t in output_types
+            ]
+
+        assisted_rows = draft_rows(output_types, max_new_tokens_list) if self.draft_model and num_samples == 1 else []
+        if not assisted_rows:
+            return self._generate_rows(prompts, output_types, max_new_tokens_list, num_samples)
+
+        def run(rows, assisted):
+            texts = self._generate_rows([prompts[i] for i in rows], [output_types[i] for i in rows],
+                                        [max_new_tokens_list[i] for i in rows], assisted=assisted)
+            return texts, self.last_batch_stats
+
+        texts, self.last_batch_stats = run_with_draft(len(prompts), assisted_rows, run)
+        return texts
+
+    def _generate_rows(self, prompts: List[str], output_types: List[Optional[str]], max_new_tokens_list: List[int],
+                       num_samples: int = 1, assisted: bool = False) -> List[str]:
+        """One generate() call over the rows; assisted runs a single row with the draft model"""
+        full_prompts = [(self.preamble or "") + prompt for prompt in prompts]
+        with span("tokenize", rows=len(prompts)):
+            if self.prefix_cache is not None:
+                inputs = self.prefix_cache.prepare_batch(full_prompts)
+            else:
+                inputs = self.tokenizer(full_prompts, return_tensors="pt", padding=True).to(self.model.device)
+
+        generation_kwargs = dict(self.GENERATION_KWARGS, max_new_tokens=max(max_new_tokens_list))
+        timer = GenerationTimer()
+        if num_samples > 1:
+            with span("prefill", rows=len(prompts)):
+                inputs = prefill_and_expand(self.model, inputs, num_samples)
+            output_types = [t for t in output_types for _ in range(num_samples)]
+            max_new_tokens_list = [b for b in max_new_tokens_list for _ in range(num_samples)]
+            generation_kwargs.update(SAMPLING_KWARGS)
+
+        prompt_length = inputs["input_ids"].shape[1]
+        stopping = AnswerStoppingCriteria(self.tokenizer, prompt_length, output_types, max_new_tokens_list)
+        call_kwargs = dict(
+            logits_processor=LogitsProcessorList([timer.logits_processor]),
+            stopping_criteria=StoppingCriteriaList([stopping, timer.stopping_criteria]),
+            pad_token_id=self.tokenizer.pad_token_id,
+            **generation_kwargs,
+        )
+        draft = None
+        with span("generate", rows=len(prompts) * num_samples, assisted=assisted):
+            if assisted:
+                outputs, draft = assisted_generate(self.model, self.draft_model, inputs, **call_kwargs)
+            else:
+                outputs = self.model.generate(**inputs, **call_kwargs)
+
+        generated = outputs[:, prompt_length:]
+        texts = []
+        self.last_batch_stats = []
+        prompt_tokens = inputs["attention_mask"].sum(dim=1).tolist()
+        for row, budget in enumerate(max_new_tokens_list):
+            steps = stopping.finished_at[row] or generated.shape[1]
+            # Assisted steps append several tokens at once, so a row can run past its EOS or budget
+            eos = (generated[row, :steps] == self.tokenizer.eos_token_id).nonzero()
+            steps = min(steps, budget, eos[0].item() + 1 if len(eos) else steps)
+            texts.append(self.tokenizer.decode(generated[row, :steps], skip_special_tokens=True).strip())
+            self.last_batch_stats.append(dict(timer.row_metrics(prompt_tokens[row], steps), max_new_tokens=budget,
+                                              **(draft or {})))
+        return texts
@@ -0,0 +1,65 @@
+import gc
+import sys
+import time
+from typing import Callable, Optional
+
+from profiling import span
+
+
+class LazyModel:
+    """Defer building a model until the first prompt that actually needs inference.
+
+    Runs served entirely from the response cache, dry runs and ``--help`` never pay for
+    importing torch/transformers or loading weights.
+    """
+
+    def __init__(self, factory: Callable[[], object]):
+        self._factory = factory
+        self._instance = None
+        # Wall time spent building the model (weights load), kept out of generation timings
+        self.load_seconds = 0.0
+
+    @property
+    def loaded(self) -> bool:
+        return self._instance is not None
+
+    @property
+    def instance(self) -> Optional[object]:
+        """The underlying model if it has been built, without triggering a load"""
+        return self._instance
+
+    def get(self):
+        """Build the model on first use and return it"""
+        if self._instance is None:
+            start = time.perf_counter()
+            with span("model_load"):
+                self._instance = self._factory()
+            self.load_seconds += time.perf_counter() - start
+        return self._instance
+
+    def unload(self):
+        """Drop the built model and release its weights so another model can be loaded"""
+        if self._instance is None:
+            return
+        # Backends holding connections or threads release them explicitly
+        close = getattr(self._instance, "close", None)
+        if close is not None:
+            close()
+        self._instance = None
+        gc.collect()
+        # Only touch torch if a model actually imported it
+        torch = sys.modules.get("torch")
+        if torch is not None and torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    def run(self, *args, **kwargs):
+        return self.get().run(*args, **kwargs)
+
+    def run_batch(self, *args, **kwargs):
+        return self.get().run_batch(*args, **kwargs)
+
+    def sample_batch(self, *args, **kwargs):
+        return self.get().sample_batch(*args, **kwargs)
+
+    def score_batch(self, *args, **kwargs):
+        return self.get().score_batch(*args, **kwargs)
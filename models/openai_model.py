@@ -0,0 +1,263 @@
+"""
+OpenAI-compatible HTTP backend for models served by vLLM, llama.cpp server and the like.
+
+Requests go to ``/completions`` through a small asyncio HTTP/1.1 client with keep-alive
+connections, so there is no extra dependency. A batch is sent as concurrent requests,
+capped at ``max_in_flight``. Timeouts, dropped connections and 408/429/5xx responses are
+retried with exponential backoff. Structured runs send the scenario's JSON schema (or its
+bare answer regex) as a guided-decoding field, and each request's latency is recorded.
+"""
+
+import asyncio
+import json
+import os
+import random
+import ssl
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from models.base_model import BaseModel
+from models.answer_grammars import bare_answer_regex, regex_to_gbnf
+from models.prompting import (STRUCTURED_GENERATION_KWARGS, UNSTRUCTURED_GENERATION_KWARGS, SAMPLING_KWARGS,
+                              build_structured_prompt, decode_budget, extract_answer_from_text)
+from profiling import span
+
+DEFAULT_API_BASE = os.getenv("OPENAI_BASE_URL", "http://localhost:8000/v1")
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+# Request fields each server family uses for guided decoding; llama.cpp takes bare answers as GBNF
+GUIDED_FIELDS = {
+    "vllm": {"json": "guided_json", "regex": "guided_regex"},
+    "llamacpp": {"json": "json_schema", "regex": "grammar"},
+}
+
+
+class HTTPStatusError(RuntimeError):
+    def __init__(self, status: int, body: bytes):
+        super().__init__(f"HTTP {status}: {body[:200].decode('utf-8', 'replace')}")
+        self.status = status
+
+
+class ConnectionPool:
+    """Keep-alive HTTP/1.1 connections to one server; at most ``size`` requests in flight"""
+
+    def __init__(self, base_url: str, size: int = 16, timeout: float = 120.0):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.ssl = ssl.create_default_context() if parts.scheme == "https" else None
+        self.path = parts.path.rstrip("/")
+        self.timeout = timeout
+        self.size = size
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.opened = 0
+        self.reused = 0
+
+    async def request(self, method: str, path: str, body: bytes, headers: Dict[str, str]) -> Tuple[int, Dict, bytes]:
+        if self._slots is None:
+            # Created lazily so it binds to the loop that runs the requests
+            self._slots = asyncio.Semaphore(self.size)
+        async with self._slots:
+            while True:
+                reused = bool(self._idle)
+                connection = self._idle.pop() if reused else await self._open()
+                try:
+                    status, response_headers, payload, keep_alive = await asyncio.wait_for(
+                        self._exchange(connection, method, path, body, headers), self.timeout
+                    )
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    connection[1].close()
+                    # The server may have closed an idle keep-alive connection; retry once on a fresh one
+                    if reused:
+                        continue
+                    raise
+                except BaseException:
+                    connection[1].close()
+                    raise
+                self.reused += reused
+                if keep_alive:
+                    self._idle.append(connection)
+                else:
+                    connection[1].close()
+                return status, response_headers, payload
+
+    async def _open(self):
+        self.opened += 1
+        return await asyncio.wait_for(asyncio.open_connection(self.host, self.port, ssl=self.ssl), self.timeout)
+
+    async def _exchange(self, connection, method, path, body, headers):
+        reader, writer = connection
+        lines = [f"{method} {self.path}{path} HTTP/1.1", f"Host: {self.host}:{self.port}",
+                 f"Content-Length: {len(body)}", "Connection: keep-alive"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+        status_line = await reader.readuntil(b"\r\n")
+        status = int(status_line.split()[1])
+        response_headers = {}
+        while True:
+            line = await reader.readuntil(b"\r\n")
+            if line == b"\r\n":
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            response_headers[name.strip().lower()] = value.strip()
+
+        keep_alive = response_headers.get("connection", "").lower() != "close"
+        if response_headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                chunk_size = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                if chunk_size == 0:
+                    break
+                chunks.append((await reader.readexactly(chunk_size + 2))[:-2])
+            # Optional trailer headers, then the empty line that ends the message
+            while await reader.readuntil(b"\r\n") != b"\r\n":
+                pass
+            payload = b"".join(chunks)
+        elif "content-length" in response_headers:
+            payload = await reader.readexactly(int(response_headers["content-length"]))
+        else:
+            payload = await reader.read()
+            keep_alive = False
+        return status, response_headers, payload, keep_alive
+
+    def close(self):
+        for _, writer in self._idle:
+            writer.close()
+        self._idle = []
+
+
+class OpenAIModel(BaseModel):
+    """Run prompts against an OpenAI-compatible completions endpoint"""
+
+    def __init__(self, model_name: str, api_base: Optional[str] = None, api_key: Optional[str] = None,
+                 use_structured: bool = False, constraint: str = "json", preamble: Optional[str] = None,
+                 max_in_flight: int = 16, max_retries: int = 3, request_timeout: float = 120.0,
+                 backoff: float = 0.5, guided_format: str = "vllm"):
+        self.model_name = model_name
+        self.api_key = api_key if api_key is not None else os.getenv("OPENAI_API_KEY")
+        self.use_structured = use_structured
+        self.constraint = constraint
+        self.preamble = preamble
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.guided_format = guided_format
+        self.guided_fields = GUIDED_FIELDS[guided_format]
+        self.pool = ConnectionPool(api_base or DEFAULT_API_BASE, max_in_flight, request_timeout)
+        self.retries = 0
+        # Per-prompt stats from the most recent run_batch call
+        self.last_batch_stats = []
+
+        # One long-lived event loop, so pooled connections survive between batches
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="openai-client", daemon=True)
+        self._thread.start()
+
+    def _run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def close(self):
+        """Close pooled connections and stop the client loop"""
+        if self._loop.is_running():
+            self._loop.call_soon_threadsafe(self.pool.close)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+
+    def _request_body(self, prompt: str, output_type: Optional[str], kwargs: Optional[Dict],
+                      max_new_tokens: Optional[int], num_samples: int) -> Dict[str, Any]:
+        """Completion request for one prompt: the prompt the local backends would see, plus its constraint"""
+        kwargs = kwargs or {}
+        if self.use_structured:
+            body = {"prompt": build_structured_prompt(prompt, output_type, kwargs),
+                    "max_tokens": STRUCTURED_GENERATION_KWARGS["max_new_tokens"], "temperature": 0.0}
+            if self.constraint == "bare":
+                regex = bare_answer_regex(output_type, kwargs)
+                body[self.guided_fields["regex"]] = regex_to_gbnf(regex) if self.guided_format == "llamacpp" else regex
+            else:
+                from models.structured_schemas import schema_for
+                body[self.guided_fields["json"]] = schema_for(output_type, kwargs).model_json_schema()
+        else:
+            budget = max_new_tokens or (decode_budget(output_type) if output_type
+                                        else UNSTRUCTURED_GENERATION_KWARGS["max_new_tokens"])
+            body = {"prompt": (self.preamble or "") + prompt, "max_tokens": budget,
+                    "temperature": UNSTRUCTURED_GENERATION_KWARGS["temperature"]}
+        if num_samples > 1:
+            # The server prefills once and returns n sampled choices
+            body.update(n=num_samples, temperature=SAMPLING_KWARGS["temperature"])
+        body["model"] = self.model_name
+        return body
+
+    async def _post(self, path: str, body: Dict) -> Dict:
+        """POST JSON, retrying timeouts, dropped connections and retryable statuses with backoff"""
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        payload = json.dumps(body).encode("utf-8")
+        for attempt in range(self.max_retries + 1):
+            delay = self.backoff * 2 ** attempt * (1 + random.random() / 10)
+            try:
+                status, headers_in, data = await self.pool.request("POST", path, payload, headers)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+                if attempt == self.max_retries:
+                    raise
+            else:
+                if status < 300:
+                    return json.loads(data)
+                if status not in RETRY_STATUSES or attempt == self.max_retries:
+                    raise HTTPStatusError(status, data)
+                # Honour the server's Retry-After (in seconds) when it sends one
+                retry_after = headers_in.get("retry-after", "")
+                if retry_after.replace(".", "", 1).isdigit():
+                    delay = float(retry_after)
+            self.retries += 1
+            await asyncio.sleep(delay)
+
+    async def _complete(self, body: Dict, output_type: Optional[str]) -> Tuple[List[str], Dict]:
+        start = time.perf_counter()
+        response = await self._post("/completions", body)
+        latency = time.perf_counter() - start
+        choices = sorted(response["choices"], key=lambda choice: choice.get("index", 0))
+        texts = [extract_answer_from_text(choice["text"], output_type) if self.use_structured
+                 else choice["text"].strip() for choice in choices]
+        usage = response.get("usage") or {}
+        generated = usage.get("completion_tokens")
+        stats = {
+            "prompt_tokens": usage.get("prompt_tokens"),
+            "generated_tokens": generated,
+            "latency_seconds": latency,
+            "tokens_per_second": generated / latency if generated and latency > 0 else None,
+        }
+        return texts, stats
+
+    async def _complete_batch(self, prompts, output_types, kwargs_list, max_new_tokens_list, num_samples):
+        bodies = [self._request_body(p, t, k, m, num_samples)
+                  for p, t, k, m in zip(prompts, output_types, kwargs_list, max_new_tokens_list)]
+        return await asyncio.gather(*(self._complete(body, t) for body, t in zip(bodies, output_types)))
+
+    def _batch(self, prompts, output_types, kwargs_list, max_new_tokens_list, num_samples):
+        output_types = output_types or [None] * len(prompts)
+        kwargs_list = kwargs_list or [None] * len(prompts)
+        max_new_tokens_list = max_new_tokens_list or [None] * len(prompts)
+        with span("http_batch", rows=len(prompts)):
+            completed = self._run(self._complete_batch(prompts, output_types, kwargs_list, max_new_tokens_list,
+                                                       num_samples))
+        self.last_batch_stats = [stats for _, stats in completed]
+        return [texts for texts, _ in completed]
+
+    def run(self, prompt: str, output_type: Optional[str] = None, **kwargs) -> str:
+        """Run inference on a single prompt"""
+        return self.run_batch([prompt], [output_type], kwargs_list=[kwargs])[0]
+
+    def run_batch(self, prompts: List[str], output_types: Optional[List[str]] = None, kwargs_list=None,
+                  max_new_tokens_list: Optional[List[int]] = None) -> List[str]:
+        """Send every prompt as its own concurrent request and return answers in order"""
+        return [texts[0] for texts in self._batch(prompts, output_types, kwargs_list, max_new_tokens_list, 1)]
+
+    def sample_batch(self, prompts: List[str], output_types: Optional[List[str]] = None, kwargs_list=None,
+                     max_new_tokens_list: Optional[List[int]] = None, num_samples: int = 2) -> List[List[str]]:
+        """num_samples answers per prompt, from one request each (``n`` choices)"""
+        return self._batch(prompts, output_types, kwargs_list, max_new_tokens_list, num_samples)
@@ -1,94 +1,141 @@
-from transformers import AutoTokenizer, AutoModelForCausalLM
+from transformers import AutoTokenizer, AutoModelForCausalLM, LogitsProcessor, LogitsProcessorList, StoppingCriteriaList
 from models.base_model import BaseModel
 import outlines
+from outlines.types import Regex
+from outlines.backends.outlines_core import OutlinesCoreLogitsProcessor
+import torch
 import os
+from importlib.metadata import version
 from typing import List, Union, Dict, Any, Optional
 from dotenv import load_dotenv
-from models.structured_schemas import SCHEMA_REGISTRY, SchemaFactory
-import json
-import re
+from models.structured_schemas import schema_for
+from models.schema_cache import get_schema_cache, schema_key, vocabulary_digest
+from models.prefix_cache import PrefixCache
+from models.candidate_scoring import CandidateScorer
+from models.answer_grammars import bare_answer_regex
+from models.generation_metrics import GenerationTimer
+from models.sampling import SAMPLING_KWARGS, prefill_and_expand, merge_sample_stats
+from models.assisted import load_draft_model, draft_rows, run_with_draft, assisted_generate, ReplayingProcessor
+from profiling import span
+import time
+from models.prompting import SYSTEM_PROMPT, SHARED_PREFIX, STRUCTURED_GENERATION_KWARGS, build_structured_prompt, extract_answer_from_text
 
 # Load environment variables from .env file
 load_dotenv()
 
-# System prompt to establish testing context and reduce ambiguity
-SYSTEM_PROMPT = """You are a Magic: The Gathering expert AI evaluator. You are taking a test about MTG rules, strategy, and gameplay. 
+# Decode budget shared by batched constrained generation and the unstructured fallback
+MAX_NEW_TOKENS = STRUCTURED_GENERATION_KWARGS["max_new_tokens"]
 
-IMPORTANT INSTRUCTIONS:
-- Answer each question with a SINGLE, DEFINITIVE response
-- Do not say "it depends," "both," or provide nuanced explanations
-- Choose ONE clear answer from the available options
-- For draft picks, choose exactly one card from the provided list
-- For yes/no questions, answer ONLY "yes" or "no"
-- For numeric questions, provide ONLY the number
-- Follow the specific format requested for each question type
 
-This is a structured test environment where ambiguous or conditional answers are considered incorrect."""
+class MultiSchemaLogitsProcessor(LogitsProcessor):
+    """Apply a different structured-output logits processor to each group of batch rows.
+
+    Every entry of ``groups`` is a ``(processor, row_indices)`` pair. Each processor only ever
+    sees its own rows, in the same order on every step, so its per-sequence FSM state stays
+    aligned with the batch while all rows share one forward pass.
+    """
+
+    def __init__(self, groups):
+        self.groups = groups
+
+    def __call__(self, input_ids, scores):
+        for processor, rows in self.groups:
+            rows = rows.to(scores.device)
+            scores[rows] = processor(input_ids[rows], scores[rows])
+        return scores
 
 class OutlinesModel(BaseModel):
-    def __init__(self, model_name: str):
+    def __init__(self, model_name: str, use_prefix_cache: bool = True, revision: str = "main",
+                 constraint: str = "json", draft_model: Optional[str] = None):
         hf_token = os.getenv("HUGGINGFACE_HUB_TOKEN")
         if not hf_token:
             raise RuntimeError("Missing HUGGINGFACE_HUB_TOKEN environment variable")
 
+        self.model_name = model_name
+        self.revision = revision
+        # "json" decodes pydantic schemas; "bare" constrains straight to the answer text
+        self.constraint = constraint
+        
+        # Per-prompt stats from the most recent run_batch call
+        self.last_batch_stats = []
+
         # Load the base model and tokenizer
-        self.tokenizer = AutoTokenizer.from_pretrained(model_name, use_auth_token=hf_token)
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name, revision=revision, use_auth_token=hf_token)
         self.model = AutoModelForCausalLM.from_pretrained(
             model_name, 
+            revision=revision,
             torch_dtype="auto", 
             device_map="auto", 
             use_auth_token=hf_token
         )
         
+        # Optional small model from the same tokenizer family that drafts explanations
+        self.draft_model = load_draft_model(draft_model, self.tokenizer, token=hf_token) if draft_model else None
+        
         # Create outlines model wrapper
         self.outlines_model = outlines.from_transformers(self.model, self.tokenizer)
+        
+        # Prefill the system prompt once and reuse its KV cache for every scenario
+        self.prefix_cache = PrefixCache(self.model, self.tokenizer, SHARED_PREFIX) if use_prefix_cache else None
+        
+        # Closed answer sets can be ranked by log-likelihood instead of decoded
+        self.scorer = CandidateScorer(self.model, self.tokenizer, self.prefix_cache)
+
+    @property
+    def prefill_tokens_saved(self) -> int:
+        """Number of prompt tokens served from the shared-prefix cache instead of re-encoded"""
+        return self.prefix_cache.tokens_saved if self.prefix_cache else 0
+
+    def _prepare(self, prompt: str, output_type: str, kwargs: Dict[str, Any]):
+        """Build the full prompt and pick the output schema for a single scenario"""
+        full_prompt = build_structured_prompt(prompt, output_type, kwargs)
+        if self.constraint == "bare":
+            return full_prompt, Regex(bare_answer_regex(output_type, kwargs))
+        return full_prompt, schema_for(output_type, kwargs)
+
+    def _schema_cache_key(self, output_type: str, kwargs: Dict[str, Any]) -> tuple:
+        # The compiled index is built over the vocabulary, so it is only valid for this tokenizer
+        if getattr(self, "_vocabulary_digest", None) is None:
+            self._vocabulary_digest = vocabulary_digest(self.tokenizer)
+        key = (self.model_name, self.revision, self._vocabulary_digest, version("outlines"),
+               schema_key(output_type, kwargs))
+        if self.constraint != "json":
+            key += (self.constraint,)
+        return key
+
+    def _get_generator(self, output_type: str, kwargs: Dict[str, Any], schema):
+        """Fetch the compiled generator for this schema shape, compiling it on first use"""
+        return get_schema_cache().get_or_compile(
+            self._schema_cache_key(output_type, kwargs),
+            lambda: outlines.generator.Generator(self.outlines_model, schema),
+            # Only the compiled index goes to disk: the processor around it holds the torch module
+            dump=lambda generator: generator.logits_processor.index,
+            load=lambda index: outlines.generator.Generator(
+                self.outlines_model, processor=OutlinesCoreLogitsProcessor(index, "torch")),
+        )
 
     def run(self, prompt: str, output_type: str = "simple", **kwargs) -> str:
         """Run inference with structured output constraints"""
+        return self.run_batch([prompt], [output_type], kwargs_list=[kwargs])[0]
+
+    def score_batch(self, prompts: List[str], output_types: List[str], kwargs_list: List[Dict],
+                    candidates_list: List[List[str]]) -> List[Dict]:
+        """Answer closed-set prompts by ranking their candidates in one prefill-only pass"""
+        full_prompts = [
+            build_structured_prompt(prompt, output_type, kwargs)
+            for prompt, output_type, kwargs in zip(prompts, output_types, kwargs_list)
+        ]
+        with span("score_candidates", rows=len(prompts)):
+            return self.scorer.score_batch(full_prompts, candidates_list)
+
+    def _run_single(self, prompt: str, output_type: str, kwargs: Dict[str, Any]) -> str:
+        """Run one prompt through its outlines generator without the batched decode path"""
+        full_prompt, schema = self._prepare(prompt, output_type, kwargs)
         
-        # Add system prompt context
-        contextualized_prompt = f"{SYSTEM_PROMPT}\n\nQuestion: {prompt}"
-        
-        # Handle dynamic schema creation for specific scenarios
-        if output_type == "card_selection" and "options" in kwargs:
-            schema = SchemaFactory.create_card_selection_schema(kwargs["options"])
-            options_str = ", ".join(kwargs['options'])
-            prompt_suffix = f"\n\nChoose exactly ONE card from these options: {options_str}. Answer with ONLY the card name from the list above. No explanations, no additional text."
-        elif output_type == "multiple_choice" and "choices" in kwargs:
-            schema = SchemaFactory.create_multiple_choice_schema(kwargs["choices"])
-            choices_str = ", ".join(kwargs['choices'])
-            prompt_suffix = f"\n\nChoose exactly ONE option from: {choices_str}. Answer with ONLY the selected option from the list above. No explanations."
-        elif output_type == "numeric_range" and "min_val" in kwargs and "max_val" in kwargs:
-            schema = SchemaFactory.create_numeric_range_schema(kwargs["min_val"], kwargs["max_val"])
-            prompt_suffix = f"\n\nAnswer with a number between {kwargs['min_val']} and {kwargs['max_val']}. ONLY the number, no explanation."
-        elif output_type == "boolean":
-            schema = SchemaFactory.create_boolean_schema()
-            prompt_suffix = "\n\nAnswer with ONLY 'yes' or 'no'. Choose ONE definitive answer. No explanations, no qualifiers like 'it depends'."
-        elif output_type in SCHEMA_REGISTRY:
-            schema = SCHEMA_REGISTRY[output_type]
-            prompt_suffixes = {
-                "numeric": "\n\nAnswer with ONLY the number. No explanation, no additional text, just the number:",
-                "explanation": "\n\nProvide a clear, concise explanation:",
-                "simple": "\n\nAnswer with ONLY the answer. No explanation, no additional text, just the answer:",
-                "card_selection": "\n\nAnswer with ONLY the card name. No explanation, just the card name:",
-                "draft_pick": "\n\nAnswer with ONLY the card name you would pick. No explanation, just the card name:",
-                "combat_assignment": "\n\nAnswer with ONLY the damage assignment number. No explanation, just the number:",
-                "mana_cost": "\n\nAnswer with ONLY the mana cost in standard format (e.g., '2WW'). No explanation, just the cost:",
-                "phase": "\n\nAnswer with ONLY the phase name. No explanation, just the phase:",
-                "card_type": "\n\nAnswer with ONLY the card type. No explanation, just the type:",
-                "zone": "\n\nAnswer with ONLY the zone name. No explanation, just the zone:",
-            }
-            prompt_suffix = prompt_suffixes.get(output_type, "\n\nAnswer appropriately. No explanation, just the answer:")
-        else:
-            # Fallback to simple answer
-            schema = SCHEMA_REGISTRY["simple"]
-            prompt_suffix = "\n\nAnswer with ONLY the answer. No explanation, no additional text, just the answer:"
-        
-        # Create generator with structured output
-        generator = outlines.generator.Generator(self.outlines_model, schema)
+        # Reuse the compiled generator for this schema shape
+        generator = self._get_generator(output_type, kwargs, schema)
         
         # Run generation
-        full_prompt = contextualized_prompt + prompt_suffix
         try:
             result = generator(full_prompt)
             return self._extract_answer(result, output_type)
@@ -96,7 +143,7 @@ class OutlinesModel(BaseModel):
             # Fallback to unstructured generation if outlines fails
             print(f"Warning: Structured generation failed, falling back to unstructured: {e}")
             inputs = self.tokenizer(full_prompt, return_tensors="pt").to(self.model.device)
-            outputs = self.model.generate(**inputs, max_new_tokens=100)
+            outputs = self.model.generate(**inputs, max_new_tokens=MAX_NEW_TOKENS)
             result_text = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
             # Extract just the answer part
             answer_part = result_text[len(full_prompt):].strip()
@@ -142,34 +189,7 @@ class OutlinesModel(BaseModel):
     
     def _extract_answer_from_text(self, text: str, output_type: str) -> str:
         """Extract answer from raw text output"""
-        text = text.strip()
-        
-        # Try to extract from JSON-like string if needed
-        if text.startswith('{') and text.endswith('}'):
-            try:
-                result_dict = json.loads(text)
-                # Try common field names
-                for key in ['answer', 'value', 'selected_card', 'pick', 'damage_assignment', 'mana_cost', 'phase', 'card_type', 'zone', 'explanation']:
-                    if key in result_dict:
-                        return str(result_dict[key]).strip()
-            except:
-                pass
-        
-        # For numeric outputs, extract the first number
-        if output_type in ["numeric", "combat_assignment", "numeric_range"]:
-            numbers = re.findall(r'-?\d+', text)
-            if numbers:
-                return numbers[0]
-        
-        # For boolean outputs, normalize
-        if output_type == "boolean":
-            text_lower = text.lower()
-            if text_lower in ["true", "yes", "y", "1"]:
-                return "yes"
-            elif text_lower in ["false", "no", "n", "0"]:
-                return "no"
-        
-        return text
+        return extract_answer_from_text(text, output_type)
     
     def run_batch(self, prompts: List[str], output_types: List[str] = None, kwargs_list=None) -> List[str]:
         """Run batch inference with structured output constraints"""
@@ -182,9 +202,128 @@ class OutlinesModel(BaseModel):
         elif len(kwargs_list) != len(prompts):
             kwargs_list = [kwargs_list[0] if kwargs_list else {}] * len(prompts)
         
+        self.last_batch_stats = []
+        try:
+            assisted_rows = draft_rows(output_types) if self.draft_model is not None else []
+            if not assisted_rows:
+                return self._run_batch_constrained(prompts, output_types, kwargs_list)
+            
+            def run(rows, assisted):
+                texts = self._run_batch_constrained([prompts[i] for i in rows], [output_types[i] for i in rows],
+                                                    [kwargs_list[i] for i in rows], assisted=assisted)
+                return texts, self.last_batch_stats
+            
+            texts, self.last_batch_stats = run_with_draft(len(prompts), assisted_rows, run)
+            return texts
+        except Exception as e:
+            print(f"Warning: Batched structured generation failed, falling back to sequential: {e}")
+            return self._run_batch_sequential(prompts, output_types, kwargs_list)
+    
+    def sample_batch(self, prompts: List[str], output_types: List[str] = None, kwargs_list=None,
+                     max_new_tokens_list=None, num_samples: int = 2) -> List[List[str]]:
+        """Draw num_samples constrained answers per prompt, prefilling each prompt only once"""
+        if output_types is None:
+            output_types = ["simple"] * len(prompts)
+        if kwargs_list is None:
+            kwargs_list = [{}] * len(prompts)
+        
+        self.last_batch_stats = []
+        try:
+            texts = self._run_batch_constrained(prompts, output_types, kwargs_list, num_samples)
+        except Exception as e:
+            print(f"Warning: Batched structured sampling failed, falling back to sequential: {e}")
+            repeat = lambda items: [item for item in items for _ in range(num_samples)]
+            texts = self._run_batch_sequential(repeat(prompts), repeat(output_types), repeat(kwargs_list))
+        self.last_batch_stats = merge_sample_stats(self.last_batch_stats, num_samples)
+        return [texts[i:i + num_samples] for i in range(0, len(texts), num_samples)]
+    
+    def _run_batch_sequential(self, prompts: List[str], output_types: List[str], kwargs_list: List[Dict]) -> List[str]:
+        """Run each prompt through its own generator, one forward pass per prompt"""
         results = []
+        self.last_batch_stats = []
         for prompt, output_type, kwargs in zip(prompts, output_types, kwargs_list):
-            result = self.run(prompt, output_type, **kwargs)
+            start = time.perf_counter()
+            result = self._run_single(prompt, output_type, kwargs)
+            # The outlines generator does not expose steps, so only end-to-end latency is known
+            self.last_batch_stats.append({"latency_seconds": time.perf_counter() - start})
             results.append(result)
         
-        return results
\ No newline at end of file
+        return results
+    
+    def _run_batch_constrained(self, prompts: List[str], output_types: List[str], kwargs_list: List[Dict],
+                               num_samples: int = 1, assisted: bool = False) -> List[str]:
+        """Generate a padded batch in one decode loop, masking each row with its own schema.
+
+        With num_samples > 1 every prompt is prefilled once and sampled num_samples times;
+        answers come back prompt by prompt. ``assisted`` decodes a single prompt with the
+        draft model.
+        """
+        full_prompts = []
+        groups = {}
+        with span("prepare_generators", rows=len(prompts)):
+            for row, (prompt, output_type, kwargs) in enumerate(zip(prompts, output_types, kwargs_list)):
+                full_prompt, schema = self._prepare(prompt, output_type, kwargs)
+                full_prompts.append(full_prompt)
+                generator = self._get_generator(output_type, kwargs, schema)
+                rows = range(row * num_samples, (row + 1) * num_samples)
+                groups.setdefault(id(generator), (generator, []))[1].extend(rows)
+        
+        # One logits processor per distinct schema, each driving only its own rows
+        processor_groups = []
+        for generator, rows in groups.values():
+            processor = generator.logits_processor
+            # Cached processors carry FSM state from their previous batch
+            processor.reset()
+            processor_groups.append((processor, torch.tensor(rows, dtype=torch.long)))
+        
+        with span("tokenize", rows=len(prompts)):
+            if self.prefix_cache is not None:
+                # Reuses the prefilled system prompt when every row starts with it
+                inputs = self.prefix_cache.prepare_batch(full_prompts)
+            else:
+                # Decoder-only models need left padding so every row ends at the same position
+                if self.tokenizer.pad_token is None:
+                    self.tokenizer.pad_token = self.tokenizer.eos_token
+                self.tokenizer.padding_side = "left"
+                inputs = self.tokenizer(full_prompts, return_tensors="pt", padding=True).to(self.model.device)
+        
+        timer = GenerationTimer()
+        sampling_kwargs = {}
+        if num_samples > 1:
+            with span("prefill", rows=len(prompts)):
+                inputs = prefill_and_expand(self.model, inputs, num_samples)
+            output_types = [t for t in output_types for _ in range(num_samples)]
+            sampling_kwargs = SAMPLING_KWARGS
+        if assisted:
+            # Rejected draft tokens rewind the sequence, so the schema state is replayed to match
+            schema_processor = ReplayingProcessor(processor_groups[0][0])
+        else:
+            schema_processor = MultiSchemaLogitsProcessor(processor_groups)
+        call_kwargs = dict(
+            logits_processor=LogitsProcessorList([timer.logits_processor, schema_processor]),
+            stopping_criteria=StoppingCriteriaList([timer.stopping_criteria]),
+            max_new_tokens=MAX_NEW_TOKENS,
+            pad_token_id=self.tokenizer.pad_token_id,
+            **sampling_kwargs,
+        )
+        draft = None
+        with span("generate", rows=len(prompts) * num_samples, assisted=assisted):
+            if assisted:
+                outputs, draft = assisted_generate(self.model, self.draft_model, inputs, **call_kwargs)
+            else:
+                outputs = self.model.generate(**inputs, **call_kwargs)
+        
+        generated = outputs[:, inputs["input_ids"].shape[1]:]
+        # A row's answer ends at its first EOS/pad token; everything after is batch padding
+        finished = (generated == self.tokenizer.pad_token_id) | (generated == self.tokenizer.eos_token_id)
+        lengths = torch.where(finished.any(dim=1), finished.int().argmax(dim=1), generated.shape[1]).tolist()
+        prompt_tokens = inputs["attention_mask"].sum(dim=1).tolist()
+        self.last_batch_stats = [
+            dict(timer.row_metrics(prompt_tokens[row], n), max_new_tokens=MAX_NEW_TOKENS, **(draft or {}))
+            for row, n in enumerate(lengths)
+        ]
+        
+        texts = self.tokenizer.batch_decode(generated, skip_special_tokens=True)
+        if self.constraint == "bare":
+            return [self._extract_answer_from_text(text, output_type) for text, output_type in zip(texts, output_types)]
+        return [self._extract_answer(text, output_type) for text, output_type in zip(texts, output_types)]
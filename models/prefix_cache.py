@@ -0,0 +1,95 @@
+"""
+Shared-prefix KV cache reuse for prompts that all start with the same text.
+"""
+
+import copy
+from typing import Dict, List
+
+import torch
+from transformers import DynamicCache
+
+
+class PrefixCache:
+    """Prefill a shared prompt prefix once and reuse its past_key_values for every prompt.
+
+    Prompts are laid out as ``[prefix][padding][suffix]`` so the cached prefix lines up
+    across a whole batch; position ids come from the attention mask, so the padding in
+    the middle is invisible to the model.
+    """
+
+    def __init__(self, model, tokenizer, prefix: str):
+        self.model = model
+        self.tokenizer = tokenizer
+        prefix_ids = tokenizer(prefix, return_tensors="pt").input_ids[0].tolist()
+        # The last prefix token may merge with the start of the question when the full
+        # prompt is tokenized, so it is never cached
+        self.prefix_ids = prefix_ids[:-1]
+        self.past_key_values = None
+        self.tokens_saved = 0
+        self.hits = 0
+        self.misses = 0
+
+        if self.prefix_ids:
+            with torch.no_grad():
+                outputs = model(
+                    torch.tensor([self.prefix_ids], device=model.device),
+                    use_cache=True,
+                )
+            past = outputs.past_key_values
+            if isinstance(past, tuple):
+                past = DynamicCache.from_legacy_cache(past)
+            self.past_key_values = past
+
+    def matches(self, ids: List[int]) -> bool:
+        """Whether a tokenized prompt starts with the cached prefix and extends past it"""
+        n = len(self.prefix_ids)
+        return self.past_key_values is not None and len(ids) > n and ids[:n] == self.prefix_ids
+
+    def prepare_batch(self, prompts: List[str]) -> Dict:
+        """Tokenize prompts into generate() kwargs, attaching the prefix cache when every row matches"""
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        pad_id = self.tokenizer.pad_token_id
+        rows = [self.tokenizer(prompt).input_ids for prompt in prompts]
+
+        if not all(self.matches(ids) for ids in rows):
+            # Plain left padding, full prefill
+            self.misses += len(rows)
+            width = max(len(ids) for ids in rows)
+            input_ids = [[pad_id] * (width - len(ids)) + ids for ids in rows]
+            attention_mask = [[0] * (width - len(ids)) + [1] * len(ids) for ids in rows]
+            return {
+                "input_ids": torch.tensor(input_ids, device=self.model.device),
+                "attention_mask": torch.tensor(attention_mask, device=self.model.device),
+            }
+
+        n = len(self.prefix_ids)
+        width = max(len(ids) for ids in rows)
+        input_ids = []
+        attention_mask = []
+        for ids in rows:
+            pad = width - len(ids)
+            input_ids.append(self.prefix_ids + [pad_id] * pad + ids[n:])
+            attention_mask.append([1] * n + [0] * pad + [1] * (len(ids) - n))
+
+        # generate() extends the cache in place, so every call gets its own copy
+        past = copy.deepcopy(self.past_key_values)
+        if len(rows) > 1:
+            past.batch_repeat_interleave(len(rows))
+
+        self.hits += len(rows)
+        self.tokens_saved += n * len(rows)
+        return {
+            "input_ids": torch.tensor(input_ids, device=self.model.device),
+            "attention_mask": torch.tensor(attention_mask, device=self.model.device),
+            "past_key_values": past,
+        }
+
+    def stats(self) -> Dict[str, int]:
+        """Return prefix reuse counters for reporting"""
+        return {
+            "prefix_tokens": len(self.prefix_ids),
+            "hits": self.hits,
+            "misses": self.misses,
+            "tokens_saved": self.tokens_saved,
+        }
@@ -0,0 +1,145 @@
+"""
+Prompt construction and decoding defaults shared by the model backends.
+
+This module is deliberately free of torch/transformers (and top-level pydantic) imports so
+the runner can build the exact prompt a model will see (e.g. for response-cache keys)
+without loading one.
+"""
+
+import json
+import re
+from typing import Any, Dict, Optional
+
+# System prompt to establish testing context and reduce ambiguity
+SYSTEM_PROMPT = """You are a Magic: The Gathering expert AI evaluator. You are taking a test about MTG rules, strategy, and gameplay. 
+
+IMPORTANT INSTRUCTIONS:
+- Answer each question with a SINGLE, DEFINITIVE response
+- Do not say "it depends," "both," or provide nuanced explanations
+- Choose ONE clear answer from the available options
+- For draft picks, choose exactly one card from the provided list
+- For yes/no questions, answer ONLY "yes" or "no"
+- For numeric questions, provide ONLY the number
+- Follow the specific format requested for each question type
+
+This is a structured test environment where ambiguous or conditional answers are considered incorrect."""
+
+# Every structured prompt starts with this text, so its KV cache is computed once per model
+SHARED_PREFIX = f"{SYSTEM_PROMPT}\n\nQuestion: "
+
+# Decoding settings for each backend; these also feed the response-cache key
+STRUCTURED_GENERATION_KWARGS = {"max_new_tokens": 100}
+UNSTRUCTURED_GENERATION_KWARGS = {"max_new_tokens": 100, "temperature": 0.7}
+# Repeat runs sample; greedy decoding would give N identical answers
+SAMPLING_KWARGS = {"do_sample": True, "temperature": 0.7}
+# Long free-text answers, where a draft model (--draft-model) speeds decoding up
+ASSISTED_OUTPUT_TYPES = {"explanation"}
+ASSISTED_MIN_NEW_TOKENS = 64
+
+# Unstructured decode budgets per output type; a scenario's own max_new_tokens overrides these
+DECODE_BUDGETS = {
+    "boolean": 8,
+    "numeric": 12,
+    "numeric_range": 12,
+    "combat_assignment": 12,
+    "simple": 24,
+    "card_selection": 24,
+    "multiple_choice": 24,
+    "draft_pick": 24,
+    "mana_cost": 16,
+    "phase": 16,
+    "card_type": 16,
+    "zone": 16,
+    "explanation": UNSTRUCTURED_GENERATION_KWARGS["max_new_tokens"],
+}
+
+# Patterns over the generated text that mean a complete answer has been produced
+STOP_PATTERNS = {
+    "boolean": r"^\W*(yes|no|true|false)\W",
+    "numeric": r"-?\d+[ \t]*\n",
+    "numeric_range": r"-?\d+[ \t]*\n",
+    "combat_assignment": r"-?\d+[ \t]*\n",
+    "simple": r"\S[^\n]*\n",
+    "card_selection": r"\S[^\n]*\n",
+    "multiple_choice": r"\S[^\n]*\n",
+    "draft_pick": r"\S[^\n]*\n",
+    "mana_cost": r"\S[^\n]*\n",
+    "phase": r"\S[^\n]*\n",
+    "card_type": r"\S[^\n]*\n",
+    "zone": r"\S[^\n]*\n",
+    "explanation": r"\S[\s\S]*\n\n",
+}
+
+def decode_budget(output_type: str, scenario: Dict[str, Any] = None) -> int:
+    """max_new_tokens for an unstructured scenario: its own override, else the per-type budget"""
+    if scenario and scenario.get("max_new_tokens"):
+        return int(scenario["max_new_tokens"])
+    return DECODE_BUDGETS.get(output_type, UNSTRUCTURED_GENERATION_KWARGS["max_new_tokens"])
+
+PROMPT_SUFFIXES = {
+    "numeric": "\n\nAnswer with ONLY the number. No explanation, no additional text, just the number:",
+    "explanation": "\n\nProvide a clear, concise explanation:",
+    "simple": "\n\nAnswer with ONLY the answer. No explanation, no additional text, just the answer:",
+    "card_selection": "\n\nAnswer with ONLY the card name. No explanation, just the card name:",
+    "draft_pick": "\n\nAnswer with ONLY the card name you would pick. No explanation, just the card name:",
+    "combat_assignment": "\n\nAnswer with ONLY the damage assignment number. No explanation, just the number:",
+    "mana_cost": "\n\nAnswer with ONLY the mana cost in standard format (e.g., '2WW'). No explanation, just the cost:",
+    "phase": "\n\nAnswer with ONLY the phase name. No explanation, just the phase:",
+    "card_type": "\n\nAnswer with ONLY the card type. No explanation, just the type:",
+    "zone": "\n\nAnswer with ONLY the zone name. No explanation, just the zone:",
+}
+
+def structured_prompt_suffix(output_type: str, kwargs: Dict[str, Any]) -> str:
+    """Return the answer-format instruction appended to a structured prompt"""
+    from models.structured_schemas import SCHEMA_REGISTRY
+
+    if output_type == "card_selection" and "options" in kwargs:
+        options_str = ", ".join(kwargs['options'])
+        return f"\n\nChoose exactly ONE card from these options: {options_str}. Answer with ONLY the card name from the list above. No explanations, no additional text."
+    elif output_type == "multiple_choice" and "choices" in kwargs:
+        choices_str = ", ".join(kwargs['choices'])
+        return f"\n\nChoose exactly ONE option from: {choices_str}. Answer with ONLY the selected option from the list above. No explanations."
+    elif output_type == "numeric_range" and "min_val" in kwargs and "max_val" in kwargs:
+        return f"\n\nAnswer with a number between {kwargs['min_val']} and {kwargs['max_val']}. ONLY the number, no explanation."
+    elif output_type == "boolean":
+        return "\n\nAnswer with ONLY 'yes' or 'no'. Choose ONE definitive answer. No explanations, no qualifiers like 'it depends'."
+    elif output_type in SCHEMA_REGISTRY:
+        return PROMPT_SUFFIXES.get(output_type, "\n\nAnswer appropriately. No explanation, just the answer:")
+    # Fallback to simple answer
+    return PROMPT_SUFFIXES["simple"]
+
+def build_structured_prompt(prompt: str, output_type: str, kwargs: Dict[str, Any]) -> str:
+    """Build the full prompt OutlinesModel sends for a scenario"""
+    return f"{SHARED_PREFIX}{prompt}" + structured_prompt_suffix(output_type, kwargs)
+
+
+def extract_answer_from_text(text: str, output_type: Optional[str]) -> str:
+    """Extract the answer from raw model text: a JSON answer field, the first number, or yes/no"""
+    text = text.strip()
+    
+    # Try to extract from JSON-like string if needed
+    if text.startswith('{') and text.endswith('}'):
+        try:
+            result_dict = json.loads(text)
+            # Try common field names
+            for key in ['answer', 'value', 'selected_card', 'pick', 'damage_assignment', 'mana_cost', 'phase', 'card_type', 'zone', 'explanation']:
+                if key in result_dict:
+                    return str(result_dict[key]).strip()
+        except ValueError:
+            pass
+    
+    # For numeric outputs, extract the first number
+    if output_type in ["numeric", "combat_assignment", "numeric_range"]:
+        numbers = re.findall(r'-?\d+', text)
+        if numbers:
+            return numbers[0]
+    
+    # For boolean outputs, normalize
+    if output_type == "boolean":
+        text_lower = text.lower()
+        if text_lower in ["true", "yes", "y", "1"]:
+            return "yes"
+        elif text_lower in ["false", "no", "n", "0"]:
+            return "no"
+    
+    return text
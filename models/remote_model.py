@@ -0,0 +1,94 @@
+"""
+Client for the resident model worker (daemon.py): forwards batches over its Unix socket.
+
+Requests and replies are JSON lines. Every request carries the model spec (the
+create_model arguments), so the worker knows which model to have loaded.
+"""
+
+import json
+import socket
+from typing import Any, Dict, List, Optional
+
+DEFAULT_SOCKET_PATH = ".mtg_cache/daemon.sock"
+
+
+class DaemonError(RuntimeError):
+    pass
+
+
+def _connect(socket_path: str, timeout: Optional[float] = None) -> socket.socket:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(socket_path)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def daemon_request(socket_path: str, request: Dict[str, Any], timeout: Optional[float] = 5.0) -> Dict[str, Any]:
+    """Send one request on a fresh connection and return the reply"""
+    with _connect(socket_path, timeout) as sock, sock.makefile("rwb") as stream:
+        stream.write(json.dumps(request).encode("utf-8") + b"\n")
+        stream.flush()
+        line = stream.readline()
+    if not line:
+        raise DaemonError(f"Model daemon at {socket_path} closed the connection")
+    return json.loads(line)
+
+
+def daemon_running(socket_path: str) -> bool:
+    """Whether a model daemon answers on socket_path"""
+    try:
+        return "result" in daemon_request(socket_path, {"method": "status"}, timeout=2.0)
+    except (OSError, ValueError, DaemonError):
+        return False
+
+
+class RemoteModel:
+    """Model backend whose weights live in a daemon process; same calls as the local backends"""
+
+    def __init__(self, socket_path: str, spec: Dict[str, Any]):
+        self.socket_path = socket_path
+        self.spec = spec
+        # Per-prompt stats from the most recent run_batch call
+        self.last_batch_stats = []
+        # Prefix-cache savings during this client's requests only, not the daemon's lifetime
+        self.prefill_tokens_saved = 0
+        try:
+            self._sock = _connect(socket_path)
+        except OSError as e:
+            raise DaemonError(f"No model daemon at {socket_path} ({e}); start one with: python daemon.py") from e
+        self._stream = self._sock.makefile("rwb")
+
+    def _call(self, method: str, *args, **kwargs):
+        request = {"method": method, "model": self.spec, "args": list(args), "kwargs": kwargs}
+        self._stream.write(json.dumps(request).encode("utf-8") + b"\n")
+        self._stream.flush()
+        line = self._stream.readline()
+        if not line:
+            raise DaemonError(f"Model daemon at {self.socket_path} closed the connection")
+        reply = json.loads(line)
+        if "error" in reply:
+            raise DaemonError(reply["error"])
+        self.last_batch_stats = reply.get("last_batch_stats") or []
+        self.prefill_tokens_saved += reply.get("prefill_tokens_saved", 0)
+        return reply["result"]
+
+    def close(self):
+        self._stream.close()
+        self._sock.close()
+
+    def run(self, prompt: str, output_type: Optional[str] = None, **kwargs) -> str:
+        """Run inference on a single prompt"""
+        return self._call("run", prompt, output_type, **kwargs)
+
+    def run_batch(self, prompts: List[str], *args, **kwargs) -> List[str]:
+        return self._call("run_batch", prompts, *args, **kwargs)
+
+    def sample_batch(self, prompts: List[str], *args, **kwargs) -> List[List[str]]:
+        return self._call("sample_batch", prompts, *args, **kwargs)
+
+    def score_batch(self, prompts: List[str], *args, **kwargs) -> List[Dict]:
+        return self._call("score_batch", prompts, *args, **kwargs)
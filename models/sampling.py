@@ -0,0 +1,68 @@
+"""
+Multi-sample generation that prefills each prompt once.
+
+``generate(num_return_sequences=N)`` expands the inputs before the first forward pass, so
+each prompt is prefilled N times. Instead, the prompt's KV cache is built once and then
+repeated N times, and generate() only has to run the last prompt token for each sample.
+"""
+
+from typing import Dict, List
+
+import torch
+from transformers import DynamicCache
+
+from models.prompting import SAMPLING_KWARGS  # noqa: F401  (re-exported for the backends)
+
+
+def prefill_and_expand(model, inputs: Dict, num_samples: int) -> Dict:
+    """Prefill a tokenized batch once and return generate() kwargs with num_samples rows per prompt"""
+    input_ids = inputs["input_ids"]
+    attention_mask = inputs["attention_mask"]
+    past = inputs.get("past_key_values")
+    cached = past.get_seq_length() if past is not None else 0
+
+    # Everything but the last token is prefilled here; generate() needs it to produce the
+    # first sample's logits. Left padding means position ids come from the attention mask.
+    if input_ids.shape[1] - 1 > cached:
+        position_ids = attention_mask.long().cumsum(-1) - 1
+        position_ids.masked_fill_(attention_mask == 0, 1)
+        with torch.no_grad():
+            outputs = model(
+                input_ids=input_ids[:, cached:-1],
+                attention_mask=attention_mask[:, :-1],
+                position_ids=position_ids[:, cached:-1],
+                past_key_values=past,
+                use_cache=True,
+            )
+        past = outputs.past_key_values
+        if isinstance(past, tuple):
+            past = DynamicCache.from_legacy_cache(past)
+
+    expanded = {
+        "input_ids": input_ids.repeat_interleave(num_samples, dim=0),
+        "attention_mask": attention_mask.repeat_interleave(num_samples, dim=0),
+    }
+    if past is not None:
+        past.batch_repeat_interleave(num_samples)
+        expanded["past_key_values"] = past
+    return expanded
+
+
+def merge_sample_stats(stats: List[Dict], num_samples: int) -> List[Dict]:
+    """Collapse per-sample generation stats into one record per prompt"""
+    merged = []
+    for i in range(0, len(stats), num_samples):
+        group = [row for row in stats[i:i + num_samples] if row]
+        if not group:
+            merged.append(None)
+            continue
+        record = dict(group[0])
+        record["generated_tokens"] = sum(row.get("generated_tokens") or 0 for row in group)
+        for field in ("decode_seconds", "latency_seconds"):
+            values = [row[field] for row in group if row.get(field) is not None]
+            if values:
+                record[field] = max(values)
+        if record.get("latency_seconds"):
+            record["tokens_per_second"] = record["generated_tokens"] / record["latency_seconds"]
+        merged.append(record)
+    return merged
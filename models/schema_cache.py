@@ -0,0 +1,159 @@
+"""
+Process-wide cache of compiled structured-output generators.
+
+Building an outlines generator compiles the schema into a regex/FSM index over the
+tokenizer vocabulary, which is by far the most expensive part of a structured call.
+Most scenarios share a handful of schema shapes, so compiled generators are kept in
+an LRU cache keyed by the normalized schema and optionally persisted to disk.
+"""
+
+import hashlib
+import os
+import pickle
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from profiling import span
+
+
+def schema_key(output_type: str, kwargs: Dict[str, Any]) -> tuple:
+    """Normalize an output type and its schema kwargs into a hashable cache key"""
+    if output_type == "card_selection" and "options" in kwargs:
+        return (output_type, tuple(sorted(kwargs["options"])))
+    if output_type == "multiple_choice" and "choices" in kwargs:
+        return (output_type, tuple(sorted(kwargs["choices"])))
+    if output_type == "numeric_range" and "min_val" in kwargs and "max_val" in kwargs:
+        return (output_type, int(kwargs["min_val"]), int(kwargs["max_val"]))
+    return (output_type,)
+
+
+def vocabulary_digest(tokenizer) -> str:
+    """Short hash of a tokenizer's vocabulary; compiled indexes are only valid for that vocabulary"""
+    vocab = sorted(tokenizer.get_vocab().items())
+    return hashlib.sha256(repr(vocab).encode("utf-8")).hexdigest()[:16]
+
+
+class SchemaCache:
+    """LRU cache of compiled generators with hit/miss counters and optional disk persistence"""
+
+    def __init__(self, max_size: int = 64, persist_dir: Optional[str] = None):
+        self.max_size = max_size
+        self.persist_dir = persist_dir
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.compile_seconds = 0.0
+
+    def get_or_compile(self, key: tuple, compile_fn: Callable[[], Any],
+                       dump: Optional[Callable[[Any], Any]] = None,
+                       load: Optional[Callable[[Any], Any]] = None) -> Any:
+        """Return the cached value for key, compiling it with compile_fn on a miss.
+
+        ``dump`` turns a compiled value into something picklable for the disk cache and
+        ``load`` turns it back; without them the value itself is pickled.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+        with span("schema_cache.disk_load"):
+            value = self._load_from_disk(key, load)
+        if value is not None:
+            with self._lock:
+                self.disk_hits += 1
+        else:
+            start = time.perf_counter()
+            with span("schema_compile", key=repr(key[-1])):
+                value = compile_fn()
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.misses += 1
+                self.compile_seconds += elapsed
+            self._save_to_disk(key, value, dump)
+
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache counters for reporting"""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "compile_seconds": self.compile_seconds,
+            }
+
+    def clear(self):
+        """Drop all in-memory entries and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.disk_hits = self.misses = self.evictions = 0
+            self.compile_seconds = 0.0
+
+    def _disk_path(self, key: tuple) -> str:
+        digest = hashlib.sha256(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.persist_dir, f"{digest}.pkl")
+
+    def _load_from_disk(self, key: tuple, load: Optional[Callable[[Any], Any]]) -> Any:
+        if not self.persist_dir:
+            return None
+        path = self._disk_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                payload = pickle.load(f)
+            return load(payload) if load else payload
+        except Exception as e:
+            # A stale or incompatible entry just means we compile again
+            print(f"Warning: Ignoring unreadable schema cache entry {path}: {e}", file=sys.stderr)
+            return None
+
+    def _save_to_disk(self, key: tuple, value: Any, dump: Optional[Callable[[Any], Any]]):
+        if not self.persist_dir:
+            return
+        path = self._disk_path(key)
+        try:
+            os.makedirs(self.persist_dir, exist_ok=True)
+            payload = pickle.dumps(dump(value) if dump else value)
+            # Write to a temp file first so concurrent runs never read a partial entry
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Warning: Could not persist compiled schema, keeping it in memory only: {e}", file=sys.stderr)
+
+
+_SCHEMA_CACHE = SchemaCache()
+
+
+def get_schema_cache() -> SchemaCache:
+    """Return the process-wide schema cache"""
+    return _SCHEMA_CACHE
+
+
+def configure_schema_cache(max_size: Optional[int] = None, persist_dir: Optional[str] = None) -> SchemaCache:
+    """Adjust the process-wide schema cache size and persistence directory"""
+    if max_size is not None:
+        _SCHEMA_CACHE.max_size = max_size
+    if persist_dir is not None:
+        _SCHEMA_CACHE.persist_dir = persist_dir
+    return _SCHEMA_CACHE
@@ -4,8 +4,9 @@ This module defines Pydantic models for various MTG-specific structured outputs.
 """
 
 from pydantic import BaseModel, Field
-from typing import List, Optional, Literal, Union
+from typing import Any, Dict, List, Optional, Literal, Union
 from enum import Enum
+from functools import lru_cache
 
 # === Generic Answer Types ===
 
@@ -94,51 +95,71 @@ class DraftPickAnswer(BaseModel):
 # === Dynamic Schema Factory ===
 
 class SchemaFactory:
-    """Factory for creating dynamic schemas based on scenario requirements"""
+    """Factory for creating dynamic schemas based on scenario requirements.
+
+    Schemas are memoized on their arguments so repeated scenarios reuse the same class
+    instead of building a fresh pydantic model on every call.
+    """
     
     @staticmethod
     def create_card_selection_schema(options: List[str]) -> type:
         """Create a schema that constrains selection to specific card options"""
-        class DynamicCardSelection(BaseModel):
-            selected_card: str = Field(
-                ..., 
-                description="Selected card from the provided options",
-                enum=options
-            )
-        return DynamicCardSelection
+        return _card_selection_schema(tuple(options))
     
     @staticmethod
     def create_multiple_choice_schema(choices: List[str]) -> type:
         """Create a schema for multiple choice questions"""
-        class DynamicMultipleChoice(BaseModel):
-            answer: str = Field(
-                ..., 
-                description="Selected answer from the provided choices",
-                enum=choices
-            )
-        return DynamicMultipleChoice
+        return _multiple_choice_schema(tuple(choices))
     
     @staticmethod
     def create_boolean_schema() -> type:
         """Create a schema for boolean yes/no questions"""
-        class DynamicBoolean(BaseModel):
-            answer: Literal["yes", "no"] = Field(
-                ..., 
-                description="Boolean answer (yes/no)"
-            )
-        return DynamicBoolean
+        return _boolean_schema()
     
     @staticmethod
     def create_numeric_range_schema(min_val: int = 0, max_val: int = 100) -> type:
         """Create a schema for numeric answers within a range"""
-        class DynamicNumericRange(BaseModel):
-            value: int = Field(
-                ..., 
-                description="Numeric value within specified range",
-                ge=min_val,
-                le=max_val
-            )
-        return DynamicNumericRange
+        return _numeric_range_schema(min_val, max_val)
+
+@lru_cache(maxsize=256)
+def _card_selection_schema(options: tuple) -> type:
+    class DynamicCardSelection(BaseModel):
+        selected_card: str = Field(
+            ..., 
+            description="Selected card from the provided options",
+            enum=list(options)
+        )
+    return DynamicCardSelection
+
+@lru_cache(maxsize=256)
+def _multiple_choice_schema(choices: tuple) -> type:
+    class DynamicMultipleChoice(BaseModel):
+        answer: str = Field(
+            ..., 
+            description="Selected answer from the provided choices",
+            enum=list(choices)
+        )
+    return DynamicMultipleChoice
+
+@lru_cache(maxsize=None)
+def _boolean_schema() -> type:
+    class DynamicBoolean(BaseModel):
+        answer: Literal["yes", "no"] = Field(
+            ..., 
+            description="Boolean answer (yes/no)"
+        )
+    return DynamicBoolean
+
+@lru_cache(maxsize=256)
+def _numeric_range_schema(min_val: int, max_val: int) -> type:
+    class DynamicNumericRange(BaseModel):
+        value: int = Field(
+            ..., 
+            description="Numeric value within specified range",
+            ge=min_val,
+            le=max_val
+        )
+    return DynamicNumericRange
 
 # === Schema Registry ===
 
@@ -157,4 +178,18 @@ SCHEMA_REGISTRY = {
     "zone": ZoneAnswer,
     "priority": PriorityAnswer,
     "draft_pick": DraftPickAnswer,
-}
\ No newline at end of file
+}
+
+
+def schema_for(output_type: str, kwargs: Dict[str, Any]) -> type:
+    """Pick the output schema for a scenario, building option/range-specific ones as needed"""
+    if output_type == "card_selection" and "options" in kwargs:
+        return SchemaFactory.create_card_selection_schema(kwargs["options"])
+    elif output_type == "multiple_choice" and "choices" in kwargs:
+        return SchemaFactory.create_multiple_choice_schema(kwargs["choices"])
+    elif output_type == "numeric_range" and "min_val" in kwargs and "max_val" in kwargs:
+        return SchemaFactory.create_numeric_range_schema(kwargs["min_val"], kwargs["max_val"])
+    elif output_type == "boolean":
+        return SchemaFactory.create_boolean_schema()
+    # Fallback to simple answer
+    return SCHEMA_REGISTRY.get(output_type, SCHEMA_REGISTRY["simple"])
@@ -0,0 +1,88 @@
+"""
+Three-stage pipelined executor: prepare ahead of, and finish behind, the model stage.
+
+The caller's thread runs ``execute`` (the model) on one batch while a producer thread
+prepares the next batch and a consumer thread finishes the previous one. Bounded queues
+apply backpressure, so at most ``depth`` batches wait on either side of the model. Items
+reach ``finish`` in the order they were given. The first error in any stage stops the
+pipeline and is re-raised in the caller.
+"""
+
+import queue
+import threading
+from typing import Callable, Iterable
+
+_DONE = object()
+_POLL_SECONDS = 0.1
+
+
+def _put(q: queue.Queue, item, stop: threading.Event) -> bool:
+    """Put unless the pipeline is stopping; return whether the item was queued"""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=_POLL_SECONDS)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(q: queue.Queue, stop: threading.Event):
+    """Next item, or _DONE once the pipeline is stopping"""
+    while not stop.is_set():
+        try:
+            return q.get(timeout=_POLL_SECONDS)
+        except queue.Empty:
+            continue
+    return _DONE
+
+
+def run_pipeline(items: Iterable, prepare: Callable, execute: Callable, finish: Callable, depth: int = 2):
+    """Run finish(execute(prepare(item))) for every item, overlapping the three stages"""
+    prepared: queue.Queue = queue.Queue(maxsize=depth)
+    executed: queue.Queue = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    errors = []
+
+    def produce():
+        try:
+            for item in items:
+                if not _put(prepared, prepare(item), stop):
+                    return
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            _put(prepared, _DONE, stop)
+
+    def consume():
+        try:
+            while True:
+                job = _get(executed, stop)
+                if job is _DONE:
+                    return
+                finish(job)
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+
+    producer = threading.Thread(target=produce, name="pipeline-prepare", daemon=True)
+    consumer = threading.Thread(target=consume, name="pipeline-finish", daemon=True)
+    producer.start()
+    consumer.start()
+    try:
+        while True:
+            job = _get(prepared, stop)
+            if job is _DONE:
+                break
+            if not _put(executed, execute(job), stop):
+                break
+        _put(executed, _DONE, stop)
+    except BaseException:
+        stop.set()
+        raise
+    finally:
+        consumer.join()
+        stop.set()
+        producer.join()
+    if errors:
+        raise errors[0]
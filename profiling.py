@@ -0,0 +1,144 @@
+"""
+Built-in profiling: named spans around the run's phases, exported as a Chrome/Perfetto trace.
+
+Spans are no-ops until ``start_profiling`` is called, so instrumented code pays only a
+function call when profiling is off. On top of spans, ``cprofile`` mode also collects
+Python-level function stats and ``torch`` mode runs the torch profiler (operator-level
+CPU/CUDA timings with its own trace file). Open the trace in chrome://tracing or
+https://ui.perfetto.dev.
+"""
+
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+PROFILE_MODES = ["spans", "cprofile", "torch"]
+DEFAULT_TRACE_PATH = ".mtg_cache/trace.json"
+
+
+class Profiler:
+    """Collects spans and, depending on mode, drives cProfile or the torch profiler"""
+
+    def __init__(self, mode: str = "spans", trace_path: str = DEFAULT_TRACE_PATH, top: int = 25):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode: {mode}")
+        self.mode = mode
+        self.trace_path = trace_path
+        self.top = top
+        self.events: List[Dict] = []
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self._cprofile = None
+        self._torch_profiler = None
+
+    def start(self):
+        if self.mode == "cprofile":
+            import cProfile
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        elif self.mode == "torch":
+            import torch
+            activities = [torch.profiler.ProfilerActivity.CPU]
+            if torch.cuda.is_available():
+                activities.append(torch.profiler.ProfilerActivity.CUDA)
+            self._torch_profiler = torch.profiler.profile(activities=activities, record_shapes=True)
+            self._torch_profiler.__enter__()
+
+    def record(self, name: str, start: float, end: float, args: Optional[Dict] = None):
+        event = {
+            "name": name,
+            "ph": "X",
+            "ts": (start - self._origin) * 1e6,
+            "dur": (end - start) * 1e6,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+        }
+        if args:
+            event["args"] = args
+        with self._lock:
+            self.events.append(event)
+
+    def span_totals(self) -> List[Dict]:
+        """Per-span-name count and total time, slowest first"""
+        totals: Dict[str, Dict] = {}
+        for event in self.events:
+            entry = totals.setdefault(event["name"], {"name": event["name"], "count": 0, "seconds": 0.0})
+            entry["count"] += 1
+            entry["seconds"] += event["dur"] / 1e6
+        return sorted(totals.values(), key=lambda entry: entry["seconds"], reverse=True)
+
+    def stop(self, out=sys.stderr):
+        """Stop collection, write the trace file(s) and print the hot-spot tables"""
+        if self._cprofile is not None:
+            self._cprofile.disable()
+        if self._torch_profiler is not None:
+            self._torch_profiler.__exit__(None, None, None)
+
+        directory = os.path.dirname(self.trace_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.trace_path, "w") as f:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
+
+        print(f"\n--- PROFILE ({self.mode}) ---", file=out)
+        print(f"Trace: {self.trace_path}", file=out)
+        for entry in self.span_totals():
+            print(f"  {entry['seconds']:9.3f}s  {entry['count']:6d}x  {entry['name']}", file=out)
+
+        if self._cprofile is not None:
+            import pstats
+            stats_path = os.path.splitext(self.trace_path)[0] + ".prof"
+            self._cprofile.dump_stats(stats_path)
+            print(f"\nTop {self.top} functions by cumulative time (full stats: {stats_path}):", file=out)
+            pstats.Stats(self._cprofile, stream=out).sort_stats("cumulative").print_stats(self.top)
+        if self._torch_profiler is not None:
+            torch_trace = os.path.splitext(self.trace_path)[0] + ".torch.json"
+            self._torch_profiler.export_chrome_trace(torch_trace)
+            print(f"\nTop {self.top} torch operators (trace: {torch_trace}):", file=out)
+            import torch
+            sort_by = "cuda_time_total" if torch.cuda.is_available() else "cpu_time_total"
+            print(self._torch_profiler.key_averages().table(sort_by=sort_by, row_limit=self.top), file=out)
+
+
+_PROFILER: Optional[Profiler] = None
+
+
+def start_profiling(mode: str = "spans", trace_path: str = DEFAULT_TRACE_PATH, top: int = 25) -> Profiler:
+    """Enable spans (and the mode's profiler) for the rest of the process"""
+    global _PROFILER
+    _PROFILER = Profiler(mode, trace_path, top)
+    _PROFILER.start()
+    return _PROFILER
+
+
+def stop_profiling():
+    """Write the trace and report, then turn spans back into no-ops"""
+    global _PROFILER
+    if _PROFILER is not None:
+        profiler, _PROFILER = _PROFILER, None
+        profiler.stop()
+
+
+@contextlib.contextmanager
+def _timed_span(profiler: Profiler, name: str, args: Optional[Dict]):
+    with contextlib.ExitStack() as stack:
+        if profiler.mode == "torch":
+            # Also label the span in the torch profiler's own trace
+            import torch
+            stack.enter_context(torch.profiler.record_function(name))
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            profiler.record(name, start, time.perf_counter(), args)
+
+
+def span(name: str, **args):
+    """Context manager timing a named phase; free when profiling is off"""
+    if _PROFILER is None:
+        return contextlib.nullcontext()
+    return _timed_span(_PROFILER, name, args or None)
@@ -0,0 +1,114 @@
+"""
+Persistent cache of model responses so unchanged scenarios are not re-inferred.
+
+Responses are stored in a local SQLite file keyed by a hash of everything that
+determines the model output: backend, model name and revision, the full prompt,
+the schema key and the decoding parameters.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+CACHE_MODES = ["off", "read", "readwrite", "refresh"]
+
+
+def response_key(backend: str, model_name: str, revision: str, prompt: str,
+                 schema: Optional[tuple], decoding: Dict) -> str:
+    """Hash the inputs that determine a model response into a cache key"""
+    payload = json.dumps({
+        "backend": backend,
+        "model": model_name,
+        "revision": revision,
+        "prompt": prompt,
+        "schema": list(schema) if schema is not None else None,
+        "decoding": decoding,
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed response cache with off/read/readwrite/refresh modes"""
+
+    def __init__(self, path: str, mode: str = "readwrite"):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+        if mode != "off":
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # --workers shards read and write the same file at the same time
+            self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY,"
+                " output TEXT NOT NULL,"
+                " model TEXT,"
+                " created_at REAL)"
+            )
+            self._conn.commit()
+
+    @property
+    def reads(self) -> bool:
+        return self.mode in ("read", "readwrite")
+
+    @property
+    def writes_enabled(self) -> bool:
+        return self.mode in ("readwrite", "refresh")
+
+    def lookup(self, keys: List[str]) -> Dict[str, str]:
+        """Return cached outputs for whichever of keys are present"""
+        if not self.reads or not keys:
+            return {}
+        found = {}
+        with self._lock:
+            unique = list(dict.fromkeys(keys))
+            # Stay well under SQLite's bound-parameter limit
+            for i in range(0, len(unique), 500):
+                chunk = unique[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, output FROM responses WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                found.update(rows)
+            self.hits += sum(1 for key in keys if key in found)
+            self.misses += sum(1 for key in keys if key not in found)
+        return found
+
+    def store(self, items: Iterable[Tuple[str, str]], model_name: str = None):
+        """Write (key, output) pairs to the cache"""
+        if not self.writes_enabled:
+            return
+        now = time.time()
+        rows = [(key, output, model_name, now) for key, output in items]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO responses (key, output, model, created_at) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+            self.writes += len(rows)
+
+    def stats(self) -> Dict:
+        """Return cache counters for reporting"""
+        return {"mode": self.mode, "hits": self.hits, "misses": self.misses, "writes": self.writes}
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
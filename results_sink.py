@@ -0,0 +1,159 @@
+"""
+Streaming JSONL results: one record per scenario, appended as soon as it is evaluated.
+
+A crash or preemption only loses the batch in flight, and ``--resume`` picks up where the
+file ends. Summaries and the JSON report are built by streaming over the file, so memory
+does not grow with corpus size.
+"""
+
+import json
+import os
+import sys
+from typing import Dict, IO, Iterable, Iterator, List, Optional, Set
+
+
+def _truncate_partial_line(path: str):
+    """Drop a half-written final record left behind by a crash mid-write"""
+    with open(path, "rb+") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        if size == 0:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return
+        # Walk back to the last complete line
+        position = size - 1
+        while position > 0:
+            step = min(4096, position)
+            f.seek(position - step)
+            chunk = f.read(step)
+            newline = chunk.rfind(b"\n")
+            if newline != -1:
+                f.truncate(position - step + newline + 1)
+                return
+            position -= step
+        f.truncate(0)
+
+
+class ResultsWriter:
+    """Append evaluated results to a JSONL file, flushing to disk at batch boundaries"""
+
+    def __init__(self, path: str, append: bool = False):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if append and os.path.exists(path):
+            _truncate_partial_line(path)
+        self._file = open(path, "a" if append else "w", encoding="utf-8")
+        self.written = 0
+
+    def write(self, result: Dict):
+        self._file.write(json.dumps(result, separators=(",", ":")) + "\n")
+        self.written += 1
+
+    def flush(self):
+        """Make everything written so far durable"""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+
+def iter_results(path: str) -> Iterator[Dict]:
+    """Stream records from a results file, skipping a truncated final line"""
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                print(f"Warning: Skipping unreadable record at {path}:{line_number}", file=sys.stderr)
+
+
+def recorded_ids(path: str) -> Set[str]:
+    """Scenario IDs already recorded in a results file (empty if it does not exist yet)"""
+    if not os.path.exists(path):
+        return set()
+    return {record["id"] for record in iter_results(path)}
+
+
+def _percentile(values: List[float], fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def summarize_results(results: Iterable[Dict]) -> Dict:
+    """Pass/fail, token, latency, consistency, draft and peak-memory totals in a single pass over results"""
+    counts = {"total": 0, "passed": 0, "generated_tokens": 0, "prompt_tokens": 0}
+    latencies, ttfts, pass_rates = [], [], []
+    drafted = {}
+    peak_rss = peak_accelerator = None
+    for result in results:
+        counts["total"] += 1
+        counts["passed"] += 1 if result["passed"] else 0
+        counts["generated_tokens"] += result.get("generated_tokens") or 0
+        counts["prompt_tokens"] += result.get("prompt_tokens") or 0
+        if result.get("latency_seconds") is not None:
+            latencies.append(result["latency_seconds"])
+        if result.get("ttft_seconds") is not None:
+            ttfts.append(result["ttft_seconds"])
+        if result.get("pass_rate") is not None:
+            pass_rates.append(result["pass_rate"])
+        if result.get("draft_tokens") is not None:
+            totals = drafted.setdefault(result.get("output_type") or "unknown", {
+                "scenarios": 0, "draft_tokens": 0, "accepted_draft_tokens": 0, "generated_tokens": 0, "target_steps": 0,
+            })
+            totals["scenarios"] += 1
+            for field in ("draft_tokens", "accepted_draft_tokens", "generated_tokens", "target_steps"):
+                totals[field] += result.get(field) or 0
+        if result.get("batch_peak_rss_mb") is not None:
+            peak_rss = max(peak_rss or 0.0, result["batch_peak_rss_mb"])
+        if result.get("batch_peak_accelerator_mb") is not None:
+            peak_accelerator = max(peak_accelerator or 0.0, result["batch_peak_accelerator_mb"])
+    counts["latency"] = {
+        "measured": len(latencies),
+        "mean_seconds": sum(latencies) / len(latencies) if latencies else None,
+        "p50_seconds": _percentile(latencies, 0.5),
+        "p95_seconds": _percentile(latencies, 0.95),
+        "mean_ttft_seconds": sum(ttfts) / len(ttfts) if ttfts else None,
+    }
+    # Repeat runs: how often samples pass, and how many scenarios answer the same way every time
+    counts["consistency"] = {
+        "repeated": len(pass_rates),
+        "mean_pass_rate": sum(pass_rates) / len(pass_rates) if pass_rates else None,
+        "mean_pass_variance": sum(p * (1 - p) for p in pass_rates) / len(pass_rates) if pass_rates else None,
+        "unanimous": sum(1 for p in pass_rates if p in (0.0, 1.0)),
+    }
+    # Assisted decoding per output type: the share of drafted tokens the target kept, and
+    # tokens per target forward pass (plain decoding makes one per pass)
+    counts["assisted"] = {
+        output_type: dict(
+            totals,
+            acceptance_rate=totals["accepted_draft_tokens"] / totals["draft_tokens"] if totals["draft_tokens"] else None,
+            step_speedup=totals["generated_tokens"] / totals["target_steps"] if totals["target_steps"] else None,
+        )
+        for output_type, totals in sorted(drafted.items())
+    }
+    counts["peak_rss_mb"] = peak_rss
+    counts["peak_accelerator_mb"] = peak_accelerator
+    return counts
+
+
+def write_json_report(summary: Dict, results: Iterable[Dict], out: IO[str]):
+    """Write {"summary": ..., "results": [...]} while streaming the results array"""
+    out.write('{\n  "summary": ')
+    out.write(json.dumps(summary, indent=2).replace("\n", "\n  "))
+    out.write(',\n  "results": [')
+    count = 0
+    for result in results:
+        out.write(("," if count else "") + "\n    " + json.dumps(result, indent=2).replace("\n", "\n    "))
+        count += 1
+    out.write("\n  ]\n}" if count else "]\n}")
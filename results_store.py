@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+Results history: every run appended to a local SQLite store, with a query CLI.
+
+    python results_store.py runs                        # recent runs and their pass rates
+    python results_store.py categories --model M        # per-category pass rates of M's latest run
+    python results_store.py delta MODEL_A MODEL_B       # latest runs of two models, scenario by scenario
+    python results_store.py flaky                       # scenarios that both passed and failed for a model
+    python results_store.py latency --by category       # latency percentiles
+
+Results are indexed by run, scenario id and category, and runs by model and start time,
+so queries read only the runs they ask about. Per-(model, scenario) pass counts are kept
+up to date as runs are recorded, so finding flaky scenarios never scans the history.
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import time
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from results_sink import iter_results
+
+DEFAULT_STORE_PATH = ".mtg_cache/results.sqlite"
+GROUP_FIELDS = ["category", "subcategory", "evaluator", "output_type"]
+PERCENTILES = (0.5, 0.9, 0.95, 0.99)
+# Rows per executemany while a run is recorded
+CHUNK_SIZE = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY,
+    started_at REAL NOT NULL,
+    model TEXT NOT NULL,
+    backend TEXT,
+    revision TEXT,
+    structured INTEGER,
+    sampled INTEGER,
+    total INTEGER,
+    passed INTEGER,
+    duration_seconds REAL,
+    settings TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_by_model ON runs (model, started_at);
+CREATE INDEX IF NOT EXISTS runs_by_time ON runs (started_at);
+CREATE TABLE IF NOT EXISTS results (
+    run_id INTEGER NOT NULL REFERENCES runs (run_id),
+    scenario_id TEXT NOT NULL,
+    category TEXT,
+    subcategory TEXT,
+    evaluator TEXT,
+    output_type TEXT,
+    passed INTEGER NOT NULL,
+    cached INTEGER,
+    latency_seconds REAL,
+    ttft_seconds REAL,
+    generated_tokens INTEGER,
+    actual_output TEXT,
+    UNIQUE (run_id, scenario_id)
+);
+CREATE INDEX IF NOT EXISTS results_by_scenario ON results (scenario_id, run_id);
+CREATE INDEX IF NOT EXISTS results_by_category ON results (category, run_id);
+CREATE TABLE IF NOT EXISTS scenario_stats (
+    model TEXT NOT NULL,
+    scenario_id TEXT NOT NULL,
+    runs INTEGER NOT NULL,
+    passes INTEGER NOT NULL,
+    last_run_id INTEGER,
+    last_passed INTEGER,
+    PRIMARY KEY (model, scenario_id)
+) WITHOUT ROWID;
+"""
+
+RESULT_COLUMNS = ["run_id", "scenario_id", "category", "subcategory", "evaluator", "output_type", "passed",
+                  "cached", "latency_seconds", "ttft_seconds", "generated_tokens", "actual_output"]
+
+
+def _percentile_ranks(count: int, fractions: Sequence[float]) -> List[int]:
+    # Same nearest-rank convention as the run summary's percentiles
+    return [min(count - 1, int(round(fraction * (count - 1)))) for fraction in fractions]
+
+
+class ResultsStore:
+    """SQLite history of runs and their per-scenario results"""
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Comparison workers may record their runs at the same time
+        self._conn = sqlite3.connect(path, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # WAL stays consistent without an fsync per transaction; a crash loses at most the last run
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+    def record_run(self, results: Iterable[Dict], model: str, backend: Optional[str] = None,
+                   revision: Optional[str] = None, structured: bool = False, sampled: bool = False,
+                   duration_seconds: Optional[float] = None, settings: Optional[Dict] = None,
+                   started_at: Optional[float] = None) -> int:
+        """Append a run, streaming its results in chunks; return its run_id"""
+        conn = self._conn
+        with conn:
+            run_id = conn.execute(
+                "INSERT INTO runs (started_at, model, backend, revision, structured, sampled, duration_seconds, "
+                "settings) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (started_at if started_at is not None else time.time(), model, backend, revision, int(structured),
+                 int(sampled), duration_seconds, json.dumps(settings or {}, sort_keys=True)),
+            ).lastrowid
+            seen = set()
+            total = passed = 0
+            chunk = []
+            for result in results:
+                # A resumed results file can repeat a scenario; the first record wins
+                if result["id"] in seen:
+                    continue
+                seen.add(result["id"])
+                total += 1
+                passed += 1 if result["passed"] else 0
+                chunk.append(result)
+                if len(chunk) >= CHUNK_SIZE:
+                    self._insert(run_id, model, chunk)
+                    chunk = []
+            self._insert(run_id, model, chunk)
+            conn.execute("UPDATE runs SET total = ?, passed = ? WHERE run_id = ?", (total, passed, run_id))
+        return run_id
+
+    def _insert(self, run_id: int, model: str, results: List[Dict]):
+        if not results:
+            return
+        self._conn.executemany(
+            f"INSERT INTO results ({', '.join(RESULT_COLUMNS)}) VALUES ({', '.join('?' * len(RESULT_COLUMNS))})",
+            [(run_id, r["id"], r.get("category"), r.get("subcategory"), r.get("evaluator"), r.get("output_type"),
+              int(bool(r["passed"])), int(bool(r.get("cached"))), r.get("latency_seconds"), r.get("ttft_seconds"),
+              r.get("generated_tokens"), r.get("actual_output")) for r in results],
+        )
+        self._conn.executemany(
+            "INSERT INTO scenario_stats (model, scenario_id, runs, passes, last_run_id, last_passed) "
+            "VALUES (?, ?, 1, ?, ?, ?) ON CONFLICT (model, scenario_id) DO UPDATE SET "
+            "runs = runs + 1, passes = passes + excluded.passes, "
+            "last_run_id = excluded.last_run_id, last_passed = excluded.last_passed",
+            [(model, r["id"], int(bool(r["passed"])), run_id, int(bool(r["passed"]))) for r in results],
+        )
+
+    def runs(self, model: Optional[str] = None, since: Optional[float] = None, limit: Optional[int] = 20) -> List[Dict]:
+        """Recorded runs, newest first"""
+        clauses, params = [], []
+        if model:
+            clauses.append("model = ?")
+            params.append(model)
+        if since is not None:
+            clauses.append("started_at >= ?")
+            params.append(since)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        limit_clause = "LIMIT ?" if limit else ""
+        if limit:
+            params.append(limit)
+        cursor = self._conn.execute(
+            f"SELECT run_id, started_at, model, backend, revision, structured, sampled, total, passed, "
+            f"duration_seconds FROM runs {where} ORDER BY started_at DESC, run_id DESC {limit_clause}", params)
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor]
+
+    def select_runs(self, model: Optional[str] = None, run_id: Optional[int] = None, last: int = 1,
+                    since: Optional[float] = None) -> List[int]:
+        """run_ids to query: the given one, or the ``last`` N runs (0 for all) matching model and since"""
+        if run_id is not None:
+            return [run_id]
+        return [run["run_id"] for run in self.runs(model, since, last or None)]
+
+    def pass_rates(self, run_ids: List[int], by: str = "category") -> List[Dict]:
+        """Pass rate per group (category, subcategory, evaluator or output type) over the given runs"""
+        if by not in GROUP_FIELDS:
+            raise ValueError(f"Cannot group by {by!r}; choose from {', '.join(GROUP_FIELDS)}")
+        if not run_ids:
+            return []
+        placeholders = ",".join("?" * len(run_ids))
+        rows = self._conn.execute(
+            f"SELECT {by}, COUNT(*), SUM(passed) FROM results WHERE run_id IN ({placeholders}) "
+            f"GROUP BY {by} ORDER BY {by}", run_ids).fetchall()
+        return [{by: group, "total": total, "passed": passed, "pass_rate": passed / total}
+                for group, total, passed in rows]
+
+    def delta(self, run_a: int, run_b: int, by: str = "category") -> Dict:
+        """Per-group pass rates of two runs over the scenarios both ran, and the scenarios that flipped"""
+        if by not in GROUP_FIELDS:
+            raise ValueError(f"Cannot group by {by!r}; choose from {', '.join(GROUP_FIELDS)}")
+        join = "FROM results a JOIN results b ON b.run_id = ? AND b.scenario_id = a.scenario_id WHERE a.run_id = ?"
+        groups = [{by: group, "shared": shared, "passed_a": passed_a, "passed_b": passed_b,
+                   "delta": (passed_b - passed_a) / shared}
+                  for group, shared, passed_a, passed_b in self._conn.execute(
+                      f"SELECT a.{by}, COUNT(*), SUM(a.passed), SUM(b.passed) {join} GROUP BY a.{by} ORDER BY a.{by}",
+                      (run_b, run_a))]
+        flipped = self._conn.execute(
+            f"SELECT a.scenario_id, b.passed {join} AND a.passed != b.passed ORDER BY a.scenario_id",
+            (run_b, run_a)).fetchall()
+        return {
+            "run_a": run_a,
+            "run_b": run_b,
+            "groups": groups,
+            "fixed": [scenario_id for scenario_id, passed in flipped if passed],
+            "regressed": [scenario_id for scenario_id, passed in flipped if not passed],
+        }
+
+    def flaky(self, model: Optional[str] = None, min_runs: int = 2, limit: Optional[int] = 50) -> List[Dict]:
+        """Scenarios that have both passed and failed for the same model, closest to 50/50 first"""
+        clauses, params = ["runs >= ?", "passes > 0", "passes < runs"], [min_runs]
+        if model:
+            clauses.append("model = ?")
+            params.append(model)
+        limit_clause = "LIMIT ?" if limit else ""
+        if limit:
+            params.append(limit)
+        rows = self._conn.execute(
+            f"SELECT model, scenario_id, runs, passes, last_passed FROM scenario_stats "
+            f"WHERE {' AND '.join(clauses)} ORDER BY ABS(0.5 - CAST(passes AS REAL) / runs), runs DESC, scenario_id "
+            f"{limit_clause}", params).fetchall()
+        return [{"model": model_name, "scenario_id": scenario_id, "runs": runs, "passes": passes,
+                 "pass_rate": passes / runs, "last_passed": bool(last_passed)}
+                for model_name, scenario_id, runs, passes, last_passed in rows]
+
+    def latency(self, run_ids: List[int], by: Optional[str] = None, field: str = "latency_seconds",
+                fractions: Sequence[float] = PERCENTILES) -> List[Dict]:
+        """Percentiles of a per-scenario timing over the given runs, overall or per group.
+
+        Values are streamed in sorted order and only the ranks asked for are kept.
+        """
+        if by is not None and by not in GROUP_FIELDS:
+            raise ValueError(f"Cannot group by {by!r}; choose from {', '.join(GROUP_FIELDS)}")
+        if field not in ("latency_seconds", "ttft_seconds"):
+            raise ValueError(f"No timing field {field!r}")
+        if not run_ids:
+            return []
+        placeholders = ",".join("?" * len(run_ids))
+        group = by or "NULL"
+        where = f"WHERE run_id IN ({placeholders}) AND {field} IS NOT NULL"
+        counts = self._conn.execute(
+            f"SELECT {group}, COUNT(*), AVG({field}) FROM results {where} GROUP BY {group} ORDER BY {group}",
+            run_ids).fetchall()
+        rows = []
+        values = self._conn.execute(f"SELECT {field} FROM results {where} ORDER BY {group}, {field}", run_ids)
+        for name, count, mean in counts:
+            ranks = _percentile_ranks(count, fractions)
+            picked = {}
+            for rank in range(count):
+                value = next(values)[0]
+                if rank in ranks:
+                    picked[rank] = value
+            row = {by: name} if by else {}
+            row.update({"measured": count, "mean_seconds": mean})
+            row.update({f"p{fraction * 100:g}_seconds": picked[rank] for fraction, rank in zip(fractions, ranks)})
+            rows.append(row)
+        return rows
+
+
+def record_run(path: str, results: Iterable[Dict], model: str, **run_info) -> int:
+    """Append one run to the store at path; see ResultsStore.record_run"""
+    store = ResultsStore(path)
+    try:
+        return store.record_run(results, model, **run_info)
+    finally:
+        store.close()
+
+
+def _format_time(timestamp: float) -> str:
+    return time.strftime("%Y-%m-%d %H:%M", time.localtime(timestamp))
+
+
+def _percent(value: Optional[float]) -> str:
+    return f"{value * 100:.1f}%" if value is not None else "-"
+
+
+def _print_table(rows: List[Dict], columns: List[str]):
+    if not rows:
+        print("(no matching results)")
+        return
+    def cell(value):
+        if value is None:
+            return "-"
+        return f"{value:.3f}" if isinstance(value, float) else str(value)
+    cells = [[cell(row[column]) for column in columns] for row in rows]
+    widths = [max(len(column), *(len(cell[i]) for cell in cells)) for i, column in enumerate(columns)]
+    print("  ".join(column.ljust(width) for column, width in zip(columns, widths)))
+    for cell in cells:
+        print("  ".join(value.ljust(width) for value, width in zip(cell, widths)))
+
+
+def _latest_run(store: ResultsStore, model: str) -> int:
+    runs = store.select_runs(model=model)
+    if not runs:
+        raise SystemExit(f"No recorded runs for {model}")
+    return runs[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the history of recorded test runs")
+    parser.add_argument("--store-path", default=DEFAULT_STORE_PATH, help="SQLite results store")
+    parser.add_argument("--json", action="store_true", help="Print the query result as JSON")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def run_selection(command):
+        command.add_argument("--model", default=None, help="Only runs of this model")
+        command.add_argument("--run", type=int, default=None, help="A single run id (see the runs command)")
+        command.add_argument("--last", type=int, default=1, help="Number of most recent matching runs (0 for all)")
+        command.add_argument("--since", default=None, metavar="YYYY-MM-DD", help="Only runs started on or after")
+
+    runs = commands.add_parser("runs", help="Recent runs and their pass rates")
+    runs.add_argument("--model", default=None)
+    runs.add_argument("--since", default=None, metavar="YYYY-MM-DD")
+    runs.add_argument("--limit", type=int, default=20)
+    categories = commands.add_parser("categories", help="Pass rate per category (or --by another field)")
+    run_selection(categories)
+    categories.add_argument("--by", choices=GROUP_FIELDS, default="category")
+    delta = commands.add_parser("delta", help="Compare the latest runs of two models (or two --runs)")
+    delta.add_argument("models", nargs="*", metavar="MODEL")
+    delta.add_argument("--runs", type=int, nargs=2, default=None, metavar=("RUN_A", "RUN_B"))
+    delta.add_argument("--by", choices=GROUP_FIELDS, default="category")
+    flaky = commands.add_parser("flaky", help="Scenarios that have both passed and failed for the same model")
+    flaky.add_argument("--model", default=None)
+    flaky.add_argument("--min-runs", type=int, default=2)
+    flaky.add_argument("--limit", type=int, default=50)
+    latency = commands.add_parser("latency", help="Latency percentiles, overall or --by a field")
+    run_selection(latency)
+    latency.add_argument("--by", choices=GROUP_FIELDS, default=None)
+    latency.add_argument("--field", choices=["latency_seconds", "ttft_seconds"], default="latency_seconds")
+    import_file = commands.add_parser("import", help="Record an existing JSONL results file as a run")
+    import_file.add_argument("results_file")
+    import_file.add_argument("--model", required=True)
+    import_file.add_argument("--backend", default=None)
+    args = parser.parse_args()
+
+    since = getattr(args, "since", None)
+    if since is not None:
+        since = time.mktime(time.strptime(since, "%Y-%m-%d"))
+    store = ResultsStore(args.store_path)
+    try:
+        if args.command == "runs":
+            output = store.runs(args.model, since, args.limit)
+            for run in output:
+                run["pass_rate"] = run["passed"] / run["total"] if run["total"] else None
+            if not args.json:
+                _print_table([dict(run, started_at=_format_time(run["started_at"]),
+                                   pass_rate=_percent(run["pass_rate"]),
+                                   sampled="yes" if run["sampled"] else "") for run in output],
+                             ["run_id", "started_at", "model", "backend", "total", "pass_rate", "sampled"])
+        elif args.command == "categories":
+            output = store.pass_rates(store.select_runs(args.model, args.run, args.last, since), args.by)
+            if not args.json:
+                _print_table([dict(row, pass_rate=_percent(row["pass_rate"])) for row in output],
+                             [args.by, "total", "passed", "pass_rate"])
+        elif args.command == "delta":
+            if args.runs:
+                run_a, run_b = args.runs
+            elif len(args.models) == 2:
+                run_a, run_b = (_latest_run(store, model) for model in args.models)
+            else:
+                parser.error("delta needs two models or --runs RUN_A RUN_B")
+            output = store.delta(run_a, run_b, args.by)
+            if not args.json:
+                print(f"Run {run_a} -> run {run_b}")
+                _print_table([dict(row, delta=f"{row['delta'] * 100:+.1f}%") for row in output["groups"]],
+                             [args.by, "shared", "passed_a", "passed_b", "delta"])
+                print(f"Fixed ({len(output['fixed'])}): {', '.join(output['fixed'])}")
+                print(f"Regressed ({len(output['regressed'])}): {', '.join(output['regressed'])}")
+        elif args.command == "flaky":
+            output = store.flaky(args.model, args.min_runs, args.limit)
+            if not args.json:
+                _print_table([dict(row, pass_rate=_percent(row["pass_rate"]),
+                                   last_passed="PASS" if row["last_passed"] else "FAIL") for row in output],
+                             ["model", "scenario_id", "runs", "passes", "pass_rate", "last_passed"])
+        elif args.command == "latency":
+            output = store.latency(store.select_runs(args.model, args.run, args.last, since), args.by, args.field)
+            if not args.json:
+                _print_table(output, list(output[0]) if output else [])
+        else:
+            run_id = store.record_run(iter_results(args.results_file), args.model, backend=args.backend,
+                                      started_at=os.path.getmtime(args.results_file))
+            output = {"run_id": run_id}
+            if not args.json:
+                print(f"Recorded {args.results_file} as run {run_id}")
+    finally:
+        store.close()
+    if args.json:
+        print(json.dumps(output, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,184 +3,434 @@
 Runner script for MTG LLM tests with machine-compilable output options.
 """
 
-from models.hf_transformer import HFTransformerModel
-from models.outlines_model import OutlinesModel
+# Heavy dependencies (torch, transformers, outlines, yaml) are imported lazily so that
+# --help, dry runs and fully cached runs start instantly.
+from models.lazy_model import LazyModel
+from models.schema_cache import configure_schema_cache, get_schema_cache, schema_key
+from models.answer_grammars import CONSTRAINT_MODES
+from models.prompting import build_structured_prompt, decode_budget, STRUCTURED_GENERATION_KWARGS, UNSTRUCTURED_GENERATION_KWARGS, SAMPLING_KWARGS
 from evaluators import get_evaluator
-import yaml
+from output_types import extract_card_options_from_prompt, determine_output_type_and_kwargs, decode_output_type, answer_candidates
+from response_cache import ResponseCache, response_key, CACHE_MODES
+from pipeline import run_pipeline
+from scheduler import SCHEDULES, approx_token_count, sequential_batches, bucketed_batches, ReorderBuffer
+from profiling import PROFILE_MODES, DEFAULT_TRACE_PATH, span, start_profiling, stop_profiling
+from instrumentation import METRIC_FIELDS, reset_peak_memory, peak_memory
+from results_sink import ResultsWriter, iter_results, recorded_ids, summarize_results, write_json_report
+from results_store import DEFAULT_STORE_PATH, record_run
+import atexit
 import glob
 import json
 import argparse
+import os
+import sqlite3
 import time
 import sys
-from torch.utils.data import DataLoader, Dataset
-import torch
-import difflib
 import re
+from collections import Counter
 from typing import List, Dict
 
-class ScenarioDataset(Dataset):
-    def __init__(self, scenarios):
-        self.scenarios = scenarios
+import similarity as similarity_engine
+from similarity import SIMILARITY_MODES, SIMILARITY_BACKENDS
+from models.remote_model import DEFAULT_SOCKET_PATH, daemon_running
+from stratified import StratifiedSample, stratified_order, sample_size, adaptive_batches
+from semantic_embeddings import (SEMANTIC_MODES, DEFAULT_ENCODER, DEFAULT_VECTOR_CACHE_DIR,
+                                 DEFAULT_EMBEDDING_THRESHOLD)
 
-    def __len__(self):
-        return len(self.scenarios)
+def load_scenarios(pattern="scenarios/**/*.yaml", use_index=False, index_path=None):
+    """Load every scenario YAML matching pattern, or read them from the compiled scenario index"""
+    if use_index:
+        import scenario_index
+        return scenario_index.load_scenarios(index_path=index_path or scenario_index.DEFAULT_INDEX_PATH)
+    
+    import yaml
+
+    scenarios = []
+    for file in glob.glob(pattern, recursive=True):
+        with open(file) as f:
+            scenario = yaml.safe_load(f)
+        scenarios.append(scenario)
+    return scenarios
+
+BACKENDS = ["hf", "stub", "openai"]
+# Backend options that change a backend's answers, and so are part of its response-cache keys
+ANSWER_OPTIONS = {"stub": ("stub_accuracy",)}
+# Guided-decoding dialects of the openai backend (kept here so --help does not import asyncio)
+GUIDED_FORMATS = ["vllm", "llamacpp"]
 
-    def __getitem__(self, idx):
-        return self.scenarios[idx]
+def create_model(model_name, use_structured=False, revision="main", preamble=None, constraint="json",
+                 backend="hf", scenarios=None, stub_latency=0.0, stub_accuracy=1.0, draft_model=None, daemon=None,
+                 **server_options):
+    """Construct the model backend; imports torch/transformers on first call.
 
-def collate_fn(batch):
-    return batch
+    With ``daemon`` (a socket path) the model lives in a resident daemon.py process and this
+    returns a client for it.
+    """
+    if daemon:
+        from models.remote_model import RemoteModel
+        return RemoteModel(daemon, dict(model_name=model_name, use_structured=use_structured, revision=revision,
+                                        preamble=preamble, constraint=constraint, backend=backend,
+                                        stub_latency=stub_latency, stub_accuracy=stub_accuracy,
+                                        draft_model=draft_model, **server_options))
+    if backend == "openai":
+        from models.openai_model import OpenAIModel
+        return OpenAIModel(model_name, use_structured=use_structured, constraint=constraint, preamble=preamble,
+                           **server_options)
+    if backend == "stub":
+        from models.stub_model import StubModel
+        return StubModel.from_scenarios(scenarios or [], latency=stub_latency, accuracy=stub_accuracy)
+    if use_structured:
+        from models.outlines_model import OutlinesModel
+        return OutlinesModel(model_name, revision=revision, constraint=constraint, draft_model=draft_model)
+    from models.hf_transformer import HFTransformerModel
+    return HFTransformerModel(model_name, preamble=preamble, revision=revision, draft_model=draft_model)
+
+DEFAULT_CACHE_PATH = ".mtg_cache/responses.sqlite"
 
 def calculate_similarity(output, expected):
     """Calculate similarity ratio between output and expected text."""
-    return difflib.SequenceMatcher(None, output.strip(), expected.strip()).ratio()
-
-def extract_card_options_from_prompt(prompt):
-    """Extract card options from draft pick prompts"""
-    # Look for patterns like "between X, Y, and Z" or "choose from X, Y, Z"
-    options_match = re.search(r'(?:between|from|choice between|choice of|options:?)\s+([^.?]+)', prompt, re.IGNORECASE)
-    if options_match:
-        options_text = options_match.group(1)
-        # Split by commas and clean up
-        options = []
-        for opt in re.split(r',\s*(?:and\s+)?', options_text):
-            cleaned_opt = opt.strip().strip('"\'')
-            # Remove articles like "a", "an", "the" from the beginning
-            cleaned_opt = re.sub(r'^(a|an|the)\s+', '', cleaned_opt, flags=re.IGNORECASE)
-            if cleaned_opt:
-                options.append(cleaned_opt)
-        return [opt for opt in options if opt]  # Remove empty strings
-    return []
-
-def determine_output_type_and_kwargs(scenario: Dict) -> tuple:
-    """Determine output type and additional kwargs for structured generation"""
-    
-    # Check if scenario explicitly specifies output type
-    if "output_type" in scenario:
-        output_type = scenario["output_type"]
-        kwargs = {}
-        
-        # Handle special cases for dynamic schema generation
-        if output_type == "card_selection":
-            # Extract card options from prompt for draft scenarios
-            options = extract_card_options_from_prompt(scenario["prompt"])
-            if options:
-                kwargs["options"] = options
-        elif output_type == "multiple_choice" and "choices" in scenario:
-            kwargs["choices"] = scenario["choices"]
-        elif output_type == "numeric_range":
-            if "min_val" in scenario:
-                kwargs["min_val"] = scenario["min_val"]
-            if "max_val" in scenario:
-                kwargs["max_val"] = scenario["max_val"]
-                
-        return output_type, kwargs
-    
-    # Auto-detect based on expected output and category
-    expected = scenario["expected_output"].strip().lower()
-    category = scenario.get("category", "")
-    subcategory = scenario.get("subcategory", "")
-    
-    # Draft pick scenarios - force card selection from options
-    if category == "draft" and subcategory == "pick_decision":
-        options = extract_card_options_from_prompt(scenario["prompt"])
-        if options:
-            return "card_selection", {"options": options}
-    
-    # Combat math scenarios - numeric with reasonable ranges
-    if category == "combat" and subcategory == "combat_math":
-        # Extract numbers from expected output to set range
-        numbers = re.findall(r'\d+', expected)
-        if numbers:
-            max_val = max(20, int(numbers[0]) + 10)  # Reasonable upper bound
-            return "numeric_range", {"min_val": 0, "max_val": max_val}
-    
-    # Boolean questions
-    if expected in ["yes", "no", "true", "false", "y", "n"]:
-        return "boolean", {}
-    
-    # Numeric answers
-    if expected.isdigit() or (expected.startswith('-') and expected[1:].isdigit()):
-        return "numeric", {}
-    
-    # Simple short answers
-    if len(expected) <= 20:
-        return "simple", {}
-    
-    # Default to explanation for longer answers
-    return "explanation", {}
+    return similarity_engine.ratio(output.strip(), expected.strip())
 
-def run_tests(model_name="mistralai/Mistral-7B-Instruct-v0.3", output_format="simple", batch_size=4, use_structured=False):
-    """Run all tests and output results in specified format."""
-    
-    start_time = time.time()
-    
-    # Initialize model
+def semantic_evaluator(scenarios, semantic="fuzzy", semantic_options=None):
+    """Embedding evaluator with every semantic scenario's expected answer embedded, or None for fuzzy matching"""
+    if semantic != "embedding":
+        return None
+    from semantic_embeddings import EmbeddingEvaluator
+    evaluator = EmbeddingEvaluator(**(semantic_options or {}))
+    with span("embed_expected"):
+        evaluator.prepare([scenario["expected_output"] for scenario in scenarios if scenario["evaluator"] == "semantic"])
+    return evaluator
+
+def answer_distribution(samples):
+    """Fraction of samples giving each distinct answer, most common first"""
+    counts = Counter(sample.strip() for sample in samples)
+    return {answer: count / len(samples) for answer, count in counts.most_common()}
+
+def modal_answer(samples):
+    """The most common answer among samples (the first one drawn on a tie)"""
+    top = Counter(sample.strip() for sample in samples).most_common(1)[0][0]
+    return next(sample for sample in samples if sample.strip() == top)
+
+def evaluate_samples(judge, samples):
+    """Per-sample verdicts, judging each distinct answer once; judge maps a list of texts to verdicts"""
+    distinct = list(dict.fromkeys(samples))
+    verdicts = dict(zip(distinct, judge(distinct)))
+    return [bool(verdicts[sample]) for sample in samples]
+
+def batch_similarity(outputs, batch, mode="all"):
+    """Similarity of each output to its expected answer; None where ``mode`` skips the row"""
+    rows = [i for i, scenario in enumerate(batch) if mode == "all" or (mode == "semantic" and scenario["evaluator"] == "semantic")]
+    scores = [None] * len(batch)
+    ratios = similarity_engine.batch_ratios([(outputs[i].strip(), batch[i]["expected_output"].strip()) for i in rows])
+    for i, score in zip(rows, ratios):
+        scores[i] = score
+    return scores
+
+def batch_output_types(batch, use_structured):
+    """Determine output types (and schema kwargs in structured mode) for a batch of scenarios"""
     if use_structured:
-        model = OutlinesModel(model_name)
-    else:
-        model = HFTransformerModel(model_name)
+        # Determine output types and kwargs for each scenario, reusing values precomputed by the index
+        output_types_and_kwargs = [
+            (scenario["_output_type"], scenario["_output_kwargs"]) if "_output_type" in scenario
+            else determine_output_type_and_kwargs(scenario)
+            for scenario in batch
+        ]
+        output_types = [otk[0] for otk in output_types_and_kwargs]
+        kwargs_list = [otk[1] for otk in output_types_and_kwargs]
+        return output_types, kwargs_list
     
-    # Collect all scenarios
-    scenarios = []
-    for file in glob.glob("scenarios/**/*.yaml", recursive=True):
-        with open(file) as f:
-            scenario = yaml.safe_load(f)
-        scenarios.append(scenario)
+    # For non-structured, the output type picks each scenario's decode budget and early stop
+    output_types = [decode_output_type(scenario) for scenario in batch]
+    return output_types, None
+
+def model_prompt(scenario, output_type, kwargs, use_structured, preamble=None):
+    """The exact prompt text the model backend will see for a scenario"""
+    if use_structured:
+        return build_structured_prompt(scenario["prompt"], output_type, kwargs)
+    return (preamble or "") + scenario["prompt"]
+
+def scoring_candidates(output_types, kwargs_list, use_structured, scoring):
+    """Per-scenario closed answer sets to rank by log-likelihood (None where the answer is decoded)"""
+    if not (use_structured and scoring):
+        return [None] * len(output_types)
+    return [answer_candidates(t, k) for t, k in zip(output_types, kwargs_list)]
+
+def response_cache_keys(batch, output_types, kwargs_list, model_name, revision, use_structured, preamble=None,
+                        scoring=False, constraint="json", backend="hf", repeats=1, backend_options=None):
+    """Compute response-cache keys from the exact prompt, schema and decoding settings each scenario uses"""
+    keys = []
+    # Non-default backends get their own key space so they never serve each other's answers,
+    # and backend options that change the answers split it further
+    options = {name: value for name, value in (backend_options or {}).items()
+               if name in ANSWER_OPTIONS.get(backend, ())}
+    prefix = backend + "".join(f"[{name}={value}]" for name, value in sorted(options.items()))
+    namespace = (lambda name: name) if backend == "hf" else (lambda name: f"{prefix}:{name}")
+    candidates_list = scoring_candidates(output_types, kwargs_list, use_structured, scoring)
+    structured_decoding = (STRUCTURED_GENERATION_KWARGS if constraint == "json"
+                           else dict(STRUCTURED_GENERATION_KWARGS, constraint=constraint))
+    # Repeat runs cache the whole list of samples, drawn with sampling on
+    sampling = dict(SAMPLING_KWARGS, samples=repeats) if repeats > 1 else {}
+    if sampling:
+        structured_decoding = dict(structured_decoding, **sampling)
+    for i, scenario in enumerate(batch):
+        if candidates_list[i]:
+            full_prompt = model_prompt(scenario, output_types[i], kwargs_list[i], use_structured)
+            keys.append(response_key(namespace("loglik"), model_name, revision, full_prompt,
+                                     tuple(candidates_list[i]), {"normalize": "mean"}))
+        elif use_structured:
+            full_prompt = model_prompt(scenario, output_types[i], kwargs_list[i], use_structured)
+            keys.append(response_key(namespace("outlines"), model_name, revision, full_prompt,
+                                     schema_key(output_types[i], kwargs_list[i]), structured_decoding))
+        else:
+            full_prompt = model_prompt(scenario, output_types[i], None, use_structured, preamble)
+            decoding = dict(UNSTRUCTURED_GENERATION_KWARGS,
+                            max_new_tokens=decode_budget(output_types[i], scenario), stop=output_types[i], **sampling)
+            keys.append(response_key(namespace("hf"), model_name, revision, full_prompt, None, decoding))
+    return keys
+
+def tokenizer_length_fn(model_name, revision="main"):
+    """Exact prompt-length function backed by the model's tokenizer (no weights are loaded)"""
+    from transformers import AutoTokenizer
+    tokenizer = AutoTokenizer.from_pretrained(model_name, revision=revision,
+                                              use_auth_token=os.getenv("HUGGINGFACE_HUB_TOKEN"))
+    return lambda text: len(tokenizer(text).input_ids)
+
+def plan_batches(scenarios, output_types, kwargs_list, use_structured, batch_size, schedule="bucketed",
+                 max_batch_tokens=None, length_fn=approx_token_count, preamble=None):
+    """Plan batches of scenario indices: corpus order, or grouped by output type and bucketed by length"""
+    if schedule == "sequential":
+        return sequential_batches(len(scenarios), batch_size)
+    lengths = [
+        length_fn(model_prompt(scenario, output_types[i], kwargs_list[i] if kwargs_list else None, use_structured, preamble))
+        for i, scenario in enumerate(scenarios)
+    ]
+    return bucketed_batches(lengths, output_types, batch_size, max_batch_tokens)
+
+def print_result(test_result, output_format):
+    """Print one evaluated scenario in the simple or detailed format"""
+    if output_format == "simple":
+        print(f"{test_result['id']}: {'PASS' if test_result['passed'] else 'FAIL'}")
+    elif output_format == "detailed":
+        print(f"{test_result['id']}: {'PASS' if test_result['passed'] else 'FAIL'}")
+        print(f"  Prompt: {test_result['prompt']}")
+        print(f"  Expected: {test_result['expected_output']}")
+        print(f"  Actual: {test_result['actual_output']}")
+        if test_result.get("similarity") is not None:
+            print(f"  Similarity: {test_result['similarity']:.2f}")
+        if test_result.get("pass_rate") is not None:
+            print(f"  Sample pass rate: {test_result['pass_rate']:.2f}  Answers: {test_result['answer_distribution']}")
+        if test_result.get("generated_tokens") is not None:
+            print(f"  Generated tokens: {test_result['generated_tokens']}")
+        if test_result.get("latency_seconds") is not None:
+            ttft = test_result.get("ttft_seconds")
+            print(f"  Latency: {test_result['latency_seconds']:.3f}s"
+                  + (f" (TTFT {ttft:.3f}s)" if ttft is not None else ""))
+        if test_result.get("confidence") is not None:
+            print(f"  Confidence: {test_result['confidence']:.2f}")
+        print()
+
+def run_model_batch(model, prompts, output_types, kwargs_list, use_structured, budgets=None, repeats=1):
+    """Run batch inference with the call signature each model class expects.
 
-    # Create dataset and dataloader
-    dataset = ScenarioDataset(scenarios)
-    dataloader = DataLoader(dataset, batch_size=batch_size, collate_fn=collate_fn)
+    With ``repeats`` > 1 each prompt gets a list of that many sampled answers.
+    """
+    if repeats > 1:
+        return model.sample_batch(prompts, output_types, kwargs_list=kwargs_list if use_structured else None,
+                                  max_new_tokens_list=None if use_structured else budgets, num_samples=repeats)
+    if use_structured and kwargs_list:
+        return model.run_batch(prompts, output_types, kwargs_list=kwargs_list)
+    elif use_structured:
+        return model.run_batch(prompts, output_types)
+    return model.run_batch(prompts, output_types, max_new_tokens_list=budgets)
+
+def evaluate_batches(model_name, scenarios, batches, use_structured=False, schema_cache_dir=None,
+                     schema_cache_size=None, preamble=None, revision="main", cache_mode="readwrite",
+                     cache_path=DEFAULT_CACHE_PATH, on_result=None, on_batch=None, keep_results=True,
+                     scoring=False, constraint="json", backend="hf", backend_options=None,
+                     similarity="all", similarity_backend="difflib", semantic="fuzzy", semantic_options=None,
+                     repeats=1, pipeline_depth=0):
+    """Run and evaluate planned batches of scenarios; return (results in corpus order, run stats).
+
+    With ``scoring`` (structured mode), scenarios with a closed answer set are answered by
+    ranking their candidates by log-likelihood, and their results carry a confidence.
+
+    ``similarity`` picks which results get a similarity score: every result, only those
+    judged by the semantic evaluator, or none. With ``semantic="embedding"`` semantic
+    scenarios are judged by embedding cosine similarity instead of fuzzy matching, and
+    their results carry a ``semantic_score``.
+
+    With ``repeats`` > 1 every generated scenario is sampled that many times from a single
+    prefill. Its result reports the most common answer plus the per-sample ``pass_rate``,
+    ``pass_variance`` and ``answer_distribution``; ``passed`` is judged on the most common answer.
+
+    With ``pipeline_depth`` > 0 the batch loop is pipelined: a producer thread does the next
+    batches' cache lookups and a consumer thread evaluates and emits finished batches while
+    the model generates, with at most ``pipeline_depth`` batches queued on either side.
+    ``on_result`` and ``on_batch`` are then called from the consumer thread.
+
+    ``on_result`` is called with each result once it and every earlier scenario are done,
+    and ``on_batch`` after every batch. With ``keep_results=False`` results are only handed
+    to ``on_result`` and the returned list is empty.
+    """
+    similarity_engine.set_backend(similarity_backend)
+    embedder = semantic_evaluator(scenarios, semantic, semantic_options)
+    # The model is only built once the first uncached prompt needs it
+    if use_structured:
+        configure_schema_cache(max_size=schema_cache_size, persist_dir=schema_cache_dir)
+    model = LazyModel(lambda: create_model(model_name, use_structured, revision, preamble, constraint,
+                                           backend, scenarios, **(backend_options or {})))
+    
+    response_cache = ResponseCache(cache_path, mode=cache_mode)
 
     # Store results for machine output
     results = []
-    passed = 0
-    total = 0
 
-    # Process scenarios in batches
-    for batch in dataloader:
-        # Extract prompts and determine output types
+    all_output_types, all_kwargs = batch_output_types(scenarios, use_structured)
+    
+    # Results are reported in corpus order no matter how batches were scheduled
+    reorder = ReorderBuffer()
+
+    totals = {"generation_seconds": 0.0}
+    
+    def prepare(rows):
+        """Look up a batch's cached responses and work out what the model still has to run"""
+        batch = [scenarios[i] for i in rows]
+        
+        # Extract prompts and output types
         prompts = [scenario["prompt"] for scenario in batch]
+        output_types = [all_output_types[i] for i in rows]
+        kwargs_list = [all_kwargs[i] for i in rows] if all_kwargs else None
         
-        if use_structured:
-            # Determine output types and kwargs for each scenario
-            output_types_and_kwargs = [determine_output_type_and_kwargs(scenario) for scenario in batch]
-            output_types = [otk[0] for otk in output_types_and_kwargs]
-            kwargs_list = [otk[1] for otk in output_types_and_kwargs]
-        else:
-            # For non-structured, just determine basic output types for evaluators
-            output_types = []
-            for scenario in batch:
-                expected = scenario["expected_output"].strip().lower()
-                if expected in ["yes", "no", "true", "false"] or len(expected) <= 10:
-                    output_types.append("simple")
-                elif expected.isdigit():
-                    output_types.append("numeric")
-                else:
-                    output_types.append("explanation")
-            kwargs_list = None
+        # Serve unchanged scenarios from the response cache and only run the model on misses
+        with span("response_cache.lookup", rows=len(rows)):
+            keys = response_cache_keys(batch, output_types, kwargs_list, model_name, revision, use_structured,
+                                       preamble, scoring, constraint, backend, repeats, backend_options)
+            cached = response_cache.lookup(keys)
+        outputs = [cached.get(key) for key in keys]
+        miss_rows = [i for i, key in enumerate(keys) if key not in cached]
+        
+        # Scored rows are cached as JSON so their confidence survives a cache hit
+        candidates_list = scoring_candidates(output_types, kwargs_list, use_structured, scoring)
+        scores = [json.loads(outputs[i]) if candidates_list[i] and outputs[i] is not None else None
+                  for i in range(len(batch))]
+        # Repeat runs cache every sample as a JSON list; scored rows are ranked once
+        samples_list = [json.loads(outputs[i]) if repeats > 1 and not candidates_list[i] and outputs[i] is not None
+                        else None for i in range(len(batch))]
+        
+        return {
+            "rows": rows, "batch": batch, "prompts": prompts, "output_types": output_types,
+            "kwargs_list": kwargs_list, "keys": keys, "cached": cached, "outputs": outputs,
+            "candidates_list": candidates_list, "scores": scores, "samples_list": samples_list,
+            "scored_rows": [i for i in miss_rows if candidates_list[i]],
+            "miss_rows": [i for i in miss_rows if not candidates_list[i]],
+            # Unstructured decode budgets come from the output type or the scenario's own max_new_tokens
+            "budgets": None if use_structured else [decode_budget(t, sc) for t, sc in zip(output_types, batch)],
+        }
+    
+    def generate(job):
+        """Run the model on a prepared batch's cache misses; the only stage that touches the model"""
+        prompts, output_types, kwargs_list = job["prompts"], job["output_types"], job["kwargs_list"]
+        keys, scores, samples_list, budgets = job["keys"], job["scores"], job["samples_list"], job["budgets"]
+        scored_rows, miss_rows = job["scored_rows"], job["miss_rows"]
+        outputs = job["outputs"]
         
         # Run batch inference
+        reset_peak_memory()
+        compile_before = get_schema_cache().stats()["compile_seconds"] if use_structured else 0.0
+        load_before = model.load_seconds
         batch_start = time.time()
-        if use_structured and kwargs_list:
-            outputs = model.run_batch(prompts, output_types, kwargs_list=kwargs_list)
-        elif use_structured:
-            outputs = model.run_batch(prompts, output_types)
-        else:
-            outputs = model.run_batch(prompts)
-        batch_time = time.time() - batch_start
+        generation_stats = [None] * len(prompts)
+        if scored_rows:
+            score_start = time.perf_counter()
+            with span("score_batch", rows=len(scored_rows)):
+                row_scores = model.score_batch(
+                    [prompts[i] for i in scored_rows],
+                    [output_types[i] for i in scored_rows],
+                    [kwargs_list[i] for i in scored_rows],
+                    [job["candidates_list"][i] for i in scored_rows],
+                )
+            # All scored rows share one prefill-only pass, so they share its latency
+            score_seconds = time.perf_counter() - score_start
+            for i, score in zip(scored_rows, row_scores):
+                scores[i] = score
+                generation_stats[i] = {"generated_tokens": 0, "prefill_seconds": score_seconds,
+                                       "latency_seconds": score_seconds}
+            response_cache.store([(keys[i], json.dumps(scores[i])) for i in scored_rows], model_name=model_name)
+        outputs = [score["answer"] if score else output for score, output in zip(scores, outputs)]
+        if miss_rows:
+            with span("run_batch", rows=len(miss_rows), output_type=output_types[miss_rows[0]]):
+                miss_outputs = run_model_batch(
+                    model,
+                    [prompts[i] for i in miss_rows],
+                    [output_types[i] for i in miss_rows],
+                    [kwargs_list[i] for i in miss_rows] if kwargs_list else None,
+                    use_structured,
+                    [budgets[i] for i in miss_rows] if budgets else None,
+                    repeats,
+                )
+            miss_stats = getattr(model.instance, "last_batch_stats", None) or [None] * len(miss_rows)
+            for i, output, stats in zip(miss_rows, miss_outputs, miss_stats):
+                outputs[i] = output
+                generation_stats[i] = stats
+            if repeats > 1:
+                response_cache.store([(keys[i], json.dumps(outputs[i])) for i in miss_rows], model_name=model_name)
+                for i in miss_rows:
+                    samples_list[i] = outputs[i]
+            else:
+                response_cache.store([(keys[i], outputs[i]) for i in miss_rows], model_name=model_name)
+        job["outputs"] = [modal_answer(samples) if samples else output for samples, output in zip(samples_list, outputs)]
+        job["generation_stats"] = generation_stats
+        job["batch_time"] = batch_time = time.time() - batch_start
+        batch_metrics = peak_memory()
+        batch_metrics["compile_seconds"] = (get_schema_cache().stats()["compile_seconds"] - compile_before
+                                            if use_structured else 0.0)
+        # Weight loading and schema compilation are reported separately from generation
+        batch_metrics["generation_seconds"] = max(
+            0.0, batch_time - batch_metrics["compile_seconds"] - (model.load_seconds - load_before)
+        )
+        totals["generation_seconds"] += batch_metrics["generation_seconds"]
+        job["batch_metrics"] = batch_metrics
+        return job
+    
+    def finish(job):
+        """Score and evaluate a generated batch, then hand its results on in corpus order"""
+        batch, outputs, batch_time = job["batch"], job["outputs"], job["batch_time"]
+        
+        # Similarity is scored for the whole batch at once so repeated strings share work
+        with span("similarity", rows=len(batch)):
+            similarities = batch_similarity(outputs, batch, similarity)
+        
+        # Embedding evaluation embeds the batch's semantic outputs in one encoder call
+        semantic_scores = [None] * len(batch)
+        semantic_rows = [i for i, scenario in enumerate(batch) if scenario["evaluator"] == "semantic"] if embedder else []
+        if semantic_rows:
+            with span("embed_outputs", rows=len(semantic_rows)):
+                row_scores = embedder.scores([outputs[i] for i in semantic_rows],
+                                             [batch[i]["expected_output"] for i in semantic_rows])
+            for i, semantic_score in zip(semantic_rows, row_scores):
+                semantic_scores[i] = semantic_score
         
         # Evaluate each result
-        for scenario, output in zip(batch, outputs):
+        for row, scenario, output, key, stats, score, similarity_score, semantic_score, samples, output_type in zip(
+                job["rows"], batch, outputs, job["keys"], job["generation_stats"], job["scores"], similarities,
+                semantic_scores, job["samples_list"], job["output_types"]):
+            expected = scenario["expected_output"]
             evaluator = get_evaluator(scenario["evaluator"])
-            result = evaluator(output, scenario["expected_output"])
-            
-            # Calculate similarity for all cases
-            similarity = calculate_similarity(output, scenario["expected_output"])
+            with span("evaluate", evaluator=scenario["evaluator"]):
+                if semantic_score is not None:
+                    result = semantic_score >= embedder.threshold
+                else:
+                    result = evaluator(output, expected)
             
-            total += 1
-            if result:
-                passed += 1
+            pass_rate = None
+            if samples:
+                with span("evaluate_samples", samples=len(samples)):
+                    if semantic_score is not None:
+                        judge = lambda texts: [s >= embedder.threshold for s in embedder.scores(texts, [expected] * len(texts))]
+                    else:
+                        judge = lambda texts: [evaluator(text, expected) for text in texts]
+                    verdicts = evaluate_samples(judge, samples)
+                pass_rate = sum(verdicts) / len(verdicts)
             
             test_result = {
                 "id": scenario["id"],
@@ -190,41 +440,82 @@ def run_tests(model_name="mistralai/Mistral-7B-Instruct-v0.3", output_format="si
                 "expected_output": scenario["expected_output"],
                 "actual_output": output,
                 "evaluator": scenario["evaluator"],
+                "output_type": output_type,
                 "passed": bool(result),
-                "similarity": similarity,
-                "batch_time": batch_time / len(prompts) if len(prompts) > 0 else 0
+                "similarity": similarity_score,
+                "semantic_score": semantic_score,
+                "cached": key in job["cached"],
+                "confidence": score["confidence"] if score else None,
+                "distribution": score["distribution"] if score else None,
+                "samples": samples,
+                "pass_rate": pass_rate,
+                # Variance of the per-sample pass/fail outcome
+                "pass_variance": pass_rate * (1 - pass_rate) if pass_rate is not None else None,
+                "answer_distribution": answer_distribution(samples) if samples else None,
+                "batch_time": batch_time / len(batch) if len(batch) > 0 else 0
             }
+            test_result.update({field: (stats or {}).get(field) for field in METRIC_FIELDS})
+            test_result.update({f"batch_{name}": value for name, value in job["batch_metrics"].items()})
             
-            results.append(test_result)
-            
-            if output_format == "simple":
-                print(f"{scenario['id']}: {'PASS' if result else 'FAIL'}")
-            elif output_format == "detailed":
-                print(f"{scenario['id']}: {'PASS' if result else 'FAIL'}")
-                print(f"  Prompt: {scenario['prompt']}")
-                print(f"  Expected: {scenario['expected_output']}")
-                print(f"  Actual: {output}")
-                print(f"  Similarity: {similarity:.2f}")
-                print()
-
-    # Summary statistics
-    total_time = time.time() - start_time
+            for _, ready in reorder.add(row, test_result):
+                if keep_results:
+                    results.append(ready)
+                if on_result is not None:
+                    on_result(ready)
+        
+        if on_batch is not None:
+            on_batch()
+    
+    if pipeline_depth > 0:
+        # Cache lookups for the next batch and evaluation of the previous one overlap generation
+        run_pipeline(batches, prepare, generate, finish, pipeline_depth)
+    else:
+        for rows in batches:
+            finish(generate(prepare(rows)))
+    response_cache.close()
+    run_stats = {
+        "response_cache": response_cache.stats(),
+        "prefill_tokens_saved": getattr(model.instance, "prefill_tokens_saved", 0),
+        "model_load_seconds": model.load_seconds,
+        "generation_seconds": totals["generation_seconds"],
+    }
+    if use_structured:
+        run_stats["schema_cache"] = get_schema_cache().stats()
+    model.unload()
+    return results, run_stats
+
+def print_summary(results, run_stats, model_name, total_time, output_format):
+    """Print the end-of-run summary (or the full JSON report) for evaluated results; return its counts.
+
+    ``results`` is a list, or a zero-argument callable that streams them (e.g. from a
+    results file) so the report never has to hold every result in memory.
+    """
+    stream = results if callable(results) else lambda: iter(results)
+    counts = summarize_results(stream())
+    total = counts["total"]
+    passed = counts["passed"]
     pass_rate = (passed / total * 100) if total > 0 else 0
+    generated_tokens = counts["generated_tokens"]
     
     if output_format == "json":
-        # Machine-compilable JSON output
+        # Machine-compilable JSON output; results are streamed rather than held in one document
         summary = {
-            "summary": {
-                "total_tests": total,
-                "passed": passed,
-                "failed": total - passed,
-                "pass_rate": pass_rate,
-                "total_time_seconds": total_time,
-                "model_name": model_name
-            },
-            "results": results
+            "total_tests": total,
+            "passed": passed,
+            "failed": total - passed,
+            "pass_rate": pass_rate,
+            "total_time_seconds": total_time,
+            "model_name": model_name
         }
-        json.dump(summary, sys.stdout, indent=2)
+        summary.update(run_stats)
+        summary["generated_tokens"] = generated_tokens
+        summary["prompt_tokens"] = counts["prompt_tokens"]
+        summary["latency"] = counts["latency"]
+        summary["consistency"] = counts["consistency"]
+        summary["assisted"] = counts["assisted"]
+        summary["peak_rss_mb"] = counts["peak_rss_mb"]
+        summary["peak_accelerator_mb"] = counts["peak_accelerator_mb"]
+        write_json_report(summary, stream(), sys.stdout)
     elif output_format in ["simple", "detailed"]:
         print(f"\n--- SUMMARY ---")
         print(f"Total tests: {total}")
@@ -233,8 +524,203 @@ def run_tests(model_name="mistralai/Mistral-7B-Instruct-v0.3", output_format="si
         print(f"Pass rate: {pass_rate:.2f}%")
         print(f"Total time: {total_time:.2f} seconds")
         print(f"Model: {model_name}")
+        cache_info = run_stats["response_cache"]
+        print(f"Response cache ({cache_info['mode']}): {cache_info['hits']} hits, {cache_info['misses']} misses")
+        print(f"Prefill tokens saved: {run_stats['prefill_tokens_saved']}")
+        print(f"Prompt tokens: {counts['prompt_tokens']}  Generated tokens: {generated_tokens}")
+        latency = counts["latency"]
+        if latency["measured"]:
+            print(f"Latency: mean {latency['mean_seconds']:.3f}s, p50 {latency['p50_seconds']:.3f}s, "
+                  f"p95 {latency['p95_seconds']:.3f}s over {latency['measured']} generated scenarios")
+        consistency = counts["consistency"]
+        if consistency["repeated"]:
+            print(f"Sample pass rate: mean {consistency['mean_pass_rate'] * 100:.2f}% over {consistency['repeated']} "
+                  f"repeated scenarios ({consistency['unanimous']} unanimous, "
+                  f"mean variance {consistency['mean_pass_variance']:.3f})")
+        for output_type, assisted in counts["assisted"].items():
+            acceptance = assisted["acceptance_rate"]
+            speedup = assisted["step_speedup"]
+            print(f"Assisted decoding ({output_type}): "
+                  + (f"{acceptance * 100:.1f}% of {assisted['draft_tokens']} draft tokens accepted, "
+                     if acceptance is not None else "no draft tokens, ")
+                  + (f"{speedup:.2f} tokens per target step " if speedup is not None else "")
+                  + f"over {assisted['scenarios']} scenarios")
+        if counts["peak_rss_mb"] is not None:
+            accelerator = counts["peak_accelerator_mb"]
+            print(f"Peak memory: {counts['peak_rss_mb']:.0f} MiB RSS"
+                  + (f", {accelerator:.0f} MiB accelerator" if accelerator is not None else ""))
+        print(f"Model load time: {run_stats['model_load_seconds']:.2f} seconds")
+        if "sampling" in run_stats:
+            print_sampling(run_stats["sampling"])
+        if "schema_cache" in run_stats:
+            cache_stats = run_stats["schema_cache"]
+            print(f"Schema cache: {cache_stats['hits']} hits, {cache_stats['disk_hits']} disk hits, "
+                  f"{cache_stats['misses']} misses ({cache_stats['compile_seconds']:.2f}s compiling)")
+    return counts
+
+def print_sampling(sampling):
+    """Per-stratum pass rates and the overall estimate for a --sample run"""
+    def interval(stats):
+        return f"[{stats['ci_low'] * 100:.1f}%, {stats['ci_high'] * 100:.1f}%]"
+    overall = sampling["overall"]
+    print(f"Sampled {sampling['sampled']} of {sampling['population']} scenarios "
+          f"({len(sampling['strata'])} strata by {'/'.join(sampling['fields'])}"
+          + (f", {sampling['unsampled_strata']} not sampled)" if sampling["unsampled_strata"] else ")"))
+    if overall["estimate"] is not None:
+        print(f"Estimated pass rate: {overall['estimate'] * 100:.2f}% {interval(overall)} (95% CI)")
+    for name, stats in sampling["strata"].items():
+        if stats["sampled"]:
+            print(f"  {name}: {stats['passed']}/{stats['sampled']} of {stats['population']} "
+                  f"{stats['pass_rate'] * 100:.1f}% {interval(stats)}")
+
+def run_tests(model_name="mistralai/Mistral-7B-Instruct-v0.3", output_format="simple", batch_size=4, use_structured=False,
+              schema_cache_dir=None, schema_cache_size=None, preamble=None, revision="main",
+              cache_mode="readwrite", cache_path=DEFAULT_CACHE_PATH, use_index=True, index_path=None,
+              schedule="bucketed", max_batch_tokens=None, scenarios=None, batches=None,
+              workers=1, shard_retries=1, results_file=None, resume=False, scoring=False,
+              constraint="json", backend="hf", backend_options=None, similarity="all",
+              similarity_backend="difflib", semantic="fuzzy", semantic_options=None, repeats=1,
+              pipeline_depth=0, sample=None, sample_seed=0, target_width=None, sample_step=None,
+              store_path=None):
+    """Run all tests and output results in specified format.
+
+    ``scenarios`` and ``batches`` can be passed in to reuse an already parsed and scheduled
+    corpus (comparison mode); ``output_format=None`` runs silently. With ``workers`` > 1
+    the batches are sharded across worker processes, each with its own model replica.
+    With ``results_file`` every result is appended to a JSONL file as it is evaluated and
+    the summary is streamed from that file; ``resume`` skips scenarios it already records.
+
+    ``sample`` (a count, or a fraction below 1) runs a stratified sample of the scenarios
+    instead, and the summary gains per-stratum pass rates with confidence intervals. With
+    ``target_width`` more scenarios are added, ``sample_step`` at a time, until the
+    interval on the overall pass rate is that narrow. The width is checked between slices;
+    when pipelined, the check can miss in-flight batches and add one slice too many.
+
+    With ``store_path`` the run and its results are appended to that SQLite results store
+    (see results_store.py) once the run finishes.
+    """
+    
+    start_time = time.time()
     
-    return results, passed, total
+    # Collect all scenarios
+    if scenarios is None:
+        with span("load_scenarios"):
+            scenarios = load_scenarios(use_index=use_index, index_path=index_path)
+    
+    sampler = None
+    if sample:
+        scenarios = stratified_order(scenarios, seed=sample_seed)
+        sampler = StratifiedSample(scenarios)
+        size = sample_size(sample, len(scenarios))
+        if target_width is not None and workers > 1:
+            print("Warning: --target-width needs a single worker; running a fixed sample", file=sys.stderr)
+            target_width = None
+        if target_width is None:
+            scenarios = scenarios[:size]
+    
+    writer = None
+    if results_file:
+        done = recorded_ids(results_file) if resume else set()
+        if done:
+            scenarios = [scenario for scenario in scenarios if scenario["id"] not in done]
+            print(f"Resuming {results_file}: {len(done)} scenarios already recorded, {len(scenarios)} to run",
+                  file=sys.stderr)
+        writer = ResultsWriter(results_file, append=resume)
+    
+    # Determine output types up front so batches can be grouped by schema family and length
+    if batches is None:
+        with span("plan_batches"):
+            # Exact lengths need the model's tokenizer here, which only local HF/outlines runs have
+            local_model = backend == "hf" and not (backend_options or {}).get("daemon")
+            exact_lengths = max_batch_tokens and schedule == "bucketed" and local_model
+            length_fn = tokenizer_length_fn(model_name, revision) if exact_lengths else approx_token_count
+            def plan(start, end):
+                subset = scenarios[start:end]
+                output_types, kwargs_list = batch_output_types(subset, use_structured)
+                return [[start + i for i in rows] for rows in plan_batches(
+                    subset, output_types, kwargs_list, use_structured, batch_size, schedule, max_batch_tokens,
+                    length_fn, preamble)]
+            if sampler is not None and target_width is not None:
+                # Slices are planned lazily, as the interval on the results so far asks for them
+                batches = adaptive_batches(sampler, len(scenarios), size, plan, target_width, sample_step)
+            else:
+                batches = plan(0, len(scenarios))
+    
+    eval_kwargs = dict(use_structured=use_structured, schema_cache_dir=schema_cache_dir,
+                       schema_cache_size=schema_cache_size, preamble=preamble, revision=revision,
+                       cache_mode=cache_mode, cache_path=cache_path, scoring=scoring,
+                       constraint=constraint, backend=backend, backend_options=backend_options,
+                       similarity=similarity, similarity_backend=similarity_backend,
+                       semantic=semantic, semantic_options=semantic_options, repeats=repeats,
+                       pipeline_depth=pipeline_depth)
+    def report(test_result):
+        if sampler is not None:
+            sampler.record(test_result)
+        print_result(test_result, output_format)
+    
+    def record(test_result):
+        report(test_result)
+        if writer is not None:
+            writer.write(test_result)
+    
+    def write_shard(shard_results):
+        # A finished shard is on disk before the others end, so --resume can pick up after a crash
+        for test_result in shard_results:
+            writer.write(test_result)
+        writer.flush()
+    
+    try:
+        if workers > 1:
+            from sharding import run_sharded
+            # Fill the vector cache here so shards only read it
+            semantic_evaluator(scenarios, semantic, semantic_options)
+            results, run_stats = run_sharded(model_name, scenarios, batches, eval_kwargs, workers, shard_retries,
+                                             on_shard=write_shard if writer is not None else None)
+            for test_result in results:
+                report(test_result)
+        else:
+            results, run_stats = evaluate_batches(model_name, scenarios, batches, on_result=record,
+                                                  on_batch=writer.flush if writer else None,
+                                                  keep_results=writer is None, **eval_kwargs)
+    finally:
+        if writer is not None:
+            writer.close()
+    if sampler is not None:
+        run_stats["sampling"] = sampler.summary()
+    
+    # With a results file the summary covers every recorded scenario, including resumed ones
+    source = (lambda: iter_results(results_file)) if writer is not None else results
+    counts = print_summary(source, run_stats, model_name, time.time() - start_time, output_format)
+    if store_path:
+        settings = {"batch_size": batch_size, "constraint": constraint, "scoring": scoring, "repeats": repeats,
+                    "preamble": bool(preamble), "sample": sample, "sample_seed": sample_seed if sample else None}
+        try:
+            with span("results_store.record"):
+                record_run(store_path, source() if callable(source) else source, model_name, backend=backend,
+                           revision=revision, structured=use_structured, sampled=bool(sample),
+                           duration_seconds=time.time() - start_time, settings=settings, started_at=start_time)
+        except (sqlite3.Error, OSError) as e:
+            print(f"Warning: could not record the run in {store_path}: {e}", file=sys.stderr)
+    return results, counts["passed"], counts["total"]
+
+def dry_run(model_name="mistralai/Mistral-7B-Instruct-v0.3", use_structured=False, preamble=None, revision="main",
+            cache_mode="readwrite", cache_path=DEFAULT_CACHE_PATH, use_index=True, index_path=None,
+            scoring=False, constraint="json", backend="hf", backend_options=None):
+    """Report which scenarios would be served from the response cache, without loading a model."""
+    with span("load_scenarios"):
+        scenarios = load_scenarios(use_index=use_index, index_path=index_path)
+    output_types, kwargs_list = batch_output_types(scenarios, use_structured)
+    with span("response_cache.lookup", rows=len(scenarios)):
+        keys = response_cache_keys(scenarios, output_types, kwargs_list, model_name, revision, use_structured,
+                                   preamble, scoring, constraint, backend, backend_options=backend_options)
+        response_cache = ResponseCache(cache_path, mode=cache_mode)
+        cached = response_cache.lookup(keys)
+        response_cache.close()
+    
+    for scenario, output_type, key in zip(scenarios, output_types, keys):
+        print(f"{scenario['id']}: {output_type} {'CACHED' if key in cached else 'RUN'}")
+    uncached = sum(1 for key in keys if key not in cached)
+    print(f"\n{len(scenarios)} scenarios, {len(scenarios) - uncached} cached, {uncached} would run inference")
 
 def main():
     parser = argparse.ArgumentParser(description="Run MTG LLM tests")
@@ -242,19 +728,256 @@ def main():
                         default="simple", help="Output format")
     parser.add_argument("--model", default="mistralai/Mistral-7B-Instruct-v0.3",
                         help="Model name to use")
+    parser.add_argument("--backend", choices=BACKENDS, default="hf",
+                        help="Model backend; 'stub' answers offline from the scenarios' expected outputs, "
+                             "'openai' calls an OpenAI-compatible server")
+    parser.add_argument("--stub-latency", type=float, default=0.0,
+                        help="Simulated seconds per batch for the stub backend")
+    parser.add_argument("--stub-accuracy", type=float, default=1.0,
+                        help="Fraction of scenarios the stub backend answers correctly")
+    parser.add_argument("--api-base", default=None,
+                        help="Base URL of the OpenAI-compatible server for the openai backend (or $OPENAI_BASE_URL)")
+    parser.add_argument("--max-in-flight", type=int, default=16,
+                        help="Maximum concurrent requests (and pooled connections) for the openai backend")
+    parser.add_argument("--max-retries", type=int, default=3,
+                        help="Retries with exponential backoff for timed-out or 408/429/5xx requests")
+    parser.add_argument("--request-timeout", type=float, default=120.0, help="Seconds before a request times out")
+    parser.add_argument("--guided-format", choices=GUIDED_FORMATS, default="vllm",
+                        help="Server dialect for JSON-schema/regex guided decoding in structured runs")
+    parser.add_argument("--draft-model", default=None,
+                        help="Small model sharing the target's tokenizer that drafts long-form answers "
+                             "(assisted decoding; hf backend)")
+    parser.add_argument("--sample", type=float, default=None, metavar="N",
+                        help="Run a stratified sample of N scenarios (or a fraction, if below 1) by "
+                             "category/subcategory/evaluator, and report pass rates with confidence intervals")
+    parser.add_argument("--sample-seed", type=int, default=0, help="Seed for choosing the --sample scenarios")
+    parser.add_argument("--target-width", type=float, default=None,
+                        help="With --sample, keep adding scenarios until the 95%% interval on the overall "
+                             "pass rate is at most this wide (e.g. 0.1)")
+    parser.add_argument("--sample-step", type=int, default=None,
+                        help="Scenarios added per round with --target-width (default: the --sample size)")
+    parser.add_argument("--daemon", nargs="?", const=DEFAULT_SOCKET_PATH, default=None, metavar="SOCKET",
+                        help="Generate through a resident model daemon (python daemon.py) instead of loading "
+                             f"the model in this process (default socket {DEFAULT_SOCKET_PATH})")
+    parser.add_argument("--watch", action="store_true",
+                        help="Run once, then re-run scenario files as they change and print pass/fail changes")
+    parser.add_argument("--watch-interval", type=float, default=1.0,
+                        help="Seconds between checks for changed scenario files in --watch mode")
+    parser.add_argument("--models", default=None,
+                        help="Comma-separated models to compare side by side (overrides --model)")
+    parser.add_argument("--compare-workers", type=int, default=1,
+                        help="Run this many compared models concurrently in separate processes")
+    parser.add_argument("--report-file", default=None,
+                        help="Also write the --models comparison report to this JSON file")
     parser.add_argument("--batch-size", type=int, default=4,
                         help="Batch size for inference")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Shard scenarios across this many worker processes, each with its own model replica")
+    parser.add_argument("--shard-retries", type=int, default=1,
+                        help="Times a failed shard is retried in a fresh worker before the run fails")
+    parser.add_argument("--pipeline-depth", type=int, default=0,
+                        help="Overlap cache lookups and evaluation with generation, queueing up to N batches "
+                             "on each side of the model (0 runs batches one after another)")
+    parser.add_argument("--max-batch-tokens", type=int, default=None,
+                        help="Cap each batch at this many padded prompt tokens (--batch-size still caps rows)")
+    parser.add_argument("--schedule", choices=SCHEDULES, default="bucketed",
+                        help="Batch scheduling: corpus order, or grouped by output type and bucketed by length")
     parser.add_argument("--structured", action="store_true",
                         help="Use structured output generation with outlines")
+    parser.add_argument("--constraint", choices=CONSTRAINT_MODES, default="json",
+                        help="Structured constraint: JSON schemas, or bare regex/choice grammars over the answer text")
+    parser.add_argument("--scoring", action="store_true",
+                        help="Answer closed-set scenarios (yes/no, choices, small ranges) by log-likelihood ranking "
+                             "instead of decoding (structured mode)")
+    parser.add_argument("--repeats", type=int, default=1,
+                        help="Sample every generated scenario N times from one prefill and report pass rates "
+                             "and answer distributions")
+    parser.add_argument("--semantic", choices=SEMANTIC_MODES, default="fuzzy",
+                        help="How the semantic evaluator judges answers: fuzzy text match or embedding cosine similarity")
+    parser.add_argument("--semantic-encoder", default=DEFAULT_ENCODER,
+                        help="Sentence-transformers encoder for --semantic embedding (runs on CPU)")
+    parser.add_argument("--semantic-threshold", type=float, default=DEFAULT_EMBEDDING_THRESHOLD,
+                        help="Minimum cosine similarity for an embedding semantic match")
+    parser.add_argument("--vector-cache-dir", default=DEFAULT_VECTOR_CACHE_DIR,
+                        help="Directory for cached expected-answer embeddings")
+    parser.add_argument("--similarity", choices=SIMILARITY_MODES, default="all",
+                        help="Which results get a similarity score: all, only semantic-evaluator scenarios, or none")
+    parser.add_argument("--similarity-backend", choices=SIMILARITY_BACKENDS, default="difflib",
+                        help="Similarity implementation; rapidfuzz (optional) is faster but scores slightly differently")
+    parser.add_argument("--schema-cache-dir", default=None,
+                        help="Directory to persist compiled schemas across runs (structured mode)")
+    parser.add_argument("--schema-cache-size", type=int, default=None,
+                        help="Maximum number of compiled schemas kept in memory")
+    parser.add_argument("--revision", default="main",
+                        help="Model revision (branch, tag or commit) to load")
+    parser.add_argument("--cache", choices=CACHE_MODES, default="readwrite",
+                        help="Response cache mode: skip inference for unchanged scenarios")
+    parser.add_argument("--cache-path", default=DEFAULT_CACHE_PATH,
+                        help="SQLite file used by the response cache")
+    parser.add_argument("--store-path", default=DEFAULT_STORE_PATH,
+                        help="SQLite results store every run is appended to (query it with results_store.py); "
+                             "with --watch only the initial full run is recorded")
+    parser.add_argument("--no-store", action="store_true", help="Do not record this run in the results store")
+    parser.add_argument("--no-index", action="store_true",
+                        help="Parse every scenario YAML directly instead of using the compiled scenario index")
+    parser.add_argument("--index-path", default=None,
+                        help="Location of the compiled scenario index")
+    parser.add_argument("--results-file", default=None,
+                        help="Append each result to this JSONL file as soon as it is evaluated")
+    parser.add_argument("--resume", default=None, metavar="FILE",
+                        help="Continue an interrupted run: skip scenarios already in this results file and append to it")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="List scenarios and their cache status without loading a model")
+    parser.add_argument("--profile", nargs="?", const="spans", choices=PROFILE_MODES, default=None,
+                        help="Time the run's phases and write a Chrome/Perfetto trace; 'cprofile' or 'torch' "
+                             "also collect function or operator hot spots")
+    parser.add_argument("--trace-file", default=DEFAULT_TRACE_PATH,
+                        help="Where --profile writes its trace")
+    parser.add_argument("--profile-top", type=int, default=25,
+                        help="Number of hot functions/operators --profile reports")
+    parser.add_argument("--preamble-file", default=None,
+                        help="Text file prepended to every prompt; its KV cache is computed once (unstructured mode)")
     
     args = parser.parse_args()
     
-    try:
-        results, passed, total = run_tests(
+    if args.profile:
+        # Report even when the run exits early or fails
+        start_profiling(args.profile, args.trace_file, args.profile_top)
+        atexit.register(stop_profiling)
+    
+    backend_options = None
+    if args.draft_model and args.backend != "hf":
+        print("Warning: --draft-model only applies to the hf backend; ignoring it", file=sys.stderr)
+    elif args.draft_model:
+        backend_options = {"draft_model": args.draft_model}
+    if args.backend == "stub":
+        backend_options = {"stub_latency": args.stub_latency, "stub_accuracy": args.stub_accuracy}
+    elif args.backend == "openai":
+        backend_options = {"api_base": args.api_base, "max_in_flight": args.max_in_flight,
+                           "max_retries": args.max_retries, "request_timeout": args.request_timeout,
+                           "guided_format": args.guided_format}
+    if args.daemon and not daemon_running(args.daemon):
+        print(f"Warning: no model daemon at {args.daemon}; loading the model in this process", file=sys.stderr)
+        args.daemon = None
+    if args.daemon:
+        backend_options = dict(backend_options or {}, daemon=args.daemon)
+    semantic_options = {"encoder_name": args.semantic_encoder, "threshold": args.semantic_threshold,
+                        "cache_dir": args.vector_cache_dir}
+    
+    if args.scoring and not args.structured:
+        print("Warning: --scoring only applies to --structured runs; ignoring it", file=sys.stderr)
+    if args.scoring and args.backend == "openai":
+        print("Warning: --scoring is not supported by the openai backend; ignoring it", file=sys.stderr)
+        args.scoring = False
+    if args.target_width is not None and not args.sample:
+        print("Warning: --target-width only applies with --sample; ignoring it", file=sys.stderr)
+    if args.repeats < 1:
+        print("Warning: --repeats must be at least 1; using 1", file=sys.stderr)
+        args.repeats = 1
+    
+    preamble = None
+    if args.preamble_file:
+        with open(args.preamble_file) as f:
+            preamble = f.read()
+    
+    if args.dry_run:
+        dry_run(
             model_name=args.model,
+            use_structured=args.structured,
+            preamble=preamble,
+            revision=args.revision,
+            cache_mode=args.cache,
+            cache_path=args.cache_path,
+            use_index=not args.no_index,
+            index_path=args.index_path,
+            scoring=args.scoring,
+            constraint=args.constraint,
+            backend=args.backend,
+            backend_options=backend_options
+        )
+        sys.exit(0)
+    
+    if args.models:
+        from compare import run_comparison
+        report = run_comparison(
+            [name.strip() for name in args.models.split(",") if name.strip()],
             output_format=args.format,
             batch_size=args.batch_size,
-            use_structured=args.structured
+            use_structured=args.structured,
+            schedule=args.schedule,
+            max_batch_tokens=args.max_batch_tokens,
+            use_index=not args.no_index,
+            index_path=args.index_path,
+            workers=args.compare_workers,
+            report_file=args.report_file,
+            schema_cache_dir=args.schema_cache_dir,
+            schema_cache_size=args.schema_cache_size,
+            preamble=preamble,
+            revision=args.revision,
+            cache_mode=args.cache,
+            cache_path=args.cache_path,
+            scoring=args.scoring,
+            constraint=args.constraint,
+            backend=args.backend,
+            backend_options=backend_options,
+            similarity=args.similarity,
+            similarity_backend=args.similarity_backend,
+            semantic=args.semantic,
+            semantic_options=semantic_options,
+            repeats=args.repeats,
+            pipeline_depth=args.pipeline_depth,
+            store_path=None if args.no_store else args.store_path
+        )
+        sys.exit(0 if all(m["passed"] == m["total"] for m in report["models"]) else 1)
+    
+    run_kwargs = dict(
+        model_name=args.model,
+        batch_size=args.batch_size,
+        use_structured=args.structured,
+        schema_cache_dir=args.schema_cache_dir,
+        schema_cache_size=args.schema_cache_size,
+        preamble=preamble,
+        revision=args.revision,
+        cache_mode=args.cache,
+        cache_path=args.cache_path,
+        use_index=not args.no_index,
+        index_path=args.index_path,
+        schedule=args.schedule,
+        max_batch_tokens=args.max_batch_tokens,
+        scoring=args.scoring,
+        constraint=args.constraint,
+        backend=args.backend,
+        backend_options=backend_options,
+        similarity=args.similarity,
+        similarity_backend=args.similarity_backend,
+        semantic=args.semantic,
+        semantic_options=semantic_options,
+        repeats=args.repeats,
+        pipeline_depth=args.pipeline_depth
+    )
+    
+    if args.watch:
+        from watch import run_watch
+        if args.workers > 1 or args.results_file or args.resume:
+            print("Warning: --watch runs in one process without a results file; "
+                  "ignoring --workers, --results-file and --resume", file=sys.stderr)
+        run_watch(run_kwargs, interval=args.watch_interval, output_format=args.format,
+                  store_path=None if args.no_store else args.store_path)
+        sys.exit(0)
+    
+    try:
+        results, passed, total = run_tests(
+            output_format=args.format,
+            sample=args.sample,
+            sample_seed=args.sample_seed,
+            target_width=args.target_width,
+            sample_step=args.sample_step,
+            workers=args.workers,
+            shard_retries=args.shard_retries,
+            results_file=args.resume or args.results_file,
+            resume=bool(args.resume),
+            store_path=None if args.no_store else args.store_path,
+            **run_kwargs
         )
         
         if passed < total:
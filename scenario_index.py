@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Compiled scenario index: parse, validate and pre-classify every scenario YAML once.
+
+The index is a single compact JSON file holding each scenario together with its
+precomputed output types. It is rebuilt incrementally: files whose mtime and size are
+unchanged are reused as-is, files whose content hash is unchanged only get their stat
+refreshed, and only genuinely changed files are re-parsed (in a process pool when
+there are many of them).
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import output_types
+
+INDEX_VERSION = 1
+DEFAULT_INDEX_PATH = ".mtg_cache/scenario_index.json"
+REQUIRED_FIELDS = ["id", "prompt", "expected_output", "evaluator"]
+KNOWN_EVALUATORS = {"exact", "contains", "semantic", "numeric", "boolean"}
+
+# Below this many changed files a process pool costs more than it saves
+PARALLEL_THRESHOLD = 64
+
+
+def _yaml_loader():
+    import yaml
+    # The libyaml-backed loader is several times faster than the pure-Python one
+    return getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def _derivation_version() -> str:
+    """Hash of the output-type detection code, so index entries go stale when it changes"""
+    with open(output_types.__file__, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+
+def validate_scenario(scenario) -> List[str]:
+    """Return a list of problems with a parsed scenario (empty if it is usable)"""
+    if not isinstance(scenario, dict):
+        return ["scenario is not a mapping"]
+    errors = []
+    for field in REQUIRED_FIELDS:
+        if field not in scenario:
+            errors.append(f"missing required field '{field}'")
+        elif not isinstance(scenario[field], str):
+            errors.append(f"field '{field}' must be a string")
+    if isinstance(scenario.get("evaluator"), str) and scenario["evaluator"] not in KNOWN_EVALUATORS:
+        errors.append(f"unknown evaluator '{scenario['evaluator']}'")
+    return errors
+
+
+def derive_fields(scenario: Dict) -> Dict:
+    """Precompute the output types the runner would otherwise derive per batch"""
+    output_type, kwargs = output_types.determine_output_type_and_kwargs(scenario)
+    return {
+        "output_type": output_type,
+        "output_kwargs": kwargs,
+        "basic_output_type": output_types.basic_output_type(scenario),
+    }
+
+
+def parse_scenario_file(path: str) -> Tuple[str, Optional[Dict]]:
+    """Parse, hash, validate and classify one scenario file (runs in worker processes)"""
+    import yaml
+
+    with open(path, "rb") as f:
+        data = f.read()
+    entry = {"sha256": hashlib.sha256(data).hexdigest(), "scenario": None, "errors": []}
+    try:
+        scenario = yaml.load(data, Loader=_yaml_loader())
+    except yaml.YAMLError as e:
+        entry["errors"] = [f"invalid YAML: {e}"]
+        return path, entry
+
+    entry["errors"] = validate_scenario(scenario)
+    if not entry["errors"]:
+        entry["scenario"] = scenario
+        entry.update(derive_fields(scenario))
+    return path, entry
+
+
+def _read_index(index_path: str) -> Dict:
+    try:
+        with open(index_path) as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if index.get("version") != INDEX_VERSION:
+        return {}
+    return index
+
+
+def _write_index(index_path: str, index: Dict):
+    directory = os.path.dirname(index_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{index_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(index, f, separators=(",", ":"), default=str)
+    os.replace(tmp_path, index_path)
+
+
+def _scenario_files(root: str) -> List[str]:
+    files = []
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            if name.endswith(".yaml"):
+                files.append(os.path.join(dirpath, name))
+    return sorted(files)
+
+
+def build_index(root: str = "scenarios", index_path: str = DEFAULT_INDEX_PATH,
+                workers: Optional[int] = None) -> Dict:
+    """Bring the on-disk index up to date with the scenario tree and return it"""
+    old = _read_index(index_path)
+    old_entries = old.get("entries", {}) if old.get("root") == root else {}
+    derivation = _derivation_version()
+    rederive = old.get("derivation") != derivation
+
+    files = _scenario_files(root)
+    entries = {}
+    to_parse = []
+    stats = {"reused": 0, "rehashed": 0, "parsed": 0, "removed": 0}
+    for path in files:
+        st = os.stat(path)
+        entry = old_entries.get(path)
+        if entry and entry["mtime_ns"] == st.st_mtime_ns and entry["size"] == st.st_size:
+            entries[path] = entry
+            stats["reused"] += 1
+            continue
+        if entry:
+            # Touched but possibly unchanged: compare content before paying for a parse
+            with open(path, "rb") as f:
+                digest = hashlib.sha256(f.read()).hexdigest()
+            if digest == entry["sha256"]:
+                entry["mtime_ns"], entry["size"] = st.st_mtime_ns, st.st_size
+                entries[path] = entry
+                stats["rehashed"] += 1
+                continue
+        to_parse.append(path)
+    stats["removed"] = len(set(old_entries) - set(entries) - set(to_parse))
+
+    if len(to_parse) >= PARALLEL_THRESHOLD and workers != 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parsed = list(pool.map(parse_scenario_file, to_parse, chunksize=32))
+    else:
+        parsed = [parse_scenario_file(path) for path in to_parse]
+    for path, entry in parsed:
+        st = os.stat(path)
+        entry["mtime_ns"], entry["size"] = st.st_mtime_ns, st.st_size
+        entries[path] = entry
+    stats["parsed"] = len(parsed)
+    # Keep entries in path order so runs are deterministic
+    entries = {path: entries[path] for path in files}
+
+    if rederive:
+        for path, entry in entries.items():
+            if entry["scenario"] is not None and path not in to_parse:
+                entry.update(derive_fields(entry["scenario"]))
+
+    index = {"version": INDEX_VERSION, "root": root, "derivation": derivation, "entries": entries}
+    if stats["parsed"] or stats["rehashed"] or stats["removed"] or rederive or not old:
+        _write_index(index_path, index)
+    index["stats"] = stats
+    return index
+
+
+def load_scenarios(root: str = "scenarios", index_path: str = DEFAULT_INDEX_PATH,
+                   workers: Optional[int] = None) -> List[Dict]:
+    """Return valid scenarios from the (incrementally rebuilt) index, in path order.
+
+    Each scenario dict carries its precomputed ``_output_type``, ``_output_kwargs`` and
+    ``_basic_output_type`` so the runner does not re-derive them per batch.
+    """
+    index = build_index(root, index_path, workers)
+    scenarios = []
+    seen_ids = set()
+    for path, entry in index["entries"].items():
+        if entry["errors"]:
+            print(f"Warning: Skipping {path}: {'; '.join(entry['errors'])}", file=sys.stderr)
+            continue
+        scenario = dict(entry["scenario"])
+        if scenario["id"] in seen_ids:
+            print(f"Warning: Duplicate scenario id '{scenario['id']}' in {path}", file=sys.stderr)
+        seen_ids.add(scenario["id"])
+        scenario["_output_type"] = entry["output_type"]
+        scenario["_output_kwargs"] = entry["output_kwargs"]
+        scenario["_basic_output_type"] = entry["basic_output_type"]
+        scenarios.append(scenario)
+    return scenarios
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or refresh the compiled scenario index")
+    parser.add_argument("--root", default="scenarios", help="Scenario directory to index")
+    parser.add_argument("--index", default=DEFAULT_INDEX_PATH, help="Index file to write")
+    parser.add_argument("--workers", type=int, default=None, help="Parser processes (default: CPU count)")
+    args = parser.parse_args()
+
+    index = build_index(args.root, args.index, args.workers)
+    invalid = [path for path, entry in index["entries"].items() if entry["errors"]]
+    stats = index["stats"]
+    print(f"Indexed {len(index['entries'])} files into {args.index}: "
+          f"{stats['parsed']} parsed, {stats['rehashed']} rehashed, {stats['reused']} reused, "
+          f"{stats['removed']} removed")
+    for path in invalid:
+        print(f"  INVALID {path}: {'; '.join(index['entries'][path]['errors'])}")
+    sys.exit(1 if invalid else 0)
+
+
+if __name__ == "__main__":
+    main()
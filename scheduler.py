@@ -0,0 +1,87 @@
+"""
+Batch scheduling: group scenarios by schema family and bucket them by prompt length.
+
+Batches built in corpus order mix short yes/no prompts with long draft prompts, so most
+of each padded batch is padding and every batch switches schemas. The scheduler groups
+scenarios by output type, sorts each group by prompt length and cuts batches either at a
+fixed size or at a padded-token budget. Results are put back in corpus order with
+``ReorderBuffer``.
+
+Groups are keyed by output type, not by the full schema key. Compiled schemas are cached
+by schema key whichever batch they run in, and rows with different schemas share one
+forward pass through per-row masks. Splitting, say, card selections by option list would
+only add batches: on the bundled corpus it takes 13 batches of 8 to 23.
+"""
+
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+SCHEDULES = ["sequential", "bucketed"]
+
+
+def approx_token_count(text: str) -> int:
+    """Cheap token estimate (~4 characters per token) for when no tokenizer is loaded"""
+    return max(1, len(text) // 4)
+
+
+def sequential_batches(count: int, batch_size: int) -> List[List[int]]:
+    """Consecutive batches in corpus order (the pre-scheduler behaviour)"""
+    return [list(range(i, min(i + batch_size, count))) for i in range(0, count, batch_size)]
+
+
+def bucketed_batches(lengths: Sequence[int], group_keys: Sequence[Hashable], batch_size: int,
+                     max_batch_tokens: Optional[int] = None) -> List[List[int]]:
+    """Plan batches of scenario indices grouped by key and sorted by length.
+
+    With ``max_batch_tokens`` a batch is closed as soon as adding the next row would push
+    its padded size (rows x longest row) over the budget; ``batch_size`` still caps rows.
+    """
+    groups: Dict[Hashable, List[int]] = {}
+    for i, key in enumerate(group_keys):
+        groups.setdefault(key, []).append(i)
+
+    batches = []
+    for rows in groups.values():
+        rows.sort(key=lambda i: lengths[i])
+        current = []
+        longest = 0
+        for i in rows:
+            longest_with = max(longest, lengths[i])
+            too_many = len(current) >= batch_size
+            over_budget = max_batch_tokens is not None and current and (len(current) + 1) * longest_with > max_batch_tokens
+            if current and (too_many or over_budget):
+                batches.append(current)
+                current, longest_with = [], lengths[i]
+            current.append(i)
+            longest = longest_with
+        if current:
+            batches.append(current)
+    return batches
+
+
+def padding_stats(batches: List[List[int]], lengths: Sequence[int]) -> Dict[str, float]:
+    """Real vs padded token counts for a batch plan"""
+    real = sum(lengths[i] for batch in batches for i in batch)
+    padded = sum(len(batch) * max(lengths[i] for i in batch) for batch in batches if batch)
+    return {
+        "batches": len(batches),
+        "real_tokens": real,
+        "padded_tokens": padded,
+        "padding_ratio": (padded - real) / padded if padded else 0.0,
+    }
+
+
+class ReorderBuffer:
+    """Release items in index order even when they complete out of order"""
+
+    def __init__(self):
+        self._pending: Dict[int, object] = {}
+        self._next = 0
+
+    def add(self, index: int, item) -> List[Tuple[int, object]]:
+        """Record a finished item and return every item that is now ready, in order"""
+        self._pending[index] = item
+        ready = []
+        while self._next in self._pending:
+            ready.append((self._next, self._pending.pop(self._next)))
+            self._next += 1
+        return ready
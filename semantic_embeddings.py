@@ -0,0 +1,128 @@
+"""
+Embedding-based semantic evaluation: cosine similarity between sentence embeddings.
+
+Outputs are embedded in one encoder call per runner batch, and a batch is scored with a
+single row-wise dot product over normalized vectors. Expected answers are embedded once and
+kept in a memory-mapped float32 file keyed by a hash of the answer text, so later runs
+only embed answers that changed. Needs ``numpy`` and ``sentence-transformers``, which are
+imported on first use.
+"""
+
+import hashlib
+import json
+import os
+import re
+from typing import Callable, Dict, List, Optional, Sequence
+
+SEMANTIC_MODES = ["fuzzy", "embedding"]
+DEFAULT_ENCODER = "sentence-transformers/all-MiniLM-L6-v2"
+DEFAULT_VECTOR_CACHE_DIR = ".mtg_cache/embeddings"
+DEFAULT_EMBEDDING_THRESHOLD = 0.75
+
+
+def text_key(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class VectorCache:
+    """Append-only memory-mapped store of embedding rows, with a JSON index of key -> row.
+
+    Rows are appended to ``<name>.f32`` before the index is atomically replaced, so a crash
+    can leave unused bytes at the end of the file but never an index entry without its row.
+    """
+
+    def __init__(self, cache_dir: str, name: str):
+        os.makedirs(cache_dir, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", name)
+        self.data_path = os.path.join(cache_dir, f"{slug}.f32")
+        self.index_path = os.path.join(cache_dir, f"{slug}.json")
+        self.rows: Dict[str, int] = {}
+        self.dim: Optional[int] = None
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as f:
+                index = json.load(f)
+            self.rows, self.dim = index["rows"], index["dim"]
+        self._array = None
+
+    def _matrix(self):
+        import numpy as np
+        if self._array is None or len(self._array) < len(self.rows):
+            self._array = np.memmap(self.data_path, dtype=np.float32, mode="r", shape=(len(self.rows), self.dim))
+        return self._array
+
+    def missing(self, keys: Sequence[str]) -> List[str]:
+        return [key for key in dict.fromkeys(keys) if key not in self.rows]
+
+    def add(self, keys: Sequence[str], vectors):
+        """Append vectors (n x dim) for keys not yet stored"""
+        import numpy as np
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if self.dim is None:
+            self.dim = int(vectors.shape[1])
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"Embedding size {vectors.shape[1]} does not match cached size {self.dim}")
+        # Trim bytes left behind by an interrupted append before adding rows
+        with open(self.data_path, "ab") as f:
+            f.truncate(len(self.rows) * self.dim * 4)
+            f.write(vectors.tobytes())
+        for key in keys:
+            self.rows[key] = len(self.rows)
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"dim": self.dim, "rows": self.rows}, f)
+        os.replace(tmp_path, self.index_path)
+        self._array = None
+
+    def get(self, keys: Sequence[str]):
+        """Stored vectors for keys, in order (every key must be present)"""
+        return self._matrix()[[self.rows[key] for key in keys]]
+
+
+class EmbeddingEvaluator:
+    """Judge outputs semantically equal to their expected answers by embedding cosine similarity"""
+
+    def __init__(self, encoder_name: str = DEFAULT_ENCODER, threshold: float = DEFAULT_EMBEDDING_THRESHOLD,
+                 cache_dir: Optional[str] = DEFAULT_VECTOR_CACHE_DIR, encode: Optional[Callable] = None):
+        self.encoder_name = encoder_name
+        self.threshold = threshold
+        self.cache = VectorCache(cache_dir, encoder_name) if cache_dir else None
+        self._encode = encode
+        self.encoded = 0
+
+    def encode(self, texts: Sequence[str]):
+        """Normalized float32 embeddings (n x dim) for texts, in one encoder call"""
+        import numpy as np
+        if self._encode is None:
+            from sentence_transformers import SentenceTransformer
+            model = SentenceTransformer(self.encoder_name, device="cpu")
+            self._encode = lambda batch: model.encode(list(batch), batch_size=64, convert_to_numpy=True)
+        vectors = np.asarray(self._encode(list(texts)), dtype=np.float32)
+        self.encoded += len(texts)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def expected_vectors(self, expected: Sequence[str]):
+        """Embeddings of expected answers, computing and storing only uncached ones"""
+        if self.cache is None:
+            return self.encode(expected)
+        keys = [text_key(text) for text in expected]
+        missing = self.cache.missing(keys)
+        if missing:
+            by_key = dict(zip(keys, expected))
+            self.cache.add(missing, self.encode([by_key[key] for key in missing]))
+        return self.cache.get(keys)
+
+    def prepare(self, expected: Sequence[str]):
+        """Precompute expected-answer embeddings for a whole corpus up front"""
+        if expected:
+            self.expected_vectors(expected)
+
+    def scores(self, outputs: Sequence[str], expected: Sequence[str]) -> List[float]:
+        """Cosine similarity of each output to its expected answer"""
+        import numpy as np
+        from evaluators import _clean_response
+        if not outputs:
+            return []
+        output_vectors = self.encode([_clean_response(output) for output in outputs])
+        # Row-wise dot product of unit vectors: one vectorized pass for the whole batch
+        return np.einsum("ij,ij->i", output_vectors, self.expected_vectors(expected)).tolist()
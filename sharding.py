@@ -0,0 +1,136 @@
+"""
+Sharded evaluation: spread planned batches across worker processes, one model replica each.
+
+Batches are dealt to shards so that every shard gets roughly the same number of padded
+prompt tokens. Each worker is pinned to one accelerator when there are any (round-robin
+when there are more workers than devices) and otherwise gets an equal slice of the CPU
+threads. A shard whose worker raises or dies is retried in a fresh process; results from
+all shards are merged back into corpus order.
+
+Every shard opens the same SQLite response cache, so their lookups and writes run
+concurrently; SQLite's write-ahead log lets reads proceed while writes queue for the lock.
+"""
+
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from scheduler import approx_token_count
+
+
+def split_batches(batches: List[List[int]], lengths: Sequence[int], shards: int) -> List[List[List[int]]]:
+    """Deal batches to shards, largest first, always onto the shard with the least padded work"""
+    cost = lambda batch: len(batch) * max(lengths[i] for i in batch)
+    assigned: List[List[List[int]]] = [[] for _ in range(shards)]
+    load = [0] * shards
+    for batch in sorted((b for b in batches if b), key=cost, reverse=True):
+        target = load.index(min(load))
+        assigned[target].append(batch)
+        load[target] += cost(batch)
+    return [shard for shard in assigned if shard]
+
+
+def worker_devices(workers: int) -> List[Optional[int]]:
+    """Accelerator index for each worker, or None for every worker on a CPU-only machine"""
+    try:
+        import torch
+        count = torch.cuda.device_count()
+    except ImportError:
+        count = 0
+    if count == 0:
+        return [None] * workers
+    return [worker % count for worker in range(workers)]
+
+
+def _run_shard(model_name: str, scenarios: List[Dict], batches: List[List[int]], eval_kwargs: Dict,
+               device: Optional[int], threads: int) -> Tuple[List[Dict], Dict]:
+    """Worker entry point: pin the device or thread count before torch is imported, then evaluate"""
+    if device is not None:
+        os.environ["CUDA_VISIBLE_DEVICES"] = str(device)
+    else:
+        os.environ["OMP_NUM_THREADS"] = str(threads)
+        os.environ["MKL_NUM_THREADS"] = str(threads)
+    import runner
+    return runner.evaluate_batches(model_name, scenarios, batches, **eval_kwargs)
+
+
+# Per-shard counters that add up to the run's total
+SUMMED_STATS = {"hits", "misses", "writes", "disk_hits", "evictions", "prefill_tokens_saved"}
+
+
+def _merge_stats(stats_list: List[Dict]) -> Dict:
+    """Merge per-shard run stats: counters are summed and durations and cache sizes take the
+    largest shard's value, since shards run side by side; anything else (a capacity, a
+    mode) comes from the first shard"""
+    merged: Dict = {}
+    for stats in stats_list:
+        for key, value in stats.items():
+            if isinstance(value, dict):
+                merged[key] = _merge_stats([merged.get(key, {}), value])
+            elif key not in merged or not isinstance(value, (int, float)) or isinstance(value, bool):
+                merged.setdefault(key, value)
+            elif key in SUMMED_STATS:
+                merged[key] += value
+            elif key.endswith("_seconds") or key == "size":
+                merged[key] = max(merged[key], value)
+    return merged
+
+
+def run_sharded(model_name: str, scenarios: List[Dict], batches: List[List[int]], eval_kwargs: Dict,
+                workers: int, retries: int = 1,
+                on_shard: Optional[Callable[[List[Dict]], None]] = None) -> Tuple[List[Dict], Dict]:
+    """Evaluate batches across worker processes and return merged (results, run stats).
+
+    ``on_shard`` is called with each shard's results as soon as that shard succeeds, so they
+    can be saved before the slower shards finish.
+    """
+    lengths = [approx_token_count(scenario["prompt"]) for scenario in scenarios]
+    shards = split_batches(batches, lengths, workers)
+    devices = worker_devices(len(shards))
+    threads = max(1, (os.cpu_count() or 1) // len(shards))
+
+    # Each shard runs on its own slice of the corpus, with batch indices remapped into it
+    jobs = []
+    for shard in shards:
+        rows = [i for batch in shard for i in batch]
+        position = {row: n for n, row in enumerate(rows)}
+        jobs.append((rows, [[position[i] for i in batch] for batch in shard]))
+
+    outcomes: Dict[int, Tuple[List[Dict], Dict]] = {}
+    pending = list(range(len(jobs)))
+    attempt = 0
+    # Spawn rather than fork so each worker initialises CUDA on its own
+    context = multiprocessing.get_context("spawn")
+    while pending:
+        failed = []
+        # A crashed worker breaks the whole pool, so every attempt gets a fresh one
+        with ProcessPoolExecutor(max_workers=len(pending), mp_context=context) as pool:
+            futures = {
+                pool.submit(_run_shard, model_name, [scenarios[i] for i in jobs[shard][0]],
+                            jobs[shard][1], eval_kwargs, devices[shard], threads): shard
+                for shard in pending
+            }
+            for future in as_completed(futures):
+                shard = futures[future]
+                try:
+                    outcomes[shard] = future.result()
+                except Exception as e:
+                    print(f"Warning: Shard {shard} failed (attempt {attempt + 1}): {e}", file=sys.stderr)
+                    failed.append(shard)
+                    continue
+                if on_shard is not None:
+                    on_shard(outcomes[shard][0])
+        failed.sort()
+        if failed and attempt >= retries:
+            raise RuntimeError(f"Shards {failed} failed after {retries + 1} attempts")
+        pending = failed
+        attempt += 1
+
+    merged: List[Optional[Dict]] = [None] * len(scenarios)
+    for shard, (rows, _) in enumerate(jobs):
+        for row, result in zip(rows, outcomes[shard][0]):
+            merged[row] = result
+    results = [result for result in merged if result is not None]
+    return results, _merge_stats([outcomes[shard][1] for shard in range(len(jobs))])
@@ -0,0 +1,94 @@
+"""
+Similarity scoring between model outputs and expected answers.
+
+``difflib.SequenceMatcher.ratio()`` is quadratic in the worst case, which adds up on long
+explanation answers. Threshold checks first try the cheap ``real_quick_ratio`` and
+``quick_ratio`` upper bounds and only compute the full ratio when those cannot rule the
+pair out. Batches group pairs by expected answer so each expected string is analysed once
+(``set_seq2`` caches it), and identical pairs are scored once. The optional ``rapidfuzz``
+backend computes a normalized Indel similarity in C. It is close to difflib's ratio but not
+identical, so it has to be selected explicitly.
+"""
+
+import difflib
+import sys
+from typing import Dict, List, Optional, Sequence, Tuple
+
+SIMILARITY_MODES = ["all", "semantic", "off"]
+SIMILARITY_BACKENDS = ["difflib", "rapidfuzz"]
+SEMANTIC_THRESHOLD = 0.8
+
+_backend = "difflib"
+
+
+def set_backend(name: str):
+    """Select the similarity backend for the rest of the process"""
+    global _backend
+    if name not in SIMILARITY_BACKENDS:
+        raise ValueError(f"Unknown similarity backend: {name}")
+    if name == "rapidfuzz":
+        try:
+            import rapidfuzz  # noqa: F401
+        except ImportError:
+            print("Warning: rapidfuzz is not installed; falling back to difflib similarity", file=sys.stderr)
+            name = "difflib"
+    _backend = name
+
+
+def ratio(a: str, b: str) -> float:
+    """Similarity in [0, 1] between two strings"""
+    if a == b:
+        return 1.0
+    if _backend == "rapidfuzz":
+        from rapidfuzz import fuzz
+        return fuzz.ratio(a, b) / 100.0
+    return difflib.SequenceMatcher(None, a, b).ratio()
+
+
+def exceeds(a: str, b: str, threshold: float = SEMANTIC_THRESHOLD) -> bool:
+    """ratio(a, b) > threshold, skipping the full ratio when an upper bound already rules it out"""
+    if a == b:
+        return 1.0 > threshold
+    if _backend == "rapidfuzz":
+        from rapidfuzz import fuzz
+        # score_cutoff lets rapidfuzz abandon the alignment early
+        return fuzz.ratio(a, b, score_cutoff=threshold * 100) > threshold * 100
+    # Lengths alone bound the ratio at 2 * min / (len(a) + len(b))
+    total = len(a) + len(b)
+    if not total or 2.0 * min(len(a), len(b)) / total <= threshold:
+        return False
+    matcher = difflib.SequenceMatcher(None, a, b)
+    if matcher.quick_ratio() <= threshold:
+        return False
+    return matcher.ratio() > threshold
+
+
+def batch_ratios(pairs: Sequence[Tuple[str, str]]) -> List[float]:
+    """ratio() for many (output, expected) pairs, sharing work between repeated strings"""
+    scores: List[Optional[float]] = [None] * len(pairs)
+    by_expected: Dict[str, Dict[str, List[int]]] = {}
+    for i, (output, expected) in enumerate(pairs):
+        if output == expected:
+            scores[i] = 1.0
+        else:
+            by_expected.setdefault(expected, {}).setdefault(output, []).append(i)
+
+    if _backend == "rapidfuzz":
+        from rapidfuzz import fuzz
+        for expected, outputs in by_expected.items():
+            for output, rows in outputs.items():
+                score = fuzz.ratio(output, expected) / 100.0
+                for i in rows:
+                    scores[i] = score
+        return scores
+
+    matcher = difflib.SequenceMatcher(None)
+    for expected, outputs in by_expected.items():
+        # set_seq2 builds the expected string's index once for every output compared to it
+        matcher.set_seq2(expected)
+        for output, rows in outputs.items():
+            matcher.set_seq1(output)
+            score = matcher.ratio()
+            for i in rows:
+                scores[i] = score
+    return scores
@@ -0,0 +1,129 @@
+"""
+Stratified sampling of the scenario corpus for quick model triage (--sample).
+
+Scenarios are grouped into strata by category, subcategory and evaluator. They are then
+ordered so that every prefix of the order is a proportional stratified sample that covers
+each stratum as early as possible. A sample is a prefix. Adaptive sampling keeps taking the
+next slice of the same order until the confidence interval on the overall pass rate is
+narrow enough.
+"""
+
+import math
+import random
+from collections import defaultdict
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+STRATA_FIELDS = ("category", "subcategory", "evaluator")
+Z_95 = 1.959964
+
+
+def stratum_of(record: Dict, fields: Sequence[str] = STRATA_FIELDS) -> str:
+    """Stratum name of a scenario or result, e.g. ``rules/card_types/exact``"""
+    return "/".join(str(record.get(field, "unknown")) for field in fields)
+
+
+def wilson_interval(passed: int, total: int, z: float = Z_95) -> Tuple[Optional[float], Optional[float]]:
+    """Wilson score interval for a pass rate; stays inside [0, 1] even at 0/n and n/n"""
+    if total == 0:
+        return None, None
+    p = passed / total
+    denominator = 1 + z * z / total
+    centre = (p + z * z / (2 * total)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / total + z * z / (4 * total * total)) / denominator
+    return max(0.0, centre - margin), min(1.0, centre + margin)
+
+
+def stratified_order(scenarios: List[Dict], fields: Sequence[str] = STRATA_FIELDS, seed: int = 0) -> List[Dict]:
+    """All scenarios, ordered so that any prefix is a proportional stratified sample.
+
+    Each stratum is shuffled, and its i-th member of n is placed at position i / n. Every
+    stratum's first member therefore comes before any stratum's second.
+    """
+    rng = random.Random(seed)
+    strata = defaultdict(list)
+    for scenario in scenarios:
+        strata[stratum_of(scenario, fields)].append(scenario)
+    keyed = []
+    for name in sorted(strata):
+        members = strata[name]
+        rng.shuffle(members)
+        keyed.extend(((i / len(members), rng.random()), scenario) for i, scenario in enumerate(members))
+    keyed.sort(key=lambda item: item[0])
+    return [scenario for _, scenario in keyed]
+
+
+def sample_size(size: float, population: int) -> int:
+    """--sample as a scenario count, or as a fraction of the corpus when below 1"""
+    count = math.ceil(size * population) if size < 1 else int(size)
+    return max(1, min(population, count))
+
+
+class StratifiedSample:
+    """Per-stratum pass counts for a sample, and a stratified estimate of the overall pass rate.
+
+    The overall estimate weights each sampled stratum by its share of the corpus. Its
+    interval uses the stratified variance, with each stratum's rate smoothed towards 1/2,
+    so a stratum with a handful of all-pass results does not claim zero variance.
+    """
+
+    def __init__(self, scenarios: List[Dict], fields: Sequence[str] = STRATA_FIELDS, z: float = Z_95):
+        self.fields = fields
+        self.z = z
+        self.population = defaultdict(int)
+        for scenario in scenarios:
+            self.population[stratum_of(scenario, fields)] += 1
+        self.sampled = defaultdict(int)
+        self.passed = defaultdict(int)
+
+    def record(self, result: Dict):
+        stratum = stratum_of(result, self.fields)
+        self.sampled[stratum] += 1
+        self.passed[stratum] += 1 if result["passed"] else 0
+
+    def overall(self) -> Dict:
+        """Stratified pass-rate estimate and its interval over the strata sampled so far"""
+        weight_total = sum(self.population[name] for name in self.sampled)
+        if not weight_total:
+            return {"estimate": None, "ci_low": None, "ci_high": None, "width": None}
+        estimate = variance = 0.0
+        for name, n in self.sampled.items():
+            weight = self.population[name] / weight_total
+            smoothed = (self.passed[name] + 1) / (n + 2)
+            estimate += weight * self.passed[name] / n
+            variance += weight * weight * smoothed * (1 - smoothed) / n
+        margin = self.z * math.sqrt(variance)
+        low, high = max(0.0, estimate - margin), min(1.0, estimate + margin)
+        return {"estimate": estimate, "ci_low": low, "ci_high": high, "width": high - low}
+
+    def summary(self) -> Dict:
+        strata = {}
+        for name in sorted(self.population):
+            n, passed = self.sampled.get(name, 0), self.passed.get(name, 0)
+            low, high = wilson_interval(passed, n, self.z)
+            strata[name] = {"population": self.population[name], "sampled": n, "passed": passed,
+                            "pass_rate": passed / n if n else None, "ci_low": low, "ci_high": high}
+        return {
+            "fields": list(self.fields),
+            "population": sum(self.population.values()),
+            "sampled": sum(self.sampled.values()),
+            "unsampled_strata": sum(1 for name in self.population if name not in self.sampled),
+            "overall": self.overall(),
+            "strata": strata,
+        }
+
+
+def adaptive_batches(sample: StratifiedSample, population: int, size: int, plan: Callable[[int, int], List[List[int]]],
+                     target_width: Optional[float] = None, step: Optional[int] = None) -> Iterator[List[int]]:
+    """Batches over the first ``size`` ordered scenarios, then further slices of ``step``
+    scenarios while the overall interval is wider than ``target_width``.
+
+    ``plan(start, end)`` schedules scenarios start..end of the order into batches of
+    indices. The width is checked between slices, from the results recorded so far.
+    """
+    start, end = 0, size
+    while True:
+        yield from plan(start, end)
+        width = sample.overall()["width"]
+        if target_width is None or end >= population or (width is not None and width <= target_width):
+            return
+        start, end = end, min(population, end + (step or size))
@@ -0,0 +1,33 @@
+"""
+Tests for bare answer grammars
+"""
+
+import sys
+import os
+import re
+
+# Add the project root to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.answer_grammars import numeric_range_regex, bare_answer_regex, regex_to_gbnf
+
+def test_numeric_range_matches_exactly_the_range():
+    for low, high in [(0, 20), (5, 5), (3, 47), (17, 1234), (-15, 7), (-30, -4), (99, 101)]:
+        pattern = re.compile(numeric_range_regex(low, high))
+        for value in range(low - 30, high + 30):
+            assert bool(pattern.fullmatch(str(value))) == (low <= value <= high), (low, high, value)
+        assert not pattern.fullmatch("0" + str(abs(high)))  # no leading zeros
+
+def test_choices_are_matched_literally():
+    pattern = re.compile(bare_answer_regex("card_selection", {"options": ["Ajani's Pridemate", "Opt (M19)"]}))
+    assert pattern.fullmatch("Opt (M19)")
+    assert pattern.fullmatch("Ajani's Pridemate")
+    assert not pattern.fullmatch("Opt")
+    assert re.fullmatch(bare_answer_regex("boolean", {}), "yes")
+
+def test_gbnf_translation():
+    assert regex_to_gbnf(bare_answer_regex("numeric", {})) == 'root ::= "-"? [0-9]{1,6}'
+    assert regex_to_gbnf(numeric_range_regex(0, 25)) == 'root ::= ([0-9] | ("1" [0-9] | "2" [0-5]))'
+    choices = regex_to_gbnf(bare_answer_regex("multiple_choice", {"choices": ['Say "hi"', "a.b (c)"]}))
+    assert choices == 'root ::= ("Say \\"hi\\"" | "a.b (c)")'
+    assert regex_to_gbnf(bare_answer_regex("simple", {})) == "root ::= [^\\n]{1,60}"
@@ -0,0 +1,84 @@
+"""
+Tests for assisted decoding with a draft model, on a pair of tiny random CPU models
+"""
+
+import sys
+import os
+
+import pytest
+
+# Add the project root to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+from transformers import GPT2Config, GPT2LMHeadModel, LogitsProcessorList
+from models.assisted import ReplayingProcessor, assisted_generate, draft_rows, run_with_draft
+
+VOCAB = 64
+
+def tiny_model(seed, layers=2):
+    torch.manual_seed(seed)
+    config = GPT2Config(vocab_size=VOCAB, n_positions=128, n_embd=32, n_layer=layers, n_head=2,
+                        bos_token_id=VOCAB - 1, eos_token_id=VOCAB - 1)
+    return GPT2LMHeadModel(config).eval()
+
+def prompt():
+    return {"input_ids": torch.tensor([[1, 2, 3, 4, 5]]), "attention_mask": torch.ones(1, 5, dtype=torch.long)}
+
+class AlternatingParity:
+    """Stateful constraint in the outlines style: advances on the last token of every call"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.expected = None
+        self.violations = 0
+
+    def __call__(self, input_ids, scores):
+        if self.expected is None:
+            self.expected = 0
+        else:
+            self.violations += input_ids[0, -1].item() % 2 != self.expected
+            self.expected = 1 - self.expected
+        mask = torch.arange(scores.shape[-1]) % 2 != self.expected
+        return scores.masked_fill(mask, float("-inf"))
+
+def test_greedy_output_matches_plain_decoding():
+    target, draft = tiny_model(0), tiny_model(1, layers=1)
+    kwargs = dict(max_new_tokens=24, do_sample=False, pad_token_id=0)
+    plain = target.generate(**prompt(), **kwargs)
+    assisted, stats = assisted_generate(target, draft, prompt(), **kwargs)
+    assert torch.equal(plain, assisted)
+    generated = assisted.shape[1] - 5
+    assert stats["target_steps"] <= generated
+    assert stats["accepted_draft_tokens"] == max(0, generated - stats["target_steps"])
+
+def test_identical_draft_is_mostly_accepted():
+    target = tiny_model(0)
+    draft = tiny_model(0)
+    outputs, stats = assisted_generate(target, draft, prompt(), max_new_tokens=24, do_sample=False, pad_token_id=0)
+    assert stats["accepted_draft_tokens"] > 0
+    assert stats["target_steps"] < outputs.shape[1] - 5
+
+def test_constraint_holds_while_drafts_are_rejected():
+    target, draft = tiny_model(0), tiny_model(1, layers=1)
+    constraint = AlternatingParity()
+    replaying = ReplayingProcessor(constraint)
+    outputs, _ = assisted_generate(target, draft, prompt(), max_new_tokens=24, do_sample=False, pad_token_id=0,
+                                   logits_processor=LogitsProcessorList([replaying]))
+    generated = outputs[0, 5:].tolist()
+    assert all(token % 2 == i % 2 for i, token in enumerate(generated))
+    assert constraint.violations == 0
+
+def test_long_form_rows_run_alone_and_come_back_in_order():
+    assert draft_rows(["boolean", "explanation", None], [8, 100, 100]) == [1, 2]
+    calls = []
+    def run(rows, assisted):
+        calls.append((rows, assisted))
+        return [f"text{row}" for row in rows], [{"row": row} for row in rows]
+    texts, stats = run_with_draft(4, [1, 3], run)
+    assert texts == ["text0", "text1", "text2", "text3"]
+    assert calls == [([0, 2], False), ([1], True), ([3], True)]
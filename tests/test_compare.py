@@ -0,0 +1,37 @@
+"""
+Tests for multi-model comparison mode
+"""
+
+import sys
+import os
+
+# Add the project root to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import runner
+from compare import compare_models, comparison_report
+from response_cache import ResponseCache
+
+SCENARIOS = [
+    {"id": "t1", "prompt": "Is a Forest a land?", "expected_output": "yes", "evaluator": "boolean"},
+    {"id": "t2", "prompt": "How many cards in an opening hand?", "expected_output": "7", "evaluator": "numeric"},
+]
+
+def test_models_share_one_plan_and_are_compared_per_scenario(tmp_path):
+    # Pre-seed the response cache so both models run without loading any weights
+    cache_path = str(tmp_path / "responses.sqlite")
+    output_types, _ = runner.batch_output_types(SCENARIOS, False)
+    answers = {"model-a": ["yes", "7"], "model-b": ["yes", "6"]}
+    cache = ResponseCache(cache_path)
+    for model_name, outputs in answers.items():
+        keys = runner.response_cache_keys(SCENARIOS, output_types, None, model_name, "main", False)
+        cache.store(zip(keys, outputs), model_name=model_name)
+    cache.close()
+
+    runs = compare_models(list(answers), SCENARIOS, [[0, 1]],
+                          {"cache_mode": "read", "cache_path": cache_path})
+    report = comparison_report(runs, SCENARIOS)
+
+    assert [m["passed"] for m in report["models"]] == [2, 1]
+    assert report["scenarios"][1]["outputs"] == {"model-a": "7", "model-b": "6"}
+    assert report["disagreements"] == ["t2"]
@@ -0,0 +1,98 @@
+"""
+Tests for the resident model daemon and --watch re-evaluation
+"""
+
+import sys
+import os
+import shutil
+
+import pytest
+import yaml
+
+# Add the project root to the path so we can import our modules
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import runner
+from daemon import serve_in_background
+from models.remote_model import RemoteModel, DaemonError, daemon_running
+from watch import ScenarioWatcher, format_delta
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    # The daemon's stub answers from the scenarios under the working directory and writes its
+    # scenario index there, so run from a scratch directory that links to the corpus
+    workdir = tmp_path / "work"
+    workdir.mkdir()
+    (workdir / "scenarios").symlink_to(os.path.join(ROOT, "scenarios"))
+    monkeypatch.chdir(workdir)
+    server = serve_in_background(str(tmp_path / "daemon.sock"))
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def stub_kwargs(server, **kwargs):
+    return dict(backend="stub", cache_mode="off",
+                backend_options={"stub_accuracy": 0.7, "daemon": server.socket_path}, **kwargs)
+
+def test_remote_runs_match_local_and_load_once(server):
+    remote, _, _ = runner.run_tests(output_format=None, **stub_kwargs(server))
+    again, _, _ = runner.run_tests(output_format=None, **stub_kwargs(server))
+    local, _, _ = runner.run_tests(output_format=None, backend="stub", cache_mode="off",
+                                   backend_options={"stub_accuracy": 0.7})
+    assert remote and [(r["id"], r["actual_output"]) for r in remote] == [(r["id"], r["actual_output"]) for r in local]
+    assert [r["passed"] for r in again] == [r["passed"] for r in remote]
+    assert server.host.loads == 1 and server.host.requests > 1
+
+def test_errors_come_back_to_the_client(server):
+    model = RemoteModel(server.socket_path, {"model_name": "stub", "backend": "stub"})
+    try:
+        with pytest.raises(DaemonError, match="Unknown method"):
+            model._call("generate_everything")
+        assert model.run_batch(["not a scenario"], ["boolean"]) == ["yes"]
+    finally:
+        model.close()
+
+def test_stale_socket_is_replaced(tmp_path):
+    path = str(tmp_path / "daemon.sock")
+    open(path, "w").close()
+    assert not daemon_running(path)
+    server = serve_in_background(path)
+    try:
+        assert daemon_running(path)
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert not os.path.exists(path)
+
+def test_watch_reruns_only_changed_files(server, tmp_path):
+    corpus = tmp_path / "scenarios"
+    corpus.mkdir()
+    sources = sorted(os.path.join(ROOT, "scenarios", "rules", name)
+                     for name in os.listdir(os.path.join(ROOT, "scenarios", "rules")))[:3]
+    for source in sources[:2]:
+        shutil.copy(source, corpus)
+    watcher = ScenarioWatcher(str(corpus / "*.yaml"), stub_kwargs(server, batch_size=4))
+    watcher.start(output_format=None)
+    assert len(watcher.passed) == 2
+    assert watcher.poll() == []
+
+    # Edit one expected output, add a file and delete another
+    edited = corpus / os.path.basename(sources[0])
+    scenario = yaml.safe_load(edited.read_text())
+    scenario["expected_output"] = "something the stub will never answer"
+    scenario["evaluator"] = "exact"
+    edited.write_text(yaml.safe_dump(scenario))
+    shutil.copy(sources[2], corpus)
+    removed = yaml.safe_load(open(sources[1]))["id"]
+    os.remove(corpus / os.path.basename(sources[1]))
+    requests = server.host.requests
+
+    deltas = {scenario_id: (before, after) for scenario_id, before, after in watcher.poll()}
+    added = yaml.safe_load(open(sources[2]))["id"]
+    assert deltas[scenario["id"]][1] is False
+    assert deltas[added][0] is None and deltas[removed] == (deltas[removed][0], None)
+    assert len(deltas) == 3
+    # One batch for the two re-run files, not the whole corpus
+    assert server.host.requests - requests <= 2
+    assert format_delta("a", True, False) == "a: PASS -> FAIL"
@@ -0,0 +1,34 @@
+"""
+Tests for per-output-type decode budgets and early stops in unstructured runs
+"""
+
+import sys
+import os
+import re
+
+# Add the project root to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import runner
+from models.prompting import DECODE_BUDGETS, STOP_PATTERNS, decode_budget
+
+def scenario(expected, evaluator="exact", **fields):
+    return dict({"id": "s", "category": "rules", "subcategory": "priority", "prompt": "Question?",
+                 "expected_output": expected, "evaluator": evaluator}, **fields)
+
+def test_yes_no_scenarios_get_the_boolean_budget_and_stop():
+    batch = [scenario("yes", "boolean"), scenario("No"), scenario("3", "numeric"), scenario("7"),
+             scenario("Shock"), scenario("First strike damage is dealt before regular combat damage.")]
+    output_types, _ = runner.batch_output_types(batch, False)
+    assert output_types == ["boolean", "boolean", "numeric", "numeric", "simple", "explanation"]
+    assert decode_budget(output_types[0], batch[0]) == DECODE_BUDGETS["boolean"] < DECODE_BUDGETS["simple"]
+
+    stop = re.compile(STOP_PATTERNS[output_types[1]], re.IGNORECASE)
+    assert stop.search("Yes, because the spell resolves") and not stop.search("Yesterday")
+    # The budget and stop are part of the response-cache key
+    keys = runner.response_cache_keys(batch[:1], output_types[:1], None, "m", "main", False, None, False, "json", "hf")
+    other = runner.response_cache_keys(batch[:1], ["simple"], None, "m", "main", False, None, False, "json", "hf")
+    assert keys != other
+
+def test_explicit_output_type_wins():
+    assert runner.batch_output_types([scenario("yes", output_type="multiple_choice")], False)[0] == ["multiple_choice"]
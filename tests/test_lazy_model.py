@@ -0,0 +1,44 @@
+"""
+Tests for building the model only when a prompt actually needs inference
+"""
+
+import sys
+import os
+
+# Add the project root to the path so we can import our modules
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import runner
+from models.lazy_model import LazyModel
+
+def test_model_is_built_on_first_use_only():
+    built = []
+    model = LazyModel(lambda: built.append(1) or "model")
+    assert not model.loaded and model.instance is None and built == []
+    assert model.get() == model.get() == "model"
+    assert built == [1] and model.load_seconds >= 0.0
+    model.unload()
+    assert model.instance is None
+
+def test_cached_runs_never_build_the_model(tmp_path, monkeypatch):
+    calls = []
+    create_model = runner.create_model
+    def counting_create_model(*args, **kwargs):
+        calls.append(args[0])
+        return create_model(*args, **kwargs)
+    monkeypatch.setattr(runner, "create_model", counting_create_model)
+
+    scenarios = runner.load_scenarios(os.path.join(ROOT, "scenarios", "rules", "*.yaml"))
+    kwargs = dict(output_format=None, backend="stub", batch_size=4, cache_path=str(tmp_path / "responses.sqlite"))
+    runner.run_tests(scenarios=scenarios[:-1], **kwargs)
+    assert len(calls) == 1
+
+    results, _, _ = runner.run_tests(scenarios=scenarios[:-1], **kwargs)
+    assert all(result["cached"] for result in results)
+    assert len(calls) == 1
+
+    # One uncached scenario among cached ones builds the model exactly once
+    results, _, _ = runner.run_tests(scenarios=scenarios, **kwargs)
+    assert [result["cached"] for result in results].count(False) == 1
+    assert len(calls) == 2
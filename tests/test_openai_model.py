@@ -0,0 +1,136 @@
+"""
+Tests for the OpenAI-compatible backend against a local stub server
+"""
+
+import sys
+import os
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# Add the project root to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import runner
+from models.openai_model import GUIDED_FIELDS, OpenAIModel, HTTPStatusError
+
+class CompletionHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with server.lock:
+            server.requests.append(body)
+            server.in_flight += 1
+            server.peak = max(server.peak, server.in_flight)
+            fail = server.failures > 0
+            server.failures -= fail
+        time.sleep(server.delay)
+        with server.lock:
+            server.in_flight -= 1
+        if fail:
+            payload, status = b"busy", 503
+        else:
+            choices = [{"index": i, "text": f" {body['prompt']}#{i}"} for i in range(body.get("n", 1))]
+            payload = json.dumps({"choices": choices, "usage": {"prompt_tokens": 3, "completion_tokens": 2}}).encode()
+            status = 200
+        self.send_response(status)
+        if server.chunked:
+            # Two chunks, then a trailer header that must not be left on the kept-alive connection
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            half = len(payload) // 2
+            for chunk in (payload[:half], payload[half:]):
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            self.wfile.write(b"0\r\nX-Checksum: abc\r\n\r\n")
+            return
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), CompletionHandler)
+    httpd.daemon_threads = True
+    httpd.lock = threading.Lock()
+    httpd.requests, httpd.in_flight, httpd.peak, httpd.failures, httpd.delay = [], 0, 0, 0, 0.0
+    httpd.chunked = False
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+def client(server, **kwargs):
+    return OpenAIModel("stub", api_base=f"http://127.0.0.1:{server.server_address[1]}/v1", backoff=0, **kwargs)
+
+def test_batch_keeps_order_and_reuses_connections(server):
+    model = client(server, max_in_flight=4)
+    try:
+        prompts = [f"q{i}" for i in range(12)]
+        assert model.run_batch(prompts) == [f"q{i}#0" for i in range(12)]
+        assert model.run_batch(prompts[:2]) == ["q0#0", "q1#0"]
+        assert model.pool.opened <= 4 and model.pool.reused > 0
+        assert model.last_batch_stats[0]["generated_tokens"] == 2
+    finally:
+        model.close()
+
+def test_in_flight_limit(server):
+    server.delay = 0.05
+    model = client(server, max_in_flight=3)
+    try:
+        model.run_batch([f"q{i}" for i in range(9)])
+    finally:
+        model.close()
+    assert server.peak == 3
+
+def test_retries_unavailable_then_gives_up(server):
+    server.failures = 2
+    model = client(server, max_retries=2)
+    try:
+        assert model.run("q") == "q#0"
+        assert model.retries == 2
+        server.failures = 5
+        with pytest.raises(HTTPStatusError):
+            model.run("q")
+    finally:
+        model.close()
+
+def test_samples_use_n_and_bare_answers_send_a_regex(server):
+    pytest.importorskip("pydantic")
+    model = client(server, use_structured=True, constraint="bare")
+    try:
+        samples = model.sample_batch(["q"], ["numeric"], [{}], num_samples=3)
+    finally:
+        model.close()
+    assert len(samples[0]) == 3
+    request = server.requests[-1]
+    assert request["n"] == 3 and "guided_regex" in request
+
+def test_chunked_responses_with_trailers_keep_the_connection_usable(server):
+    server.chunked = True
+    model = client(server, max_in_flight=1)
+    try:
+        assert model.run_batch(["a", "b", "c"]) == ["a#0", "b#0", "c#0"]
+        assert model.pool.opened == 1 and model.pool.reused == 2
+    finally:
+        model.close()
+
+def test_llamacpp_bare_answers_send_a_gbnf_grammar(server):
+    pytest.importorskip("pydantic")
+    model = client(server, use_structured=True, constraint="bare", guided_format="llamacpp")
+    try:
+        model.run("q", "boolean")
+    finally:
+        model.close()
+    assert server.requests[-1]["grammar"] == 'root ::= ("yes" | "no")'
+
+def test_runner_guided_formats_match_backend():
+    assert sorted(runner.GUIDED_FORMATS) == sorted(GUIDED_FIELDS)
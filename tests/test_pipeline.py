@@ -0,0 +1,52 @@
+"""
+Tests for the pipelined batch executor
+"""
+
+import sys
+import os
+import threading
+
+import pytest
+
+# Add the project root to the path so we can import our modules
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import runner
+import scenario_index
+from pipeline import run_pipeline
+
+def test_stages_overlap_and_keep_order():
+    finished, threads = [], set()
+    def stage(name, fn):
+        def run(item):
+            threads.add((name, threading.current_thread().name))
+            return fn(item)
+        return run
+    run_pipeline(range(20), stage("prepare", lambda i: i * 2), stage("execute", lambda i: i + 1),
+                 stage("finish", finished.append), depth=2)
+    assert finished == [i * 2 + 1 for i in range(20)]
+    # Three stages, three different threads
+    assert len({thread for _, thread in threads}) == 3
+
+@pytest.mark.parametrize("failing", ["prepare", "execute", "finish"])
+def test_stage_errors_propagate(failing):
+    def stage(name):
+        def run(item):
+            if name == failing and item == 5:
+                raise ValueError(name)
+            return item
+        return run
+    with pytest.raises(ValueError, match=failing):
+        run_pipeline(range(50), stage("prepare"), stage("execute"), stage("finish"), depth=2)
+
+def test_pipelined_run_matches_serial(tmp_path):
+    scenarios = scenario_index.load_scenarios(os.path.join(ROOT, "scenarios"), str(tmp_path / "index.json"))
+    kwargs = dict(output_format=None, scenarios=scenarios, backend="stub", backend_options={"stub_accuracy": 0.7},
+                  cache_mode="off")
+    serial, _, total = runner.run_tests(**kwargs)
+    assert total > 0
+    pipelined, _, _ = runner.run_tests(pipeline_depth=2, results_file=str(tmp_path / "results.jsonl"), **kwargs)
+    from results_sink import iter_results
+    streamed = list(iter_results(str(tmp_path / "results.jsonl")))
+    assert [(r["id"], r["passed"]) for r in streamed] == [(r["id"], r["passed"]) for r in serial]
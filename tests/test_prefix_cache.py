@@ -0,0 +1,72 @@
+"""
+Tests for shared-prefix KV cache reuse, on tiny random CPU models
+"""
+
+import sys
+import os
+
+import pytest
+
+# Add the project root to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("transformers")
+pytest.importorskip("tokenizers")
+
+from tiny_models import tiny_hf_model, tiny_outlines_model
+
+PREAMBLE = "You are judging Magic: The Gathering rules questions. Answer briefly.\n\n"
+# Different lengths, so the padding between the cached prefix and each question differs per row
+QUESTIONS = ["Can Shock target a creature?", "How much damage does Lightning Bolt deal to a player?",
+             "Which zone does a resolved instant go to?"]
+
+def test_prefixed_batches_generate_the_same_tokens():
+    model = tiny_hf_model(PREAMBLE)
+    cache = model.prefix_cache
+    prompts = [PREAMBLE + question for question in QUESTIONS]
+    kwargs = dict(max_new_tokens=16, do_sample=False, pad_token_id=model.tokenizer.pad_token_id)
+
+    cached_inputs = cache.prepare_batch(prompts)
+    assert "past_key_values" in cached_inputs
+    cached = model.model.generate(**cached_inputs, **kwargs)[:, cached_inputs["input_ids"].shape[1]:]
+    plain_inputs = model.tokenizer(prompts, return_tensors="pt", padding=True)
+    plain = model.model.generate(**plain_inputs, **kwargs)[:, plain_inputs["input_ids"].shape[1]:]
+    assert torch.equal(cached, plain)
+
+    # The cached prefix is copied per call, so a second batch sees the same prefix
+    again = cache.prepare_batch(prompts)
+    assert torch.equal(model.model.generate(**again, **kwargs)[:, again["input_ids"].shape[1]:], plain)
+
+def test_unstructured_rows_match_without_the_prefix_cache():
+    cached = tiny_hf_model(PREAMBLE)
+    plain = tiny_hf_model(PREAMBLE, prefix_cache=False)
+    output_types = ["boolean", "numeric", "explanation"]
+    budgets = [8, 12, 24]
+    assert cached.run_batch(QUESTIONS, output_types, budgets) == plain.run_batch(QUESTIONS, output_types, budgets)
+    assert ([s["generated_tokens"] for s in cached.last_batch_stats]
+            == [s["generated_tokens"] for s in plain.last_batch_stats])
+
+    stats = cached.prefix_cache.stats()
+    # The last preamble token is re-encoded with each question, so it is never counted
+    assert stats["prefix_tokens"] == len(cached.tokenizer(PREAMBLE).input_ids) - 1
+    assert stats["hits"] == 3 and stats["misses"] == 0
+    assert cached.prefill_tokens_saved == stats["tokens_saved"] == 3 * stats["prefix_tokens"]
+
+def test_rows_without_the_prefix_fall_back_to_a_full_prefill():
+    model = tiny_hf_model(PREAMBLE)
+    inputs = model.prefix_cache.prepare_batch([PREAMBLE + QUESTIONS[0], QUESTIONS[1]])
+    assert "past_key_values" not in inputs
+    assert model.prefix_cache.stats()["misses"] == 2 and model.prefill_tokens_saved == 0
+
+def test_structured_rows_match_without_the_prefix_cache():
+    pytest.importorskip("outlines")
+    cached = tiny_outlines_model("json", prefix_cache=True)
+    plain = tiny_outlines_model("json")
+    output_types = ["boolean", "numeric", "card_selection"]
+    kwargs_list = [{}, {}, {"options": ["Shock", "Opt"]}]
+    assert (cached._run_batch_constrained(QUESTIONS, output_types, kwargs_list)
+            == plain._run_batch_constrained(QUESTIONS, output_types, kwargs_list))
+    assert ([s["generated_tokens"] for s in cached.last_batch_stats]
+            == [s["generated_tokens"] for s in plain.last_batch_stats])
+    assert cached.prefill_tokens_saved == 3 * cached.prefix_cache.stats()["prefix_tokens"] > 0
@@ -0,0 +1,42 @@
+"""
+Tests for --profile spans and trace export
+"""
+
+import sys
+import os
+import io
+import json
+
+# Add the project root to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import profiling
+import runner
+from response_cache import ResponseCache
+
+def test_spans_are_noops_when_profiling_is_off():
+    with profiling.span("anything"):
+        pass
+    assert profiling._PROFILER is None
+
+def test_run_phases_land_in_chrome_trace(tmp_path):
+    scenarios = [{"id": "t1", "prompt": "Is a Forest a land?", "expected_output": "yes", "evaluator": "boolean"}]
+    cache_path = str(tmp_path / "responses.sqlite")
+    output_types, _ = runner.batch_output_types(scenarios, False)
+    cache = ResponseCache(cache_path)
+    cache.store(zip(runner.response_cache_keys(scenarios, output_types, None, "m", "main", False), ["yes"]))
+    cache.close()
+
+    trace_path = str(tmp_path / "trace.json")
+    profiler = profiling.start_profiling("spans", trace_path)
+    try:
+        runner.run_tests("m", output_format=None, scenarios=scenarios, cache_mode="read", cache_path=cache_path)
+    finally:
+        profiling._PROFILER = None
+    profiler.stop(out=io.StringIO())
+
+    with open(trace_path) as f:
+        events = json.load(f)["traceEvents"]
+    names = {event["name"] for event in events}
+    assert {"plan_batches", "response_cache.lookup", "evaluate", "similarity"} <= names
+    assert all(event["ph"] == "X" and event["dur"] >= 0 for event in events)
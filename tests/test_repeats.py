@@ -0,0 +1,39 @@
+"""
+Tests for --repeats consistency runs
+"""
+
+import sys
+import os
+
+# Add the project root to the path so we can import our modules
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import runner
+import scenario_index
+
+def test_each_distinct_sample_is_judged_once():
+    judged = []
+    def judge(texts):
+        judged.extend(texts)
+        return [text == "yes" for text in texts]
+    assert runner.evaluate_samples(judge, ["yes", "no", "yes", "yes"]) == [True, False, True, True]
+    assert judged == ["yes", "no"]
+
+def test_distribution_and_modal_answer():
+    samples = ["3", " 4", "4", "3 ", "4"]
+    assert runner.answer_distribution(samples) == {"4": 0.6, "3": 0.4}
+    assert runner.modal_answer(samples) == " 4"
+
+def test_repeat_results_survive_the_response_cache(tmp_path):
+    scenarios = scenario_index.load_scenarios(os.path.join(ROOT, "scenarios"), str(tmp_path / "index.json"))
+    kwargs = dict(output_format=None, scenarios=scenarios, backend="stub", backend_options={"stub_accuracy": 0.6},
+                  repeats=4, cache_path=str(tmp_path / "responses.sqlite"))
+    first, _, total = runner.run_tests(**kwargs)
+    assert total > 0
+    second, _, _ = runner.run_tests(**kwargs)
+    assert all(len(result["samples"]) == 4 for result in first)
+    assert all(result["cached"] for result in second)
+    assert [r["pass_rate"] for r in first] == [r["pass_rate"] for r in second]
+    # Accuracy below 1.0 makes some scenarios disagree with themselves across samples
+    assert any(0 < result["pass_rate"] < 1 for result in first)
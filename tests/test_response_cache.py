@@ -0,0 +1,49 @@
+"""
+Tests for the persistent response cache
+"""
+
+import sys
+import os
+
+# Add the project root to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from response_cache import ResponseCache, response_key
+
+def test_key_changes_with_every_input():
+    base = dict(backend="outlines", model_name="m", revision="main", prompt="p",
+                schema=("boolean",), decoding={"max_new_tokens": 100})
+    key = response_key(**base)
+    assert key == response_key(**base)
+    for field, value in [("model_name", "m2"), ("revision", "abc"), ("prompt", "p2"),
+                         ("schema", ("numeric",)), ("decoding", {"max_new_tokens": 8})]:
+        assert response_key(**dict(base, **{field: value})) != key
+
+def test_readwrite_round_trip(tmp_path):
+    path = str(tmp_path / "responses.sqlite")
+    cache = ResponseCache(path, mode="readwrite")
+    assert cache.lookup(["a", "b"]) == {}
+    cache.store([("a", "yes")], model_name="m")
+    cache.close()
+
+    cache = ResponseCache(path, mode="read")
+    assert cache.lookup(["a", "b"]) == {"a": "yes"}
+    assert cache.stats()["hits"] == 1
+    cache.store([("b", "no")])  # read mode never writes
+    assert cache.lookup(["b"]) == {}
+
+def test_refresh_ignores_hits_but_overwrites(tmp_path):
+    path = str(tmp_path / "responses.sqlite")
+    ResponseCache(path).store([("a", "old")])
+
+    cache = ResponseCache(path, mode="refresh")
+    assert cache.lookup(["a"]) == {}
+    cache.store([("a", "new")])
+    assert ResponseCache(path, mode="read").lookup(["a"]) == {"a": "new"}
+
+def test_off_mode_touches_nothing(tmp_path):
+    path = str(tmp_path / "responses.sqlite")
+    cache = ResponseCache(path, mode="off")
+    cache.store([("a", "yes")])
+    assert cache.lookup(["a"]) == {}
+    assert not os.path.exists(path)
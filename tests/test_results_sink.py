@@ -0,0 +1,98 @@
+"""
+Tests for the streaming JSONL results file and --resume
+"""
+
+import sys
+import os
+import json
+import io
+
+# Add the project root to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import runner
+from response_cache import ResponseCache
+from results_sink import ResultsWriter, iter_results, recorded_ids, write_json_report
+
+def test_append_drops_half_written_record(tmp_path):
+    path = str(tmp_path / "results.jsonl")
+    writer = ResultsWriter(path)
+    writer.write({"id": "a", "passed": True})
+    writer.close()
+    with open(path, "a") as f:
+        f.write('{"id": "b", "pas')  # crash mid-write
+
+    writer = ResultsWriter(path, append=True)
+    writer.write({"id": "c", "passed": False})
+    writer.close()
+    assert [r["id"] for r in iter_results(path)] == ["a", "c"]
+
+def test_streamed_report_is_valid_json():
+    out = io.StringIO()
+    write_json_report({"total_tests": 2}, iter([{"id": "a"}, {"id": "b"}]), out)
+    assert json.loads(out.getvalue()) == {"summary": {"total_tests": 2}, "results": [{"id": "a"}, {"id": "b"}]}
+    out = io.StringIO()
+    write_json_report({}, iter([]), out)
+    assert json.loads(out.getvalue()) == {"summary": {}, "results": []}
+
+def test_resume_skips_recorded_scenarios(tmp_path):
+    scenarios = [
+        {"id": f"t{i}", "prompt": f"Question {i}?", "expected_output": str(i), "evaluator": "exact"}
+        for i in range(4)
+    ]
+    cache_path = str(tmp_path / "responses.sqlite")
+    output_types, _ = runner.batch_output_types(scenarios, False)
+    keys = runner.response_cache_keys(scenarios, output_types, None, "m", "main", False)
+    cache = ResponseCache(cache_path)
+    cache.store([(key, str(i)) for i, key in enumerate(keys)])
+    cache.close()
+
+    results_file = str(tmp_path / "results.jsonl")
+    run = dict(model_name="m", output_format=None, cache_mode="read", cache_path=cache_path,
+               results_file=results_file)
+    runner.run_tests(scenarios=scenarios[:2], **run)
+    assert recorded_ids(results_file) == {"t0", "t1"}
+
+    _, passed, total = runner.run_tests(scenarios=scenarios, resume=True, **run)
+    assert [r["id"] for r in iter_results(results_file)] == ["t0", "t1", "t2", "t3"]
+    assert (passed, total) == (4, 4)
+
+def test_results_file_is_read_once_for_the_summary(tmp_path, monkeypatch):
+    passes = []
+    read = runner.iter_results
+    monkeypatch.setattr(runner, "iter_results", lambda path: passes.append(path) or read(path))
+    scenarios = [{"id": f"t{i}", "prompt": f"Question {i}?", "expected_output": str(i), "evaluator": "exact"}
+                 for i in range(4)]
+    _, passed, total = runner.run_tests(output_format="simple", scenarios=scenarios, backend="stub", cache_mode="off",
+                                        results_file=str(tmp_path / "results.jsonl"))
+    assert (passed, total) == (4, 4)
+    assert len(passes) == 1
+
+def test_summary_aggregates_latency_and_memory():
+    from results_sink import summarize_results
+    results = [
+        {"passed": True, "prompt_tokens": 10, "generated_tokens": 2, "latency_seconds": 0.1,
+         "ttft_seconds": 0.05, "batch_peak_rss_mb": 100.0},
+        {"passed": False, "prompt_tokens": 20, "generated_tokens": 4, "latency_seconds": 0.3,
+         "ttft_seconds": 0.15, "batch_peak_rss_mb": 150.0},
+        {"passed": True, "cached": True},
+    ]
+    counts = summarize_results(results)
+    assert (counts["total"], counts["passed"], counts["prompt_tokens"]) == (3, 2, 30)
+    assert counts["latency"]["measured"] == 2
+    assert abs(counts["latency"]["mean_ttft_seconds"] - 0.1) < 1e-9
+    assert counts["peak_rss_mb"] == 150.0 and counts["peak_accelerator_mb"] is None
+
+def test_summary_reports_draft_acceptance_per_output_type():
+    from results_sink import summarize_results
+    results = [
+        {"passed": True, "output_type": "explanation", "generated_tokens": 60, "draft_tokens": 50,
+         "accepted_draft_tokens": 40, "target_steps": 20},
+        {"passed": True, "output_type": "explanation", "generated_tokens": 20, "draft_tokens": 30,
+         "accepted_draft_tokens": 0, "target_steps": 20},
+        {"passed": True, "output_type": "boolean", "generated_tokens": 2},
+    ]
+    assisted = summarize_results(results)["assisted"]
+    assert list(assisted) == ["explanation"]
+    assert assisted["explanation"]["acceptance_rate"] == 0.5
+    assert assisted["explanation"]["step_speedup"] == 2.0
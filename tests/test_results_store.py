@@ -0,0 +1,107 @@
+"""
+Tests for the SQLite results history and its queries
+"""
+
+import sys
+import os
+import shutil
+
+import pytest
+
+# Add the project root to the path so we can import our modules
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import runner
+import scenario_index
+from watch import ScenarioWatcher
+from results_sink import _percentile
+from results_store import ResultsStore
+
+def results(passing, latency=0.1):
+    """Two rules scenarios and one combat scenario; ``passing`` lists the ids that pass"""
+    rows = [("rules_1", "rules", "exact"), ("rules_2", "rules", "boolean"), ("combat_1", "combat", "numeric")]
+    return [{"id": scenario_id, "category": category, "subcategory": "x", "evaluator": evaluator,
+             "output_type": "free_text", "passed": scenario_id in passing, "actual_output": "1",
+             "latency_seconds": latency * (i + 1)} for i, (scenario_id, category, evaluator) in enumerate(rows)]
+
+@pytest.fixture
+def store(tmp_path):
+    store = ResultsStore(str(tmp_path / "results.sqlite"))
+    yield store
+    store.close()
+
+def test_pass_rates_and_delta(store):
+    run_a = store.record_run(results({"rules_1", "combat_1"}), "a", started_at=1.0)
+    run_b = store.record_run(results({"rules_1", "rules_2"}), "b", started_at=2.0)
+    assert store.select_runs() == [run_b] and store.select_runs("a") == [run_a]
+    assert store.runs()[1]["total"] == 3 and store.runs()[1]["passed"] == 2
+
+    rates = {row["category"]: row["pass_rate"] for row in store.pass_rates([run_a])}
+    assert rates == {"combat": 1.0, "rules": 0.5}
+    by_evaluator = store.pass_rates([run_a, run_b], by="evaluator")
+    assert [(row["evaluator"], row["passed"], row["total"]) for row in by_evaluator] == [
+        ("boolean", 1, 2), ("exact", 2, 2), ("numeric", 1, 2)]
+    with pytest.raises(ValueError):
+        store.pass_rates([run_a], by="prompt; DROP TABLE runs")
+
+    delta = store.delta(run_a, run_b)
+    assert delta["fixed"] == ["rules_2"] and delta["regressed"] == ["combat_1"]
+    assert {row["category"]: row["delta"] for row in delta["groups"]} == {"combat": -1.0, "rules": 0.5}
+
+def test_flaky_counts_runs_per_model(store):
+    store.record_run(results({"rules_1", "rules_2"}), "a")
+    store.record_run(results({"rules_1"}), "a")
+    store.record_run(results({"rules_1"}), "a")
+    # The same scenario failing for another model is not flakiness
+    store.record_run(results(set()), "b")
+    flaky = store.flaky()
+    assert [(row["model"], row["scenario_id"], row["passes"], row["runs"]) for row in flaky] == [("a", "rules_2", 1, 3)]
+    assert flaky[0]["last_passed"] is False
+    assert store.flaky(min_runs=4) == []
+
+def test_latency_percentiles_match_run_summary(store):
+    first = store.record_run(results(set(), latency=0.1), "a")
+    second = store.record_run(results(set(), latency=1.0), "a")
+    values = [0.1, 0.2, 0.30000000000000004, 1.0, 2.0, 3.0]
+    overall = store.latency([first, second])[0]
+    assert overall["measured"] == 6
+    assert overall["p50_seconds"] == pytest.approx(_percentile(values, 0.5))
+    assert overall["p95_seconds"] == pytest.approx(_percentile(values, 0.95))
+    by_category = {row["category"]: row for row in store.latency([first, second], by="category")}
+    assert by_category["combat"]["measured"] == 2 and by_category["combat"]["p99_seconds"] == pytest.approx(3.0)
+    assert by_category["rules"]["p50_seconds"] == pytest.approx(_percentile([0.1, 0.2, 1.0, 2.0], 0.5))
+
+def test_runs_are_recorded(tmp_path):
+    path = str(tmp_path / "results.sqlite")
+    scenarios = scenario_index.load_scenarios(os.path.join(ROOT, "scenarios"), str(tmp_path / "index.json"))
+    kwargs = dict(scenarios=scenarios, backend="stub", cache_path=str(tmp_path / "responses.sqlite"),
+                  output_format=None, store_path=path, backend_options={"stub_accuracy": 0.7})
+    _, passed, total = runner.run_tests(**kwargs)
+    assert 0 < passed < total
+    runner.run_tests(sample=10, **kwargs)
+    store = ResultsStore(path)
+    try:
+        latest, full = store.runs()
+        assert (full["total"], full["passed"], full["backend"], full["sampled"]) == (total, passed, "stub", 0)
+        assert latest["total"] == 10 and latest["sampled"] == 1
+        assert sum(row["total"] for row in store.pass_rates([full["run_id"]])) == total
+    finally:
+        store.close()
+
+def test_watch_records_only_its_initial_run(tmp_path):
+    corpus = tmp_path / "scenarios"
+    corpus.mkdir()
+    rules = os.path.join(ROOT, "scenarios", "rules")
+    for name in sorted(os.listdir(rules))[:2]:
+        shutil.copy(os.path.join(rules, name), corpus)
+    path = str(tmp_path / "results.sqlite")
+    watcher = ScenarioWatcher(str(corpus / "*.yaml"), dict(backend="stub", cache_mode="off"))
+    watcher.start(output_format=None, store_path=path)
+    shutil.copy(os.path.join(rules, sorted(os.listdir(rules))[2]), corpus)
+    assert len(watcher.poll()) == 1
+    store = ResultsStore(path)
+    try:
+        assert [run["total"] for run in store.runs()] == [2]
+    finally:
+        store.close()
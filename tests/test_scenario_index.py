@@ -0,0 +1,75 @@
+"""
+Tests for the compiled scenario index
+"""
+
+import sys
+import os
+
+# Add the project root to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scenario_index
+
+BOOLEAN_SCENARIO = """id: card_types_001
+category: rules
+subcategory: card_types
+prompt: "Can Dispel be used to counter a Sorcery card?"
+expected_output: "no"
+evaluator: boolean
+"""
+
+DRAFT_SCENARIO = """id: pick_decision_001
+category: draft
+subcategory: pick_decision
+prompt: "What is the best pick given a choice between a Millstone, a Serra Angel, and a Llanowar Elves?"
+expected_output: "Llanowar Elves"
+evaluator: exact
+"""
+
+def write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+
+def test_index_precomputes_output_types(tmp_path):
+    root = tmp_path / "scenarios"
+    write(root / "rules" / "a.yaml", BOOLEAN_SCENARIO)
+    write(root / "draft" / "b.yaml", DRAFT_SCENARIO)
+
+    scenarios = scenario_index.load_scenarios(str(root), str(tmp_path / "index.json"))
+    by_id = {s["id"]: s for s in scenarios}
+    assert by_id["card_types_001"]["_output_type"] == "boolean"
+    assert by_id["pick_decision_001"]["_output_type"] == "card_selection"
+    assert by_id["pick_decision_001"]["_output_kwargs"] == {
+        "options": ["Millstone", "Serra Angel", "Llanowar Elves"]
+    }
+
+def test_incremental_rebuild_only_parses_changed_files(tmp_path):
+    root = tmp_path / "scenarios"
+    index_path = str(tmp_path / "index.json")
+    write(root / "a.yaml", BOOLEAN_SCENARIO)
+    write(root / "b.yaml", DRAFT_SCENARIO)
+    assert scenario_index.build_index(str(root), index_path)["stats"]["parsed"] == 2
+
+    stats = scenario_index.build_index(str(root), index_path)["stats"]
+    assert stats == {"reused": 2, "rehashed": 0, "parsed": 0, "removed": 0}
+
+    write(root / "a.yaml", BOOLEAN_SCENARIO.replace('"no"', '"yes"'))
+    (root / "b.yaml").unlink()
+    stats = scenario_index.build_index(str(root), index_path)["stats"]
+    assert stats["parsed"] == 1
+    assert stats["removed"] == 1
+
+def test_invalid_files_are_reported_and_skipped(tmp_path):
+    root = tmp_path / "scenarios"
+    write(root / "good.yaml", BOOLEAN_SCENARIO)
+    write(root / "missing.yaml", "id: broken\nprompt: hi\n")
+    write(root / "garbage.yaml", "id: [unclosed\n")
+
+    index = scenario_index.build_index(str(root), str(tmp_path / "index.json"))
+    errors = {os.path.basename(p): e["errors"] for p, e in index["entries"].items()}
+    assert errors["good.yaml"] == []
+    assert any("expected_output" in err for err in errors["missing.yaml"])
+    assert errors["garbage.yaml"][0].startswith("invalid YAML")
+
+    scenarios = scenario_index.load_scenarios(str(root), str(tmp_path / "index.json"))
+    assert [s["id"] for s in scenarios] == ["card_types_001"]
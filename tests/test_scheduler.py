@@ -0,0 +1,56 @@
+"""
+Tests for length-bucketed batch scheduling
+"""
+
+import sys
+import os
+
+# Add the project root to the path so we can import our modules
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from scheduler import bucketed_batches, sequential_batches, padding_stats, ReorderBuffer
+
+def test_bucketing_groups_by_key_and_reduces_padding():
+    lengths = [100, 5, 90, 6, 95, 4]
+    keys = ["explanation", "boolean"] * 3
+    bucketed = bucketed_batches(lengths, keys, batch_size=3)
+    assert sorted(map(sorted, bucketed)) == [[0, 2, 4], [1, 3, 5]]
+    assert (padding_stats(bucketed, lengths)["padding_ratio"]
+            < padding_stats(sequential_batches(6, 3), lengths)["padding_ratio"])
+
+def test_token_budget_caps_padded_batch_size():
+    lengths = [10, 10, 10, 40, 40]
+    batches = bucketed_batches(lengths, ["x"] * 5, batch_size=10, max_batch_tokens=80)
+    for batch in batches:
+        assert len(batch) * max(lengths[i] for i in batch) <= 80
+    assert sorted(i for batch in batches for i in batch) == list(range(5))
+
+def test_schemas_of_one_output_type_share_batches():
+    import runner
+    scenarios = [{"id": f"pick_{i}", "prompt": f"Which card do you take, choosing between {a} and {b}?",
+                  "expected_output": a, "evaluator": "exact", "output_type": "card_selection", "options": [a, b]}
+                 for i, (a, b) in enumerate([("Shock", "Opt"), ("Counterspell", "Opt"), ("Shock", "Giant Growth")])]
+    output_types, kwargs_list = runner.batch_output_types(scenarios, True)
+    assert len({tuple(kwargs["options"]) for kwargs in kwargs_list}) == 3
+    assert runner.plan_batches(scenarios, output_types, kwargs_list, True, 8) == [[0, 1, 2]]
+
+def test_reorder_buffer_releases_in_index_order():
+    buffer = ReorderBuffer()
+    assert buffer.add(2, "c") == []
+    assert buffer.add(0, "a") == [(0, "a")]
+    assert buffer.add(1, "b") == [(1, "b"), (2, "c")]
+
+def test_token_budget_without_a_local_model_uses_the_estimate(monkeypatch, tmp_path):
+    import runner
+    import scenario_index
+
+    def no_tokenizer(*args, **kwargs):
+        raise AssertionError("the stub backend has no tokenizer to load")
+
+    monkeypatch.setattr(runner, "tokenizer_length_fn", no_tokenizer)
+    scenarios = scenario_index.load_scenarios(os.path.join(ROOT, "scenarios"), str(tmp_path / "index.json"))
+    for schedule in ("bucketed", "sequential"):
+        _, passed, total = runner.run_tests(scenarios=scenarios, backend="stub", cache_mode="off", output_format=None,
+                                            max_batch_tokens=100, schedule=schedule)
+        assert passed == total > 0
@@ -0,0 +1,74 @@
+"""
+Tests for the compiled-schema cache
+"""
+
+import sys
+import os
+
+import pytest
+
+# Add the project root to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.schema_cache import SchemaCache, schema_key
+from tiny_models import tiny_outlines_model
+
+def test_schema_key_normalizes_option_order():
+    a = schema_key("card_selection", {"options": ["Serra Angel", "Millstone"]})
+    b = schema_key("card_selection", {"options": ["Millstone", "Serra Angel"]})
+    assert a == b
+    assert schema_key("numeric_range", {"min_val": 0, "max_val": 6}) == ("numeric_range", 0, 6)
+    assert schema_key("boolean", {}) == ("boolean",)
+
+def test_lru_eviction_and_counters():
+    cache = SchemaCache(max_size=2)
+    compiled = []
+
+    def compile_fn(name):
+        def fn():
+            compiled.append(name)
+            return name
+        return fn
+
+    cache.get_or_compile(("a",), compile_fn("a"))
+    cache.get_or_compile(("b",), compile_fn("b"))
+    cache.get_or_compile(("a",), compile_fn("a"))
+    cache.get_or_compile(("c",), compile_fn("c"))  # evicts "b", the least recently used
+    cache.get_or_compile(("b",), compile_fn("b"))
+
+    assert compiled == ["a", "b", "c", "b"]
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 4
+    assert stats["evictions"] == 2
+
+@pytest.mark.parametrize("constraint", ["bare", "json"])
+def test_compiled_generators_round_trip_through_disk(tmp_path, constraint):
+    for module in ("torch", "transformers", "tokenizers", "outlines"):
+        pytest.importorskip(module)
+    from models import schema_cache
+
+    model = tiny_outlines_model(constraint)
+    full_prompt, schema = model._prepare("Is it?", "boolean", {})
+    first = SchemaCache(persist_dir=str(tmp_path))
+    second = SchemaCache(persist_dir=str(tmp_path))
+    try:
+        schema_cache._SCHEMA_CACHE = first
+        compiled = model._get_generator("boolean", {}, schema)
+        assert first.stats()["misses"] == 1 and len(os.listdir(tmp_path)) == 1
+
+        schema_cache._SCHEMA_CACHE = second
+        loaded = model._get_generator("boolean", {}, schema)
+    finally:
+        schema_cache._SCHEMA_CACHE = SchemaCache()
+    assert second.stats()["disk_hits"] == 1 and second.stats()["misses"] == 0
+    assert loaded is not compiled
+    assert loaded(full_prompt, max_new_tokens=8) == compiled(full_prompt, max_new_tokens=8)
+
+def test_schema_keys_depend_on_the_vocabulary():
+    pytest.importorskip("outlines")
+    model = tiny_outlines_model("bare")
+    key = model._schema_cache_key("boolean", {})
+    model.tokenizer.add_tokens(["<extra>"])
+    model._vocabulary_digest = None
+    assert model._schema_cache_key("boolean", {}) != key
@@ -0,0 +1,41 @@
+"""
+Tests for closed answer sets used by log-likelihood scoring
+"""
+
+import sys
+import os
+import json
+
+import pytest
+
+# Add the project root to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import runner
+from output_types import answer_candidates, MAX_SCORED_RANGE
+from response_cache import ResponseCache
+
+def test_answer_candidates():
+    assert answer_candidates("boolean", {}) == ["yes", "no"]
+    assert answer_candidates("card_selection", {"options": ["Shock", "Opt"]}) == ["Shock", "Opt"]
+    assert answer_candidates("numeric_range", {"min_val": 0, "max_val": 3}) == ["0", "1", "2", "3"]
+    assert answer_candidates("numeric_range", {"min_val": 0, "max_val": MAX_SCORED_RANGE}) is None
+    assert answer_candidates("card_selection", {}) is None
+    assert answer_candidates("explanation", {}) is None
+
+def test_cached_scores_keep_their_confidence(tmp_path):
+    pytest.importorskip("pydantic")  # structured prompts pull in the schema registry
+    scenarios = [{"id": "b1", "prompt": "Is a Forest a land?", "expected_output": "yes",
+                  "evaluator": "boolean", "output_type": "boolean"}]
+    cache_path = str(tmp_path / "responses.sqlite")
+    output_types, kwargs_list = runner.batch_output_types(scenarios, True)
+    keys = runner.response_cache_keys(scenarios, output_types, kwargs_list, "m", "main", True, scoring=True)
+    cache = ResponseCache(cache_path)
+    cache.store([(keys[0], json.dumps({"answer": "yes", "confidence": 0.9,
+                                       "distribution": {"yes": 0.9, "no": 0.1}}))])
+    cache.close()
+
+    results, _ = runner.evaluate_batches("m", scenarios, [[0]], use_structured=True, cache_mode="read",
+                                         cache_path=cache_path, scoring=True)
+    assert results[0]["actual_output"] == "yes" and results[0]["passed"]
+    assert results[0]["confidence"] == 0.9
@@ -0,0 +1,48 @@
+"""
+Tests for the embedding semantic evaluator's vector cache and batch scoring
+"""
+
+import sys
+import os
+
+import pytest
+
+# Add the project root to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+np = pytest.importorskip("numpy")
+
+from semantic_embeddings import EmbeddingEvaluator, VectorCache
+
+def letter_counts(texts):
+    """Tiny deterministic encoder: letter frequency vectors"""
+    return [[text.lower().count(chr(ord("a") + i)) + 0.01 for i in range(26)] for text in texts]
+
+def test_expected_vectors_are_cached_across_evaluators(tmp_path):
+    expected = ["the stack resolves last in first out", "trample assigns excess damage"]
+    first = EmbeddingEvaluator(cache_dir=str(tmp_path), encode=letter_counts)
+    first.prepare(expected)
+    assert first.encoded == 2
+
+    second = EmbeddingEvaluator(cache_dir=str(tmp_path), encode=letter_counts)
+    vectors = second.expected_vectors(expected + expected[:1])
+    assert second.encoded == 0
+    assert vectors.shape == (3, 26)
+    assert np.allclose(vectors[0], vectors[2])
+
+def test_scores_are_cosine_similarities(tmp_path):
+    evaluator = EmbeddingEvaluator(cache_dir=str(tmp_path), encode=letter_counts)
+    scores = evaluator.scores(['{"explanation": "first in last out"}', "zzz"],
+                              ["last in first out", "last in first out"])
+    assert scores[0] == pytest.approx(1.0)
+    assert scores[1] < 0.5
+
+def test_interrupted_append_is_trimmed(tmp_path):
+    cache = VectorCache(str(tmp_path), "encoder")
+    cache.add(["a"], np.ones((1, 4)))
+    # Simulate a crash after writing rows but before updating the index
+    with open(cache.data_path, "ab") as f:
+        f.write(b"\0" * 8)
+    cache = VectorCache(str(tmp_path), "encoder")
+    cache.add(["b"], np.full((1, 4), 2.0))
+    assert cache.get(["a", "b"]).tolist() == [[1.0] * 4, [2.0] * 4]
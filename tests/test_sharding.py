@@ -0,0 +1,74 @@
+"""
+Tests for sharded multi-process evaluation
+"""
+
+import sys
+import os
+
+import pytest
+
+# Add the project root to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import runner
+from response_cache import ResponseCache
+from results_sink import recorded_ids
+from sharding import split_batches, run_sharded, _merge_stats
+
+def test_split_balances_padded_work():
+    lengths = [50, 50, 10, 10, 10, 10]
+    shards = split_batches([[0, 1], [2, 3], [4, 5]], lengths, 2)
+    assert sorted(map(sorted, shards)) == [[[0, 1]], [[2, 3], [4, 5]]]
+    assert split_batches([[0]], lengths, 4) == [[[0]]]
+
+def test_shards_merge_back_in_corpus_order(tmp_path):
+    scenarios = [
+        {"id": f"t{i}", "prompt": f"Question {i}?", "expected_output": str(i), "evaluator": "exact"}
+        for i in range(6)
+    ]
+    # Seed the response cache so the workers never need to load weights
+    cache_path = str(tmp_path / "responses.sqlite")
+    output_types, _ = runner.batch_output_types(scenarios, False)
+    keys = runner.response_cache_keys(scenarios, output_types, None, "tiny", "main", False)
+    cache = ResponseCache(cache_path)
+    cache.store([(key, str(i)) for i, key in enumerate(keys)])
+    cache.close()
+
+    results, stats = run_sharded("tiny", scenarios, [[0, 3], [1, 4], [2, 5]],
+                                 {"cache_mode": "read", "cache_path": cache_path}, workers=2)
+    assert [r["id"] for r in results] == [s["id"] for s in scenarios]
+    assert all(r["passed"] for r in results)
+    assert stats["response_cache"]["hits"] == 6
+
+def test_merged_stats_sum_counters_only():
+    shard = lambda hits, load, size: {
+        "response_cache": {"mode": "readwrite", "hits": hits, "misses": 1, "writes": 1},
+        "prefill_tokens_saved": 100, "model_load_seconds": load, "generation_seconds": load * 2,
+        "schema_cache": {"size": size, "max_size": 64, "hits": hits, "compile_seconds": 0.5},
+    }
+    merged = _merge_stats([shard(2, 3.0, 4), shard(5, 4.0, 6)])
+    assert merged["response_cache"] == {"mode": "readwrite", "hits": 7, "misses": 2, "writes": 2}
+    assert merged["prefill_tokens_saved"] == 200
+    # Shards load and generate side by side, so the run takes as long as the slowest
+    assert merged["model_load_seconds"] == 4.0 and merged["generation_seconds"] == 8.0
+    assert merged["schema_cache"] == {"size": 6, "max_size": 64, "hits": 7, "compile_seconds": 0.5}
+
+def test_finished_shards_reach_the_results_file_before_a_failure(tmp_path, monkeypatch):
+    scenarios = [
+        {"id": f"t{i}", "prompt": f"Question {i}?", "expected_output": str(i), "evaluator": "exact"}
+        for i in range(3)
+    ]
+    cache_path = str(tmp_path / "responses.sqlite")
+    output_types, _ = runner.batch_output_types(scenarios, False)
+    keys = runner.response_cache_keys(scenarios, output_types, None, "tiny", "main", False)
+    cache = ResponseCache(cache_path)
+    cache.store([(key, str(i)) for i, key in enumerate(keys[:2])])
+    cache.close()
+
+    # The uncached scenario's shard has to load a model, which fails offline
+    monkeypatch.setenv("HF_HUB_OFFLINE", "1")
+    results_file = str(tmp_path / "results.jsonl")
+    with pytest.raises(RuntimeError):
+        runner.run_tests("tiny", output_format=None, scenarios=scenarios, batches=[[0, 1], [2]], workers=2,
+                         shard_retries=0, cache_mode="read", cache_path=cache_path, results_file=results_file)
+    assert recorded_ids(results_file) == {"t0", "t1"}
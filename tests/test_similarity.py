@@ -0,0 +1,47 @@
+"""
+Tests for the similarity engine and --similarity modes
+"""
+
+import sys
+import os
+import difflib
+import random
+
+# Add the project root to the path so we can import our modules
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import runner
+import similarity
+
+def random_pairs(count=300):
+    rng = random.Random(1)
+    words = "the creature blocks damage trample stack resolves first".split()
+    pairs = []
+    for _ in range(count):
+        expected = " ".join(rng.choice(words) for _ in range(rng.randint(1, 30)))
+        output = expected if rng.random() < 0.2 else " ".join(rng.choice(words) for _ in range(rng.randint(1, 30)))
+        pairs.append((output, expected))
+    return pairs
+
+def test_threshold_short_circuit_agrees_with_full_ratio():
+    for output, expected in random_pairs():
+        for threshold in (0.3, 0.5, 0.8):
+            full = difflib.SequenceMatcher(None, output, expected).ratio() > threshold
+            assert similarity.exceeds(output, expected, threshold) == full
+
+def test_batch_ratios_match_per_pair_ratios():
+    pairs = random_pairs()
+    # Repeat pairs so grouping by expected answer is exercised
+    pairs += pairs[:50]
+    expected = [difflib.SequenceMatcher(None, a, b).ratio() for a, b in pairs]
+    assert similarity.batch_ratios(pairs) == expected
+
+def test_similarity_modes_skip_rows():
+    scenarios = runner.load_scenarios(os.path.join(ROOT, "scenarios", "**", "*.yaml"))
+    assert scenarios
+    outputs = [scenario["expected_output"] for scenario in scenarios]
+    assert runner.batch_similarity(outputs, scenarios, "all") == [1.0] * len(scenarios)
+    assert runner.batch_similarity(outputs, scenarios, "off") == [None] * len(scenarios)
+    semantic = runner.batch_similarity(outputs, scenarios, "semantic")
+    assert [s is not None for s in semantic] == [scenario["evaluator"] == "semantic" for scenario in scenarios]
@@ -0,0 +1,75 @@
+"""
+Tests for stratified --sample runs and their confidence intervals
+"""
+
+import sys
+import os
+import json
+from collections import Counter
+
+import pytest
+
+# Add the project root to the path so we can import our modules
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import runner
+import scenario_index
+from stratified import StratifiedSample, stratified_order, stratum_of, sample_size, wilson_interval
+
+def corpus():
+    sizes = {"a": 12, "b": 6, "c": 2}
+    return [{"id": f"{name}_{i}", "category": "rules", "subcategory": name, "evaluator": "exact"}
+            for name, size in sizes.items() for i in range(size)]
+
+def test_wilson_interval():
+    assert wilson_interval(0, 0) == (None, None)
+    low, high = wilson_interval(10, 10)
+    assert 0.69 < low < 0.73 and high == pytest.approx(1.0)
+    low, high = wilson_interval(5, 10)
+    assert low == pytest.approx(1 - high)
+
+def test_every_prefix_is_proportional():
+    scenarios = corpus()
+    order = stratified_order(scenarios, seed=3)
+    assert sorted(s["id"] for s in order) == sorted(s["id"] for s in scenarios)
+    assert order == stratified_order(scenarios, seed=3)
+    # Every stratum is covered first
+    assert len({stratum_of(s) for s in order[:3]}) == 3
+    counts = Counter(stratum_of(s) for s in order[:10])
+    assert counts["rules/a/exact"] == 6 and counts["rules/b/exact"] == 3 and counts["rules/c/exact"] == 1
+    assert sample_size(0.25, 20) == 5 and sample_size(50, 20) == 20
+
+def test_overall_estimate_weights_by_population():
+    sample = StratifiedSample(corpus())
+    for result in [{"passed": True, "subcategory": "a"}] * 2 + [{"passed": False, "subcategory": "b"}] * 2:
+        sample.record(dict(result, category="rules", evaluator="exact"))
+    summary = sample.summary()
+    assert summary["overall"]["estimate"] == pytest.approx(12 / 18)
+    assert summary["sampled"] == 4 and summary["unsampled_strata"] == 1
+    assert summary["strata"]["rules/c/exact"]["pass_rate"] is None
+    overall = summary["overall"]
+    assert overall["ci_low"] < overall["estimate"] < overall["ci_high"]
+
+def test_fixed_and_adaptive_sample_runs(capsys, tmp_path):
+    scenarios = scenario_index.load_scenarios(os.path.join(ROOT, "scenarios"), str(tmp_path / "index.json"))
+    kwargs = dict(scenarios=scenarios, backend="stub", cache_mode="off", backend_options={"stub_accuracy": 0.8})
+    full, _, total = runner.run_tests(output_format=None, **kwargs)
+    assert total > 12
+    capsys.readouterr()
+    results, _, total = runner.run_tests(output_format="json", sample=12, **kwargs)
+    sampling = json.loads(capsys.readouterr().out)["summary"]["sampling"]
+    assert len(results) == total == 12
+    assert sampling["sampled"] == 12 and sampling["population"] == len(full)
+
+    results, _, _ = runner.run_tests(output_format=None, sample=8, target_width=0.3, sample_step=8, **kwargs)
+    assert len(results) % 8 == 0 or len(results) == len(full)
+    def width(results):
+        sampler = StratifiedSample(full)
+        for result in results:
+            sampler.record(result)
+        return sampler.overall()["width"]
+    assert width(results) <= 0.3 or len(results) == len(full)
+    # Stopped at the first slice that was narrow enough
+    if len(results) > 8:
+        assert width(results[:-8]) > 0.3
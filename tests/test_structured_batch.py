@@ -0,0 +1,56 @@
+"""
+Tests for batched structured generation with a different schema per row, on a tiny random CPU model
+"""
+
+import sys
+import os
+
+import pytest
+
+# Add the project root to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+for module in ("torch", "transformers", "tokenizers", "outlines"):
+    pytest.importorskip(module)
+
+from models.schema_cache import get_schema_cache
+from tiny_models import tiny_outlines_model
+
+# Mixed schemas, with two rows sharing the boolean schema and differently long prompts
+ROWS = [
+    ("Can Shock target a creature?", "boolean", {}),
+    ("How much damage does Lightning Bolt deal?", "numeric", {}),
+    ("Which card do you pick?", "card_selection", {"options": ["Shock", "Opt", "Counterspell"]}),
+    ("Does a resolved instant go to the graveyard?", "boolean", {}),
+    ("How many cards are in an opening hand?", "numeric_range", {"min_val": 0, "max_val": 7}),
+]
+
+@pytest.mark.parametrize("constraint", ["json", "bare"])
+def test_mixed_schema_batch_matches_per_row_generation(constraint):
+    get_schema_cache().clear()
+    model = tiny_outlines_model(constraint)
+    prompts, output_types, kwargs_list = (list(column) for column in zip(*ROWS))
+
+    batched = model._run_batch_constrained(prompts, output_types, kwargs_list)
+    batched_tokens = [stats["generated_tokens"] for stats in model.last_batch_stats]
+    per_row = []
+    per_row_tokens = []
+    for row in ROWS:
+        per_row += model._run_batch_constrained(*([value] for value in row))
+        per_row_tokens.append(model.last_batch_stats[0]["generated_tokens"])
+    assert batched == per_row
+    assert batched_tokens == per_row_tokens
+    # Every distinct schema was compiled once and reused by the per-row calls
+    assert get_schema_cache().stats()["misses"] == 4
+
+def test_cached_processors_are_reset_between_batches():
+    get_schema_cache().clear()
+    model = tiny_outlines_model("json")
+    prompts, output_types, kwargs_list = (list(column) for column in zip(*ROWS))
+    first = model._run_batch_constrained(prompts, output_types, kwargs_list)
+    # The same processors, now driving other rows of a differently shaped batch
+    reordered = model._run_batch_constrained(prompts[::-1], output_types[::-1], kwargs_list[::-1])
+    again = model._run_batch_constrained(prompts, output_types, kwargs_list)
+    assert reordered == first[::-1]
+    assert again == first
+    assert get_schema_cache().stats()["misses"] == 4 and get_schema_cache().stats()["hits"] == 3 * len(ROWS) - 4
@@ -0,0 +1,47 @@
+"""
+Tests for the deterministic stub backend
+"""
+
+import sys
+import os
+
+# Add the project root to the path so we can import our modules
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import runner
+from models.stub_model import StubModel
+
+def test_stub_answers_every_scenario_at_full_accuracy():
+    scenarios = runner.load_scenarios(os.path.join(ROOT, "scenarios", "**", "*.yaml"))
+    results, passed, total = runner.run_tests(output_format=None, scenarios=scenarios, cache_mode="off", backend="stub")
+    assert total == len(scenarios) > 0
+    assert passed == total
+
+def test_stub_accuracy_is_deterministic():
+    scenarios = [{"prompt": f"prompt {i}", "expected_output": str(i)} for i in range(200)]
+    prompts = [s["prompt"] for s in scenarios]
+    first = StubModel.from_scenarios(scenarios, accuracy=0.5).run_batch(prompts)
+    second = StubModel.from_scenarios(scenarios, accuracy=0.5).run_batch(prompts)
+    assert first == second
+    correct = sum(output == s["expected_output"] for output, s in zip(first, scenarios))
+    assert 70 < correct < 130
+
+def test_stub_cache_keys_are_namespaced():
+    scenarios = runner.load_scenarios(os.path.join(ROOT, "scenarios", "**", "*.yaml"))[:2]
+    assert len(scenarios) == 2
+    output_types, kwargs_list = runner.batch_output_types(scenarios, False)
+    hf_keys = runner.response_cache_keys(scenarios, output_types, kwargs_list, "m", None, False)
+    stub_keys = runner.response_cache_keys(scenarios, output_types, kwargs_list, "m", None, False, backend="stub")
+    assert not set(hf_keys) & set(stub_keys)
+
+def test_stub_accuracy_is_part_of_the_cache_key(tmp_path):
+    scenarios = runner.load_scenarios(os.path.join(ROOT, "scenarios", "rules", "*.yaml"))
+    kwargs = dict(output_format=None, scenarios=scenarios, backend="stub", cache_path=str(tmp_path / "responses.sqlite"))
+    _, passed, total = runner.run_tests(backend_options={"stub_accuracy": 1.0}, **kwargs)
+    assert passed == total
+    _, passed, total = runner.run_tests(backend_options={"stub_accuracy": 0.0}, **kwargs)
+    assert passed < total
+    # Simulated latency does not change the answers, so it still hits the cache
+    results, _, _ = runner.run_tests(backend_options={"stub_accuracy": 0.0, "stub_latency": 0.01}, **kwargs)
+    assert all(result["cached"] for result in results)
@@ -0,0 +1,62 @@
+"""
+Tiny random CPU models for tests that need real generation, built offline in milliseconds
+"""
+
+import string
+
+def tiny_tokenizer():
+    """A character-level tokenizer over the printable characters, with <eos> doubling as padding"""
+    from tokenizers import Tokenizer, decoders, models, pre_tokenizers
+    from transformers import PreTrainedTokenizerFast
+
+    vocab = {c: i for i, c in enumerate(c for c in string.printable if c not in "\x0b\x0c\r")}
+    vocab["<eos>"] = len(vocab)
+    tokenizer = Tokenizer(models.WordLevel(vocab, unk_token=" "))
+    tokenizer.pre_tokenizer = pre_tokenizers.Split("", "isolated")
+    tokenizer.decoder = decoders.Fuse()
+    return PreTrainedTokenizerFast(tokenizer_object=tokenizer, eos_token="<eos>", pad_token="<eos>")
+
+def tiny_gpt2(tokenizer, seed=0):
+    """A one-layer random GPT-2 over the tokenizer's vocabulary"""
+    import torch
+    from transformers import GPT2Config, GPT2LMHeadModel
+
+    torch.manual_seed(seed)
+    vocab_size = len(tokenizer)
+    # Wide initial weights make the next token depend on the context, so mix-ups show in the output
+    config = GPT2Config(vocab_size=vocab_size, n_positions=2048, n_embd=32, n_layer=1, n_head=2, initializer_range=0.5,
+                        bos_token_id=tokenizer.eos_token_id, eos_token_id=tokenizer.eos_token_id,
+                        pad_token_id=tokenizer.pad_token_id)
+    return GPT2LMHeadModel(config).eval()
+
+def tiny_outlines_model(constraint="json", prefix_cache=False):
+    """An OutlinesModel around a tiny random GPT-2, optionally with the shared-prefix cache"""
+    import outlines
+    from models.outlines_model import OutlinesModel
+    from models.prefix_cache import PrefixCache
+    from models.prompting import SHARED_PREFIX
+
+    model = OutlinesModel.__new__(OutlinesModel)
+    model.model_name, model.revision, model.constraint = "tiny-gpt2", "main", constraint
+    model.tokenizer = tiny_tokenizer()
+    model.model = tiny_gpt2(model.tokenizer)
+    model.outlines_model = outlines.from_transformers(model.model, model.tokenizer)
+    model.draft_model = None
+    model.last_batch_stats = []
+    model.prefix_cache = PrefixCache(model.model, model.tokenizer, SHARED_PREFIX) if prefix_cache else None
+    return model
+
+def tiny_hf_model(preamble=None, prefix_cache=True):
+    """An HFTransformerModel around a tiny random GPT-2; the preamble is prefix-cached unless told not to"""
+    from models.hf_transformer import HFTransformerModel
+    from models.prefix_cache import PrefixCache
+
+    model = HFTransformerModel.__new__(HFTransformerModel)
+    model.tokenizer = tiny_tokenizer()
+    model.tokenizer.padding_side = "left"
+    model.model = tiny_gpt2(model.tokenizer)
+    model.preamble = preamble
+    model.prefix_cache = PrefixCache(model.model, model.tokenizer, preamble) if preamble and prefix_cache else None
+    model.draft_model = None
+    model.last_batch_stats = []
+    return model
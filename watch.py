@@ -0,0 +1,158 @@
+"""
+Watch mode: re-run only the scenario files that change, against a resident model.
+
+The whole corpus runs once. After that the scenario files are polled, and any changed
+or added YAML files are re-run on their own, with their pass/fail changes printed. The
+model is served by a model daemon: the one given with --daemon, or else one hosted on a
+thread of this process. Either way it loads once and stays loaded between edits, and the
+response cache answers any edit that leaves the prompt unchanged.
+"""
+
+import glob
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+import yaml
+
+import runner
+
+DEFAULT_PATTERN = "scenarios/**/*.yaml"
+# A half-saved file is skipped until its next edit rather than failing the re-run
+REQUIRED_FIELDS = {"id", "prompt", "expected_output", "evaluator"}
+
+
+def snapshot(pattern: str) -> Dict[str, Tuple[int, int]]:
+    """(mtime_ns, size) of every file matching pattern"""
+    stats = {}
+    for path in glob.glob(pattern, recursive=True):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        stats[path] = (stat.st_mtime_ns, stat.st_size)
+    return stats
+
+
+class ScenarioWatcher:
+    """Pass/fail for every scenario file, kept current by re-running the files that change"""
+
+    def __init__(self, pattern: str, run_kwargs: Dict):
+        self.pattern = pattern
+        self.run_kwargs = run_kwargs
+        # Every file's (mtime_ns, size) when it was last evaluated
+        self.files: Dict[str, Tuple[int, int]] = {}
+        self.ids: Dict[str, str] = {}
+        self.passed: Dict[str, bool] = {}
+
+    def _run(self, paths: List[str], output_format: Optional[str] = None, store_path: Optional[str] = None):
+        """Load and run the given files; return ({path: scenario id}, {scenario id: passed})"""
+        scenarios, ids = [], {}
+        for path in paths:
+            try:
+                with open(path) as f:
+                    scenario = yaml.safe_load(f)
+                if not isinstance(scenario, dict) or not REQUIRED_FIELDS <= scenario.keys():
+                    raise ValueError(f"not a scenario (needs {', '.join(sorted(REQUIRED_FIELDS))})")
+            except (OSError, ValueError, yaml.YAMLError) as e:
+                print(f"Warning: skipping {path}: {e}", file=sys.stderr)
+                continue
+            scenarios.append(scenario)
+            ids[path] = scenario["id"]
+        if not scenarios:
+            return ids, {}
+        results, _, _ = runner.run_tests(scenarios=scenarios, output_format=output_format, store_path=store_path,
+                                         **self.run_kwargs)
+        return ids, {result["id"]: result["passed"] for result in results}
+
+    def start(self, output_format: Optional[str] = "simple", store_path: Optional[str] = None):
+        """Run every file once to establish the baseline, recording it in the results store at store_path"""
+        current = snapshot(self.pattern)
+        ids, passed = self._run(sorted(current), output_format, store_path)
+        self.files = current
+        self.ids = ids
+        self.passed = passed
+
+    def poll(self) -> List[Tuple[str, Optional[bool], Optional[bool]]]:
+        """Re-run changed and added files; return (scenario id, passed before, passed now) changes.
+
+        ``None`` before means a new scenario, and ``None`` now means it was removed.
+        """
+        current = snapshot(self.pattern)
+        changed = sorted(path for path, stat in current.items() if self.files.get(path) != stat)
+        removed = sorted(path for path in self.files if path not in current)
+        if not changed and not removed:
+            return []
+
+        previous = {path: self.ids.pop(path) for path in changed + removed if path in self.ids}
+        ids, passed = self._run(changed)
+        for path in changed:
+            # Unloadable files are recorded too, so they are retried on their next edit only
+            self.files[path] = current[path]
+        for path in removed:
+            del self.files[path]
+
+        deltas = []
+        for path, scenario_id in previous.items():
+            if ids.get(path) != scenario_id:
+                deltas.append((scenario_id, self.passed.pop(scenario_id, None), None))
+        for path, scenario_id in ids.items():
+            self.ids[path] = scenario_id
+            deltas.append((scenario_id, self.passed.get(scenario_id), passed.get(scenario_id)))
+            self.passed[scenario_id] = passed.get(scenario_id)
+        return deltas
+
+
+def format_delta(scenario_id: str, before: Optional[bool], after: Optional[bool]) -> str:
+    label = lambda passed: "PASS" if passed else "FAIL"
+    if after is None:
+        return f"{scenario_id}: removed"
+    if before is None:
+        return f"{scenario_id}: {label(after)} (new)"
+    if before == after:
+        return f"{scenario_id}: {label(after)} (unchanged)"
+    return f"{scenario_id}: {label(before)} -> {label(after)}"
+
+
+def run_watch(run_kwargs: Dict, pattern: str = DEFAULT_PATTERN, interval: float = 1.0,
+              output_format: Optional[str] = "simple", store_path: Optional[str] = None):
+    """Run the corpus, then re-run changed scenario files until interrupted.
+
+    Only the initial full run is recorded in the results store; re-runs of edited files
+    cover a few scenarios each and would read as partial runs in its history.
+    """
+    options = dict(run_kwargs.get("backend_options") or {})
+    server = socket_dir = None
+    if not options.get("daemon"):
+        from daemon import serve_in_background
+        socket_dir = tempfile.mkdtemp(prefix="mtg-watch-")
+        server = serve_in_background(os.path.join(socket_dir, "daemon.sock"))
+        options["daemon"] = server.socket_path
+    watcher = ScenarioWatcher(pattern, dict(run_kwargs, backend_options=options))
+
+    try:
+        watcher.start(output_format, store_path)
+        print(f"\nWatching {pattern} for changes (Ctrl-C to stop)", file=sys.stderr)
+        while True:
+            time.sleep(interval)
+            start = time.perf_counter()
+            deltas = watcher.poll()
+            if not deltas:
+                continue
+            print(f"\n[{time.strftime('%H:%M:%S')}] {len(deltas)} scenario(s) re-run "
+                  f"in {time.perf_counter() - start:.2f}s")
+            for delta in deltas:
+                print(f"  {format_delta(*delta)}")
+            total = len(watcher.passed)
+            passed = sum(1 for result in watcher.passed.values() if result)
+            print(f"Pass rate: {passed}/{total} ({passed / total * 100 if total else 0:.2f}%)")
+            sys.stdout.flush()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+            os.rmdir(socket_dir)